@@ -3,128 +3,417 @@
 Flask backend that reads piece data from Excel and renders a catalog
 with a client-side cart and WhatsApp integration.
 """
-from typing import List, Dict, Optional
-from flask import Flask, render_template
-import pandas as pd
+from startup import StartupProfile  # first, so the imports below are timed
+from typing import Any, Mapping, Optional, Sequence, Tuple
+from flask import (Flask, Response, before_render_template, g, jsonify, render_template, request,
+                   stream_template, template_rendered)
 import os
+import threading
+import time
+from catalog import CatalogManager, CatalogStore, piece_key
+from metrics import SIZE_BUCKETS, MetricsRegistry
+from render_cache import FragmentCache, PageCache, RenderedPage, gzip_stream
+
+# Cold start phases, reported at the end of the warmup and on /catalog/version
+startup_profile = StartupProfile()
+startup_profile.record("imports", startup_profile.since_import())
 
 # TODO: flesh out UI --- IGNORE ---
 app = Flask(__name__)
 
-EXCEL_PATH = "data/bricklink_pieces.xlsx"
-# TODO: connect to SQL --- IGNORE ---
+EXCEL_PATH = os.environ.get("CATALOG_PATH", "data/bricklink_pieces.xlsx")
+# "memory" holds the catalog in every worker; "sqlite" queries the database
+# the pipeline publishes with --export sqlite, so worker memory does not
+# grow with the inventory (paged mode renders cards on demand)
+CATALOG_BACKEND = os.environ.get("CATALOG_BACKEND", "memory")
+if CATALOG_BACKEND not in ("memory", "sqlite"):
+    raise ValueError(f"CATALOG_BACKEND must be memory or sqlite, got {CATALOG_BACKEND!r}")
+if CATALOG_BACKEND == "sqlite":
+    # Only this backend loads sqlite3 and the database code
+    from catalog_sqlite import SqliteCatalogStore, sqlite_path_for
+    CATALOG_SOURCE = os.environ.get("CATALOG_SQLITE_PATH") or sqlite_path_for(EXCEL_PATH)
+    STORE_CLASS = SqliteCatalogStore
+else:
+    CATALOG_SOURCE, STORE_CLASS = EXCEL_PATH, CatalogStore
+# Cards kept per catalog version when they are rendered on demand (sqlite backend)
+CARD_CACHE_SIZE = int(os.environ.get("CATALOG_CARD_CACHE", "10000"))
+
+# "paged" renders only the first page and lets the infinite scroll fetch the
+# rest from /api/pieces; "full" renders every card into the page
+RENDER_MODE = os.environ.get("CATALOG_RENDER_MODE", "paged")
+PAGE_SIZE = int(os.environ.get("CATALOG_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = 200
+# Stream the index page (header first, then cards in chunks) instead of
+# serving it from the render cache; keeps per-request memory bounded
+STREAM_INDEX = os.environ.get("CATALOG_STREAM", "0") == "1"
+STREAM_CHUNK_CARDS = int(os.environ.get("CATALOG_STREAM_CHUNK", "200"))
+# Scale-to-zero hosts: in paged mode, render only the first page's cards
+# before serving and the rest on a background thread of each process
+# (started by its first request, so a preloaded gunicorn builds them in
+# the workers instead of the master)
+FAST_START = os.environ.get("CATALOG_FAST_START", "0") == "1"
+
+def _card_macro():
+    """Return the shared ``_card.html`` card macro."""
+    return app.jinja_env.get_template("_card.html").module.card
+
+# Request, render and catalog metrics, merged across workers on /metrics
+metrics = MetricsRegistry()
+REQUESTS = metrics.counter("rekubricks_http_requests_total", "Requests by route, method and status.",
+                           ("route", "method", "status"))
+REQUEST_SECONDS = metrics.histogram("rekubricks_http_request_duration_seconds",
+                                    "Time until the response is ready, by route.", ("route",))
+RESPONSE_BYTES = metrics.histogram("rekubricks_http_response_bytes",
+                                   "Response body size (after compression), by route.", ("route",),
+                                   buckets=SIZE_BUCKETS)
+INDEX_PHASE_SECONDS = metrics.histogram("rekubricks_index_phase_seconds",
+                                        "Time index() spends per phase: store (catalog lookup), "
+                                        "render (template + cards) and compress.", ("phase",))
+TEMPLATE_SECONDS = metrics.histogram("rekubricks_template_render_seconds", "Template render time.",
+                                     ("template",))
+PAGE_CACHE = metrics.counter("rekubricks_page_cache_requests_total",
+                             "Index requests served from the render cache (hit), rendered (miss) "
+                             "or answered 304 (not_modified).", ("result",))
+CATALOG_RELOADS = metrics.counter("rekubricks_catalog_reloads_total",
+                                  "Catalog load attempts by outcome (loaded, unchanged, failed).", ("result",))
+CATALOG_LOAD_SECONDS = metrics.histogram("rekubricks_catalog_load_duration_seconds",
+                                         "Duration of catalog loads (startup warmup and reloads).")
+CATALOG_PIECES = metrics.gauge("rekubricks_catalog_pieces", "Pieces in the active catalog.")
+CATALOG_LOADED_AT = metrics.gauge("rekubricks_catalog_loaded_timestamp_seconds",
+                                  "Unix time the active catalog was loaded.")
+STARTUP_SECONDS = metrics.gauge("rekubricks_startup_phase_seconds",
+                                "Wall time of each cold start phase of this process.", ("phase",))
+
+# Rendered index pages (with gzip/brotli variants) per catalog version
+page_cache = PageCache()
+# Card HTML per piece, rendered once per catalog version
+fragment_cache = FragmentCache(_card_macro,
+                               max_partial_cards=CARD_CACHE_SIZE if CATALOG_BACKEND == "sqlite" else None)
+
+def record_reload(result: str, seconds: float, store: Optional[CatalogStore]) -> None:
+    """Count a catalog load attempt and describe the active catalog."""
+    CATALOG_RELOADS.inc(result=result)
+    CATALOG_LOAD_SECONDS.observe(seconds)
+    if result == "loaded":
+        CATALOG_PIECES.set(len(store))
+        CATALOG_LOADED_AT.set(store.loaded_at)
 
-# Global cache to store loaded data (loaded once at startup)
-_pieces_cache: Optional[List[Dict]] = None
-_categories_cache: Optional[List[str]] = None
+def _defers_card_build() -> bool:
+    """Whether loads render only the first page's cards (fast start)."""
+    return FAST_START and CATALOG_BACKEND == "memory" and RENDER_MODE == "paged" and not STREAM_INDEX
 
-def load_pieces() -> List[Dict]:
-    """Load and clean piece data from the Excel file.
+# (pid, catalog version) of the background card builds started so far
+_card_builds = set()
+_card_builds_lock = threading.Lock()
 
-    Returns a list of row dicts ready for rendering; applies defensive
-    defaults for missing columns and values.
-    
-    Uses cache if available to avoid reloading on every request.
+def ensure_card_build(store: CatalogStore) -> None:
+    """Start building every card of ``store`` on a thread of this process (fast start).
+
+    Called per request rather than when the catalog loads: with a
+    preloaded gunicorn the load runs in the master, and its threads would
+    not survive the fork into the workers.
+    """
+    key = (os.getpid(), store.version)
+    with _card_builds_lock:
+        if key in _card_builds:
+            return
+        _card_builds.add(key)
+    threading.Thread(target=fragment_cache.build, args=(store,), name="card-fragments",
+                     daemon=True).start()
+
+def prepare_store(store: CatalogStore) -> None:
+    """Build the card fragments of a catalog version before it goes live.
+
+    With the sqlite backend in paged mode only the first page's cards are
+    rendered; the others are rendered as pages ask for them.
     """
-    global _pieces_cache
-    
-    # Return cached data if available
-    if _pieces_cache is not None:
-        return _pieces_cache
-    
-    print("Loading pieces from Excel (this should only happen once)...")
-    df = pd.read_excel(EXCEL_PATH)
-    
-    # Handle missing Price column gracefully
-    if "Price" not in df.columns:
-        df["Price"] = 0.0
-    
-    # Handle missing Category column gracefully
-    if "Category" not in df.columns:
-        df["Category"] = "Otros"
-    
-    # Handle missing ID columns gracefully (for backward compatibility)
-    if "ID_COLOR" not in df.columns:
-        df["ID_COLOR"] = ""
-    if "ID_MOLDE" not in df.columns:
-        df["ID_MOLDE"] = df["Piece_ID"]  # Use Piece_ID as fallback
-    
-    # Clean and validate data
-    df = df.dropna(subset=['Piece_ID', 'Piece_Name'])  # Remove rows without essential data
-    df['Price'] = pd.to_numeric(df['Price'], errors='coerce').fillna(0.0)  # Convert price to numeric
-    df['Image_URL'] = df['Image_URL'].fillna('N/A')  # Handle missing images
-    df['Color'] = df['Color'].fillna('Sin color')  # Handle missing colors
-    df['Category'] = df['Category'].fillna('Sin categoría')  # Handle missing categories
-    df['ID_COLOR'] = df['ID_COLOR'].fillna('')  # Handle missing ID_COLOR
-    df['ID_MOLDE'] = df['ID_MOLDE'].fillna('')  # Handle missing ID_MOLDE
-    
-    # Convert to string and clean special characters
-    df['Piece_ID'] = df['Piece_ID'].astype(str).str.strip() # TODO: consieder using only ID_MOLDE+COLOR instead
-    df['Piece_Name'] = df['Piece_Name'].astype(str).str.strip()
-    df['Color'] = df['Color'].astype(str).str.strip()
-    df['Category'] = df['Category'].astype(str).str.strip()
-    df['Image_URL'] = df['Image_URL'].astype(str).str.strip()
-    df['ID_COLOR'] = df['ID_COLOR'].astype(str).str.strip().replace('nan', '')  # Convert NaN string to empty
-    df['ID_MOLDE'] = df['ID_MOLDE'].astype(str).str.strip().replace('nan', '')  # Convert NaN string to empty
-    
-    # Remove any rows where essential fields are empty after cleaning
-    df = df[df['Piece_ID'] != '']
-    df = df[df['Piece_Name'] != '']
-    df = df[df['Image_URL'] != '']
-    df = df[df['Image_URL'] != 'N/A']
-    
-    # Cache the results
-    _pieces_cache = df.to_dict(orient="records")
-    print(f"Loaded and cached {len(_pieces_cache)} pieces")
-    
-    return _pieces_cache
-
-def get_categories() -> List[str]:
-    """Extract unique categories from the Excel file.
-
-    Returns a sorted list of unique category names; if the column is
-    missing, returns the fallback category.
-    
-    Uses cache if available to avoid reloading on every request.
+    # Only the first load counts towards the startup profile
+    for phase, seconds in store.load_phases.items():
+        startup_profile.record(phase, seconds)
+    with startup_profile.phase("card fragments"):
+        if CATALOG_BACKEND == "sqlite" and RENDER_MODE == "paged":
+            fragment_cache.rows(store, store.query_rows(limit=PAGE_SIZE)[0])
+        elif _defers_card_build():
+            # The rest is built by ensure_card_build on the first request
+            fragment_cache.rows(store, store.query_rows(limit=PAGE_SIZE)[0])
+        else:
+            fragment_cache.build(store)
+
+# Active catalog, hot-swapped in the background when the data file changes;
+# card fragments are prebuilt before a new version goes live
+catalog_manager = CatalogManager(
+    CATALOG_SOURCE,
+    poll_interval=float(os.environ.get("CATALOG_POLL_SECONDS", "30")),
+    on_load=prepare_store, on_reload=record_reload,
+    store_class=STORE_CLASS)
+
+def get_store() -> CatalogStore:
+    """Return the active catalog store, parsing the source on first use.
+
+    Pieces, categories and lookups all come from one parse, so the
+    category filter only lists categories that still have pieces after
+    cleaning. Callers should fetch the store once per request so a
+    concurrent reload can't mix two catalog versions in one response.
     """
-    global _categories_cache
-    
-    # Return cached data if available
-    if _categories_cache is not None:
-        return _categories_cache
-    
-    print("Loading categories from Excel (this should only happen once)...")
-    df = pd.read_excel(EXCEL_PATH)
-    
-    # Handle missing Category column gracefully
-    if "Category" not in df.columns:
-        _categories_cache = ["Sin categoría"]
-        return _categories_cache
-    
-    # Get unique categories, excluding NaN values
-    categories = df["Category"].dropna().unique().tolist()
-    _categories_cache = sorted(categories)
-    print(f"Loaded and cached {len(_categories_cache)} categories")
-    
-    return _categories_cache
+    return catalog_manager.current()
+
+def load_pieces() -> Sequence[Mapping[str, Any]]:
+    """Return the cleaned pieces ready for rendering (see ``catalog.py``)."""
+    return get_store().pieces
+
+def get_categories() -> Sequence[str]:
+    """Return the sorted categories that have at least one piece."""
+    return get_store().categories
 
 def warmup_cache():
-    """Preload data into cache on application startup."""
+    """Preload data into cache on application startup.
+
+    Loads the catalog (card fragments are built as it goes live) and
+    renders the first page into the page cache, so the first request is a
+    cache hit, then closes the startup profile.
+    """
     print("=" * 60)
     print("WARMUP: Preloading data into cache...")
     print("=" * 60)
-    load_pieces()
-    get_categories()
+    store = get_store()
+    print(f"Catalog version {store.version}: {len(store)} pieces, "
+          f"{len(store.categories)} categories in {store.load_seconds:.3f}s")
+    print(store.describe())
+    if not STREAM_INDEX:
+        with startup_profile.phase("first render"), app.test_request_context("/"):
+            _index_page(store)
+    startup_profile.finish()
+    for phase, seconds in startup_profile.phases.items():
+        STARTUP_SECONDS.set(seconds, phase=phase)
+    print(startup_profile.summary_line())
     print("=" * 60)
     print("WARMUP: Complete! Application ready to serve requests.")
     print("=" * 60)
+    # With a preloaded app this is the master; workers fork with this file written
+    metrics.flush()
+
+@app.before_request
+def start_catalog_watcher():
+    """Make sure this worker polls the data file for new catalog versions."""
+    g.request_start = time.perf_counter()
+    catalog_manager.ensure_watcher()
+    metrics.ensure_flusher()
+    if _defers_card_build():
+        ensure_card_build(get_store())
+
+def _record_request(status: int) -> str:
+    """Count the current request and observe its latency; returns its route label."""
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    start = g.get("request_start")
+    if start is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route=route)
+    REQUESTS.inc(route=route, method=request.method, status=status)
+    g.request_recorded = True
+    return route
+
+@app.after_request
+def record_request_metrics(response: Response) -> Response:
+    """Count the request and observe its latency and body size."""
+    route = _record_request(response.status_code)
+    if not response.is_streamed:
+        RESPONSE_BYTES.observe(response.calculate_content_length() or 0, route=route)
+    return response
+
+@app.teardown_request
+def record_failed_request(error: Optional[BaseException]) -> None:
+    """Count requests that never reached ``record_request_metrics`` as 500s.
+
+    An exception that propagates out of Flask (debug mode,
+    ``PROPAGATE_EXCEPTIONS``) or is raised by an after-request handler
+    skips the after-request handlers, but teardown always runs. Contexts
+    that never dispatched a request (e.g. the warmup render) are skipped.
+    """
+    if "request_start" in g and not g.get("request_recorded"):
+        _record_request(500)
+
+@before_render_template.connect_via(app)
+def _start_template_timer(sender, template, context, **extra):
+    g.setdefault("template_starts", []).append(time.perf_counter())
+
+@template_rendered.connect_via(app)
+def _record_template_time(sender, template, context, **extra):
+    starts = g.get("template_starts")
+    if starts:
+        TEMPLATE_SECONDS.observe(time.perf_counter() - starts.pop(), template=template.name or "")
+
+def _render_index(store: CatalogStore) -> str:
+    """Render the catalog page for the configured render mode."""
+    if RENDER_MODE == "full":
+        return render_template("index.html", cards_html=fragment_cache.join(store),
+                               categories=store.categories, paged=False)
+    rows, total = store.query_rows(limit=PAGE_SIZE)
+    return render_template("index.html", cards_html=fragment_cache.join(store, rows),
+                           categories=store.categories, paged=True, page_size=PAGE_SIZE,
+                           total=total, next_offset=PAGE_SIZE if PAGE_SIZE < total else None)
+
+def _index_page(store: CatalogStore) -> Tuple[RenderedPage, bool]:
+    """Return the cached catalog page and whether it was rendered just now."""
+    rendered = []
+
+    def render() -> str:
+        with INDEX_PHASE_SECONDS.time(phase="render"):
+            rendered.append(True)
+            return _render_index(store)
+
+    page = page_cache.get_or_render((store.version, RENDER_MODE, PAGE_SIZE), store.version, render)
+    if rendered:
+        INDEX_PHASE_SECONDS.observe(page.compress_seconds, phase="compress")
+    return page, bool(rendered)
+
+def _stream_index(store: CatalogStore) -> Response:
+    """Stream the catalog page: header, search bar and filters flush first,
+    then the cards go out ``STREAM_CHUNK_CARDS`` at a time."""
+    if RENDER_MODE == "full":
+        rows, context = None, {"paged": False}
+    else:
+        rows, total = store.query_rows(limit=PAGE_SIZE)
+        context = {"paged": True, "page_size": PAGE_SIZE, "total": total,
+                   "next_offset": PAGE_SIZE if PAGE_SIZE < total else None}
+    chunks = stream_template("index.html", categories=store.categories,
+                             card_chunks=fragment_cache.iter_join(store, rows, STREAM_CHUNK_CARDS),
+                             **context)
+
+    headers = {"Vary": "Accept-Encoding", "X-Catalog-Version": store.version}
+    if request.accept_encodings.quality("gzip") > 0:
+        headers["Content-Encoding"] = "gzip"
+        return Response(gzip_stream(chunks), mimetype="text/html", headers=headers)
+    return Response(chunks, mimetype="text/html", headers=headers)
 
 @app.route("/")
 def index():
-    """Main route that loads pieces and renders the catalog page."""
-    pieces = load_pieces()
-    categories = get_categories()
-    return render_template("index.html", pieces=pieces, categories=categories)
+    """Main route that serves the catalog page from the render cache.
+
+    The page is rendered and compressed once per catalog version; repeat
+    visitors revalidate with If-None-Match and get 304 Not Modified. With
+    ``CATALOG_STREAM=1`` the page is streamed instead.
+    """
+    with INDEX_PHASE_SECONDS.time(phase="store"):
+        store = get_store()
+    if STREAM_INDEX:
+        return _stream_index(store)
+
+    page, rendered = _index_page(store)
+
+    headers = {
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+        "X-Catalog-Version": store.version,
+    }
+    encoding, body = page.select(request.accept_encodings.quality)
+    # Revalidate whichever variant the client holds, preferring the one it would get now
+    current = page.etag_for(encoding)
+    etags = [current] + [tag for tag in page.all_etags() if tag != current]
+    matched = next((tag for tag in etags if request.if_none_match.contains_weak(tag)), None)
+    if matched is not None:
+        PAGE_CACHE.inc(result="not_modified")
+        response = Response(status=304, headers=headers)
+        response.set_etag(matched)
+        return response
+
+    PAGE_CACHE.inc(result="miss" if rendered else "hit")
+    response = Response(body, mimetype="text/html", headers=headers)
+    response.set_etag(page.etag_for(encoding))
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+def _int_arg(name: str, default: int, minimum: int, maximum: Optional[int] = None) -> int:
+    """Parse a bounded integer query parameter (raises ValueError if invalid)."""
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+    if maximum is None and value < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    if maximum is not None and not minimum <= value <= maximum:
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+@app.route("/api/pieces")
+def api_pieces():
+    """Return one page of pieces filtered by category and search term.
+
+    Query parameters: ``category``, ``q``, ``sort`` (see ``SORT_OPTIONS``),
+    ``offset``, ``limit`` and ``format=html`` to get the rendered cards for
+    the infinite scroll instead of the piece data.
+    """
+    store = get_store()
+    try:
+        # An offset past the end is an empty page, not an error
+        offset = _int_arg("offset", 0, 0)
+        limit = _int_arg("limit", PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        rows, total = store.query_rows(
+            category=request.args.get("category") or None,
+            q=request.args.get("q"),
+            sort=request.args.get("sort", "default"),
+            offset=min(offset, len(store)),
+            limit=limit,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    next_offset = offset + len(rows)
+    payload = {
+        "version": store.version,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset if next_offset < total else None,
+    }
+    if request.args.get("format") == "html":
+        payload["html"] = fragment_cache.join(store, rows)
+    else:
+        payload["items"] = [dict(piece, key=piece_key(piece)) for piece in store.pieces_at(rows)]
+    return jsonify(payload), {"X-Catalog-Version": store.version}
+
+@app.route("/api/search")
+def api_search():
+    """Return pieces ranked by relevance for a search query.
+
+    Query parameters: ``q`` (required), ``category`` and ``limit``.
+    """
+    store = get_store()
+    q = request.args.get("q", "")
+    try:
+        limit = _int_arg("limit", 20, 1, MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not q.strip():
+        return jsonify({"error": "q is required"}), 400
+
+    start = time.perf_counter()
+    category = request.args.get("category") or None
+    rows, scores = store.search(q, category=category, limit=limit)
+    total = store.count(q, category=category)
+    took_ms = (time.perf_counter() - start) * 1000
+
+    items = [dict(piece, key=piece_key(piece), score=score)
+             for piece, score in zip(store.pieces_at(rows.tolist()), scores.tolist())]
+    return jsonify({
+        "version": store.version,
+        "query": q,
+        "total": total,
+        "took_ms": round(took_ms, 3),
+        "items": items,
+    }), {"X-Catalog-Version": store.version}
+
+@app.route("/catalog/version")
+def catalog_version():
+    """Report the active catalog version, load time and this worker's startup profile."""
+    return jsonify(dict(catalog_manager.status(), startup=startup_profile.report()))
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus metrics of every worker (see ``metrics.py``)."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 # Warmup cache when app starts
 warmup_cache()
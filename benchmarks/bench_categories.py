@@ -0,0 +1,72 @@
+"""Time the per-name category loop against the vectorized classifier.
+
+Names mix real catalog names with synthetic ones whose category only
+shows up as a later word or a substring, so every matching rule is hit.
+
+Usage (from the project root):
+    python benchmarks/bench_categories.py [rows ...]
+"""
+import random
+import sys
+import time
+from typing import List
+
+import pandas as pd
+
+from synthetic import PROJECT_ROOT, SHAPES, SUFFIXES
+
+from categories import categories
+from process_categories import categorize_series, extract_category_from_name
+
+PREFIXES = ["", "Technic ", "Wedge ", "Duplo ", "Modified ", "Minifig ", "Curved Slope "]
+WORDS = ["Round", "Holder", "Barrel", "Liftarm", "Tiles", "Panel", "Plated", "Hinge", "Ornament"]
+
+
+def generate_names(rows: int, seed: int = 42) -> List[str]:
+    """Return ``rows`` mostly-unique piece names covering every rule."""
+    rng = random.Random(seed)
+    try:
+        real = pd.read_excel(f"{PROJECT_ROOT}/data/bricklink_pieces.xlsx")["Piece_Name"].dropna().astype(str).tolist()
+    except FileNotFoundError:
+        real = []
+    names = []
+    for i in range(rows):
+        roll = rng.random()
+        if real and roll < 0.4:
+            names.append(f"{rng.choice(real)} #{i}")
+        elif roll < 0.95:
+            noun = rng.choice(categories + WORDS).title()
+            names.append(f"{rng.choice(PREFIXES)}{rng.choice(WORDS)} {noun} {rng.choice(SHAPES)}"
+                         f"{rng.choice(SUFFIXES)} #{i}")
+        else:
+            names.append(rng.choice(["N/A", "", "  ", "Unknown Piece Type"]))
+    return names
+
+
+def time_categories(rows: int) -> None:
+    names = generate_names(rows)
+    series = pd.Series(names, dtype=object)
+
+    start = time.perf_counter()
+    expected = [extract_category_from_name(name) for name in names]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    labels = categorize_series(series)
+    vector_seconds = time.perf_counter() - start
+
+    repeated = pd.Series(names[:1000] * (rows // 1000 or 1), dtype=object)
+    start = time.perf_counter()
+    categorize_series(repeated)
+    repeated_seconds = time.perf_counter() - start
+
+    same = "identical labels" if labels.tolist() == expected else "LABELS DIFFER"
+    print(f"{rows:>8} names | loop {loop_seconds * 1000:8.1f} ms | vectorized {vector_seconds * 1000:7.1f} ms "
+          f"({loop_seconds / vector_seconds:4.1f}x) | 1000 distinct names repeated "
+          f"{repeated_seconds * 1000:6.1f} ms | {same}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [4000, 100000]
+    for size in sizes:
+        time_categories(size)
@@ -0,0 +1,53 @@
+"""Time the catalog export stage: to_excel + snapshot vs CatalogWriter.
+
+The old path is ``df.to_excel`` followed by the pickle snapshot. The new
+one streams the same frame through ``CatalogWriter`` (write-only xlsx +
+snapshot) and is timed again with the JSON/CSV shards (and Parquet, when
+pyarrow is installed) staged and published alongside.
+
+Usage (from the project root):
+    python benchmarks/bench_export.py [rows ...]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import synthetic
+from catalog import clean_pieces_frame, frame_to_records, write_snapshot
+from catalog_writer import build_exporters, write_catalog
+from webscraping import app_catalog_format
+
+
+def timed(run) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run()
+    return time.perf_counter() - start
+
+
+def main(rows: int) -> None:
+    df = synthetic.generate_catalog_frame(rows)
+    catalog_format = app_catalog_format()
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "bricklink_pieces.xlsx")
+
+        def to_excel():
+            df.to_excel(output_path, index=False)
+            write_snapshot(frame_to_records(clean_pieces_frame(df)), output_path)
+
+        old_seconds = timed(to_excel)
+        writer_seconds = timed(lambda: write_catalog([df], catalog_format, output_path))
+        export_seconds = timed(lambda: write_catalog(
+            [df], catalog_format, output_path,
+            build_exporters(["json", "csv", "parquet"], catalog_format, output_path)))
+    print(f"{rows:>8} rows | to_excel {old_seconds:6.2f}s | writer {writer_seconds:6.2f}s "
+          f"({old_seconds / writer_seconds:4.1f}x) | writer + exports {export_seconds:6.2f}s")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [4000, 40000]
+    for size in sizes:
+        main(size)
@@ -0,0 +1,65 @@
+"""Time reading an inventory workbook: read_excel vs streaming scan vs cache.
+
+Writes a synthetic ``datos_inventario.xlsx``-shaped workbook (numeric and
+blank color IDs, numeric and lettered mold IDs, color names) to a temp
+folder, then reads it with ``pd.read_excel``, with a cold
+``read_workbook_columns`` (XML scan + cache write) and with a warm one
+(cache hit). The frames must be identical.
+
+Usage (from the project root):
+    python benchmarks/bench_ingest.py [rows ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from openpyxl import Workbook
+
+import synthetic  # noqa: F401  (puts webscraping/ on sys.path)
+from color_ids import color_ids
+from xlsx_reader import read_workbook_columns
+
+
+def write_inventory_workbook(path: str, rows: int, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    colors = list(color_ids) + ["MAGENTA SPARKLE", None]
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["ID", "ID MOLDE", "COLOR"])
+    for _ in range(rows):
+        id_molde = 3000 + rng.randrange(2000)
+        sheet.append([
+            rng.choice([None, rng.randrange(1, 200)]),
+            id_molde if rng.random() < 0.8 else f"{id_molde}b",
+            rng.choice(colors),
+        ])
+    workbook.save(path)
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return time.perf_counter() - start, result
+
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "datos_inventario.xlsx")
+        cache_dir = os.path.join(tmp, "cache")
+        write_inventory_workbook(path, rows)
+        pandas_seconds, expected = timed(lambda: pd.read_excel(path))
+        cold_seconds, columns = timed(lambda: read_workbook_columns(path, cache_dir))
+        warm_seconds, cached = timed(lambda: read_workbook_columns(path, cache_dir))
+        same = expected.equals(columns.frame()) and expected.equals(cached.frame())
+    print(f"{rows:>8} rows | read_excel {pandas_seconds:6.2f}s | scan {cold_seconds:6.2f}s "
+          f"({pandas_seconds / cold_seconds:4.1f}x) | cached {warm_seconds * 1000:7.1f} ms | "
+          f"{'identical frames' if same else 'FRAMES DIFFER'}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [4000, 40000, 200000]
+    for size in sizes:
+        main(size)
@@ -0,0 +1,86 @@
+"""Compare catalog memory: one dict per piece vs the columnar store vs SQLite.
+
+The SQLite store's figure is the Python heap it holds after serving a few
+queries; SQLite's own page cache (``CATALOG_SQLITE_CACHE_KB`` per pooled
+connection) is allocated outside it.
+
+Usage (from the project root):
+    python benchmarks/bench_memory.py [rows ...]
+"""
+import gc
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import MappingProxyType
+
+from synthetic import generate_catalog_frame
+
+from catalog import CatalogStore, clean_pieces_frame, frame_to_columns
+from catalog_sqlite import SqliteCatalogStore, write_sqlite
+from columnar import ColumnarPieces
+
+
+def measure(build):
+    """Return (result, bytes allocated and still held, seconds) for ``build()``."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, seconds
+
+
+def scan_prices(pieces) -> float:
+    """Time a full pass reading one field from every piece."""
+    start = time.perf_counter()
+    sum(piece["Price"] for piece in pieces)
+    return time.perf_counter() - start
+
+
+def time_memory(rows: int) -> None:
+    # Start every layout from the pickled snapshot columns, as the app does
+    payload = pickle.dumps(frame_to_columns(clean_pieces_frame(generate_catalog_frame(rows))))
+    per_10k = 10000 / rows / 1024 / 1024
+
+    def build_dicts():
+        # Previous layout: a read-only dict per piece
+        columns = pickle.loads(payload)
+        names = list(columns)
+        return tuple(MappingProxyType(dict(zip(names, row))) for row in zip(*columns.values()))
+
+    dicts, dict_bytes, dict_seconds = measure(build_dicts)
+    columnar, col_bytes, col_seconds = measure(lambda: ColumnarPieces(pickle.loads(payload)))
+    store, store_bytes, store_seconds = measure(lambda: CatalogStore(pickle.loads(payload), version="bench"))
+
+    print(f"{rows:>7} rows | dicts {dict_bytes / 1024 / 1024:7.1f} MB ({dict_bytes * per_10k:5.2f} MB/10k, "
+          f"build {dict_seconds:.2f}s, scan {scan_prices(dicts) * 1000:5.1f} ms) "
+          f"| columnar {col_bytes / 1024 / 1024:6.1f} MB ({col_bytes * per_10k:5.2f} MB/10k, "
+          f"build {col_seconds:.2f}s, scan {scan_prices(columnar) * 1000:5.1f} ms) "
+          f"| store + index {store_bytes / 1024 / 1024:6.1f} MB in {store_seconds:.2f}s")
+    del dicts, columnar, store
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_sqlite(pickle.loads(payload), os.path.join(directory, "bricklink_pieces.sqlite"))
+
+        def open_and_query():
+            sqlite_store = SqliteCatalogStore(path)
+            sqlite_store.query_rows(category=sqlite_store.categories[0], sort="price")
+            sqlite_store.query_rows(q="plate 2x4")
+            return sqlite_store
+
+        sqlite_store, sqlite_bytes, sqlite_seconds = measure(open_and_query)
+        print(f"{'':>7}        sqlite store {sqlite_bytes / 1024:7.1f} KB held after 2 queries, "
+              f"opened and queried in {sqlite_seconds * 1000:.1f} ms ({os.path.getsize(path) / 1024 / 1024:.1f} MB file)")
+        del sqlite_store
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [4000, 100000]
+    for size in sizes:
+        time_memory(size)
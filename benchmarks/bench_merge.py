@@ -0,0 +1,75 @@
+"""Time the per-row merge + image URL loop against the DataFrame path.
+
+The inventory mixes known and unknown molds, mapped and unmapped colors,
+numeric and non-numeric ID_COLOR values and blanks, so every branch of
+the merge and of ``generate_image_url`` is exercised. Both paths must
+give identical rows.
+
+Usage (from the project root):
+    python benchmarks/bench_merge.py [rows ...]
+"""
+import contextlib
+import io
+import random
+import sys
+import time
+from typing import Any, Dict
+
+import pandas as pd
+
+import synthetic  # noqa: F401  (puts webscraping/ on sys.path)
+from color_ids import color_ids
+from generate_images import add_image_urls, batch_generate_image_urls
+from webscraping import merge_molde_data_with_inventory, merge_molde_frame
+
+MOLDES = 1000
+
+
+def generate_molde_data(seed: int = 42) -> Dict[str, Dict[str, Any]]:
+    """Scraped data for ``MOLDES`` molds, a few with missing fields."""
+    rng = random.Random(seed)
+    molde_data = {}
+    for i in range(MOLDES):
+        info = {"name": f"Plate 1 x {i}", "weight": f"0.{i}g", "category": rng.choice(["PLATE", "BRICK", "TILE"])}
+        if rng.random() < 0.02:
+            del info[rng.choice(list(info))]
+        molde_data[str(3000 + i)] = info
+    return molde_data
+
+
+def generate_inventory(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Inventory shaped like ``import_inventory_frame()`` output."""
+    rng = random.Random(seed)
+    colors = [name for name in color_ids] + ["MAGENTA SPARKLE", "", " white "]
+    id_moldes, id_colors, piece_colors = [], [], []
+    for _ in range(rows):
+        roll = rng.random()
+        id_moldes.append(str(3000 + rng.randrange(MOLDES + 50)) if roll > 0.01 else "")
+        id_colors.append(rng.choice(["", "", str(rng.randrange(1, 200)), f"{rng.randrange(10**6)}.0"]))
+        piece_colors.append(rng.choice(colors))
+    return pd.DataFrame({"ID_COLOR": id_colors, "ID_MOLDE": id_moldes, "COLOR": piece_colors})
+
+
+def time_merge(rows: int) -> None:
+    molde_data = generate_molde_data()
+    inventory_df = generate_inventory(rows)
+    inventory_pieces = inventory_df.to_dict(orient="records")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        expected = batch_generate_image_urls(merge_molde_data_with_inventory(molde_data, inventory_pieces))
+        loop_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        merged = add_image_urls(merge_molde_frame(molde_data, inventory_df))
+        frame_seconds = time.perf_counter() - start
+
+    same = "identical rows" if merged.to_dict(orient="records") == expected else "ROWS DIFFER"
+    print(f"{rows:>8} rows | loop {loop_seconds * 1000:9.1f} ms | DataFrame {frame_seconds * 1000:8.1f} ms "
+          f"({loop_seconds / frame_seconds:5.1f}x) | {same}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [4000, 100000, 1000000]
+    for size in sizes:
+        time_merge(size)
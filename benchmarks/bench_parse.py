@@ -0,0 +1,39 @@
+"""Replay catalog pages through each extraction path and compare pages/sec.
+
+Uses a folder of saved pages (``SCRAPE_SAVE_HTML=dir python webscraping.py``)
+or, by default, synthetic ~200 KB pages.
+
+Usage (from the project root):
+    python benchmarks/bench_parse.py [fixtures_dir] [--pages N] [--workers N]
+"""
+import argparse
+import os
+import tempfile
+
+from synthetic import write_molde_fixtures
+
+from parse_molde import replay_fixtures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.directory or write_molde_fixtures(tmp, args.pages)
+        reference = None
+        runs = [("soup", 0), ("strainer", 0), ("fast", 0), ("fast", args.workers)]
+        for name, workers in runs:
+            results, stats = replay_fixtures(directory, name, workers)
+            if reference is None:
+                reference = results
+            same = "same as soup" if results == reference else "DIFFERS FROM SOUP"
+            print(f"{name:>8} workers={workers} | {stats['pages']} pages, {stats['mb']:.1f} MB | "
+                  f"{stats['seconds']:6.2f}s | {stats['pages_per_sec']:8.1f} pages/s | {same}")
+
+
+if __name__ == "__main__":
+    main()
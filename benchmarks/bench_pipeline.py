@@ -0,0 +1,79 @@
+"""Peak memory and time of the materialized vs streaming catalog pipeline.
+
+The materialized run is the original shape of steps 4-7: the whole
+inventory as row dicts, merged into a list, image URLs added, one
+DataFrame, ``to_excel`` and the snapshot. The streaming run pulls the
+same rows chunk by chunk through ``merge_chunks`` -> ``image_url_chunks``
+-> ``write_catalog``. Both write to a temp folder and must read back
+identically.
+
+Usage (from the project root):
+    python benchmarks/bench_pipeline.py [rows ...]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from bench_merge import generate_inventory, generate_molde_data
+
+from catalog import clean_pieces_frame, frame_to_records, write_snapshot
+from catalog_writer import COLUMN_ORDER, write_catalog
+from generate_images import batch_generate_image_urls, image_url_chunks
+from webscraping import app_catalog_format, merge_chunks, merge_molde_data_with_inventory
+
+CHUNK_ROWS = 5000
+
+
+def inventory_chunks(rows: int):
+    for start in range(0, rows, CHUNK_ROWS):
+        yield generate_inventory(min(CHUNK_ROWS, rows - start), seed=start)
+
+
+def materialized(molde_data, rows: int, output_path: str) -> None:
+    inventory_pieces = pd.concat(list(inventory_chunks(rows))).to_dict(orient="records")
+    pieces = batch_generate_image_urls(merge_molde_data_with_inventory(molde_data, inventory_pieces))
+    df = pd.DataFrame(pieces)
+    df = df[[col for col in COLUMN_ORDER if col in df.columns]]
+    df.to_excel(output_path, index=False)
+    write_snapshot(frame_to_records(clean_pieces_frame(df)), output_path)
+
+
+def streaming(molde_data, rows: int, output_path: str) -> None:
+    write_catalog(image_url_chunks(merge_chunks(molde_data, inventory_chunks(rows))), app_catalog_format(),
+                  output_path)
+
+
+def measure(run, *args):
+    """Return (seconds, peak MB) of one run."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1024 / 1024
+
+
+def main(rows: int) -> None:
+    molde_data = generate_molde_data()
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path, new_path = os.path.join(tmp, "old.xlsx"), os.path.join(tmp, "new.xlsx")
+        old_seconds, old_peak = measure(materialized, molde_data, rows, old_path)
+        new_seconds, new_peak = measure(streaming, molde_data, rows, new_path)
+        same = pd.read_excel(old_path).equals(pd.read_excel(new_path))
+    print(f"{rows:>8} rows | materialized {old_seconds:6.1f}s peak {old_peak:7.1f} MB | "
+          f"streaming {new_seconds:6.1f}s peak {new_peak:7.1f} MB | "
+          f"{'identical workbooks' if same else 'WORKBOOKS DIFFER'}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 50000]
+    for size in sizes:
+        main(size)
@@ -0,0 +1,54 @@
+"""Time rendering a full catalog page: per-request card macros vs cached fragments.
+
+Usage (from the project root):
+    python benchmarks/bench_render.py [rows ...]
+"""
+import statistics
+import sys
+import time
+
+from synthetic import generate_catalog_frame
+
+from app import app
+from catalog import CatalogStore, clean_pieces_frame, frame_to_records
+from render_cache import FragmentCache
+from flask import render_template
+from markupsafe import Markup
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    """Return the median wall time of ``fn`` over ``repeat`` runs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def time_render(rows: int) -> None:
+    store = CatalogStore.from_records(frame_to_records(clean_pieces_frame(generate_catalog_frame(rows))), version="bench")
+    card = app.jinja_env.get_template("_card.html").module.card
+    fragments = FragmentCache(lambda: card)
+
+    with app.test_request_context("/"):
+        def per_request():
+            cards = Markup("".join(str(card(piece)) for piece in store.pieces))
+            return render_template("index.html", cards_html=cards, categories=store.categories, paged=False)
+
+        def cached():
+            return render_template("index.html", cards_html=fragments.join(store),
+                                   categories=store.categories, paged=False)
+
+        build_seconds = best_of(lambda: fragments.build(store), repeat=1)
+        before = best_of(per_request)
+        after = best_of(cached)
+        size_mb = len(cached()) / 1024 / 1024
+
+    print(f"{rows:>7} cards | per-request {before * 1000:8.1f} ms | fragments {after * 1000:7.1f} ms "
+          f"| {before / after:5.1f}x | one-time build {build_seconds * 1000:.0f} ms | {size_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    for size in [int(arg) for arg in sys.argv[1:]] or [4000]:
+        time_render(size)
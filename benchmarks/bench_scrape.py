@@ -0,0 +1,59 @@
+"""Compare the sequential scraper loop with the concurrent fetch engine.
+
+Both runs hit a local stub server and use the same politeness budget
+(``delay_range``), so the difference is how much network latency each
+one overlaps.
+
+Usage (from the project root):
+    python benchmarks/bench_scrape.py [moldes] [latency_seconds]
+"""
+import contextlib
+import io
+import sys
+import time
+
+import synthetic  # noqa: F401  (puts webscraping/ on sys.path)
+from scrape_moldes import scrape_multiple_moldes
+from scrape_telemetry import ScrapeTelemetry
+from stub_bricklink import start_stub_server
+
+# Scaled-down politeness budget: 10 requests/s instead of Bricklink's 0.5
+DELAY_RANGE = (0.05, 0.15)
+
+
+def run(moldes, base_url, server, concurrency):
+    """Scrape ``moldes`` once; return (seconds, results, requests, connections, latency stats)."""
+    requests_before, connections_before = server.requests, server.connections
+    telemetry = ScrapeTelemetry()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = scrape_multiple_moldes(moldes, delay_range=DELAY_RANGE, concurrency=concurrency,
+                                         base_url=base_url, telemetry=telemetry)
+    seconds = time.perf_counter() - start
+    return (seconds, results, server.requests - requests_before, server.connections - connections_before,
+            telemetry.summary()["latency"]["total"])
+
+
+def main(count: int, latency: float) -> None:
+    server, base_url = start_stub_server(latency)
+    moldes = [str(3000 + i) for i in range(count)]
+    budget = 2.0 / sum(DELAY_RANGE)
+    print(f"{count} moldes, {latency * 1000:.0f} ms latency, budget {budget:.1f} req/s")
+
+    baseline = None
+    for concurrency in (1, 2, 4, 8):
+        seconds, results, requests_made, connections, latency = run(moldes, base_url, server, concurrency)
+        ok = sum(1 for data in results.values() if data["name"] != "N/A")
+        if baseline is None:
+            baseline = results
+        same = "same results" if results == baseline and list(results) == moldes else "RESULTS DIFFER"
+        print(f"  concurrency {concurrency} | {seconds:6.2f}s | {count / seconds:5.1f} moldes/s "
+              f"| {requests_made / seconds:5.1f} req/s | {connections:3d} connections | "
+              f"p50 {latency['p50_ms']:5.0f} ms p95 {latency['p95_ms']:5.0f} ms | "
+              f"{ok}/{count} ok | {same}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 60, float(args[1]) if len(args) > 1 else 0.2)
@@ -0,0 +1,68 @@
+"""Compare catalog startup from Excel against the compiled snapshot.
+
+Then starts the app in a fresh interpreter per mode (default, and
+``CATALOG_FAST_START=1``) and reports its startup profile and the process
+age when the first ``/`` response is ready.
+
+Usage (from the project root):
+    python benchmarks/bench_startup.py [rows ...]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import PROJECT_ROOT, write_catalog_excel
+
+from catalog import load_catalog_records, read_snapshot, snapshot_path_for
+
+
+def time_startup(rows: int) -> None:
+    """Print cold (Excel) and warm (snapshot) load times for ``rows`` pieces."""
+    with tempfile.TemporaryDirectory() as tmp:
+        excel_path = write_catalog_excel(rows, os.path.join(tmp, "bricklink_pieces.xlsx"))
+
+        start = time.perf_counter()
+        load_catalog_records(excel_path)  # parses Excel, writes the snapshot
+        excel_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        records = read_snapshot(excel_path)
+        snapshot_seconds = time.perf_counter() - start
+
+        size_kb = os.path.getsize(snapshot_path_for(excel_path)) / 1024
+        print(f"{rows:>7} rows | excel {excel_seconds:7.3f}s | snapshot {snapshot_seconds:7.3f}s "
+              f"| {excel_seconds / snapshot_seconds:6.1f}x | snapshot {size_kb:,.0f} KB | {len(records)} loaded")
+        for fast_start in ("0", "1"):
+            time_cold_process(excel_path, fast_start)
+
+
+# Run in a fresh interpreter: import the app (warmup included), serve "/"
+COLD_PROCESS = """
+import contextlib, io, json, sys
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+response = app.app.test_client().get("/", headers={"Accept-Encoding": "gzip"})
+from startup import process_age
+print(json.dumps({"first_response": process_age(), "status": response.status_code,
+                  "pandas": "pandas" in sys.modules, "profile": app.startup_profile.summary_line()}))
+"""
+
+
+def time_cold_process(excel_path: str, fast_start: str) -> None:
+    """Print the startup profile of a new app process booting from the snapshot."""
+    env = dict(os.environ, CATALOG_PATH=excel_path, CATALOG_POLL_SECONDS="0", CATALOG_FAST_START=fast_start)
+    output = subprocess.run([sys.executable, "-c", COLD_PROCESS], cwd=PROJECT_ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    first = "?" if result["first_response"] is None else f"{result['first_response']:.3f}s"
+    print(f"        fast start {fast_start} | first response at {first} | pandas imported: {result['pandas']}")
+    print(f"          {result['profile']}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [4000, 100000]
+    for size in sizes:
+        time_startup(size)
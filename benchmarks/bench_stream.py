@@ -0,0 +1,69 @@
+"""Compare TTFB, total time and peak memory of buffered vs streamed index pages.
+
+Starts the app on a local werkzeug server and fetches ``/`` in full render
+mode. "buffered" clears the page cache before each request so the page is
+rendered in memory like an uncached hit; "streamed" uses CATALOG_STREAM.
+
+Usage (from the project root):
+    python benchmarks/bench_stream.py
+"""
+import http.client
+import statistics
+import threading
+import time
+import tracemalloc
+
+import synthetic  # noqa: F401  (puts the project root on sys.path)
+
+import app as webapp
+from werkzeug.serving import make_server
+
+
+def fetch(port: int):
+    """Return (ttfb, total, bytes) for one uncompressed GET /."""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    start = time.perf_counter()
+    conn.request("GET", "/", headers={"Accept-Encoding": "identity"})
+    response = conn.getresponse()
+    first = response.read(1)
+    ttfb = time.perf_counter() - start
+    rest = response.read()
+    total = time.perf_counter() - start
+    conn.close()
+    return ttfb, total, len(first) + len(rest)
+
+
+def peak_request_memory() -> float:
+    """Peak Python allocations (MB) while serving and draining one response."""
+    client = webapp.app.test_client()
+    webapp.page_cache.clear()
+    tracemalloc.start()
+    response = client.get("/", headers={"Accept-Encoding": "identity"})
+    for _ in response.response:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def run(label: str, stream: bool, port: int, repeat: int = 5) -> None:
+    webapp.STREAM_INDEX = stream
+    samples = []
+    for _ in range(repeat):
+        webapp.page_cache.clear()
+        samples.append(fetch(port))
+    ttfb = statistics.median(s[0] for s in samples) * 1000
+    total = statistics.median(s[1] for s in samples) * 1000
+    print(f"{label:<9} ttfb {ttfb:7.1f} ms | total {total:7.1f} ms | {samples[0][2] / 1024 / 1024:.1f} MB "
+          f"| peak request memory {peak_request_memory():6.1f} MB")
+
+
+if __name__ == "__main__":
+    webapp.RENDER_MODE = "full"
+    server = make_server("127.0.0.1", 0, webapp.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        run("buffered", False, server.port)
+        run("streamed", True, server.port)
+    finally:
+        server.shutdown()
@@ -0,0 +1,406 @@
+"""Benchmark suite: ingest, render, search and the scrape pipeline at scale.
+
+Every case runs on synthetic data (``synthetic.py``: real color, category
+and colors-per-mold mix) at each catalog size, in two variants:
+
+- ``cold``: first call, caches empty (no snapshot or ingest cache, fresh
+  store, empty page / search / scrape caches), timed once per repeat
+  after resetting them;
+- ``warm``: the same call again with the caches filled, median of the
+  repeats.
+
+Results are written as JSON keyed ``<case>/<size>/<variant>`` with sorted
+keys, one value per line, so two runs diff cleanly; ``--compare`` prints
+the ratio of each shared key against an earlier results file. The
+scraper case runs against a local stub server (``stub_bricklink.py``)
+serving full-size synthetic catalog pages, never the real Bricklink.
+
+Usage (from the project root):
+    python benchmarks/bench_suite.py [--sizes 4000,40000,400000] [--cases render,search]
+                                     [--repeat 5] [--output FILE] [--compare OLD.json]
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic
+from synthetic import PROJECT_ROOT
+
+from catalog import CatalogManager, CatalogStore, load_catalog, snapshot_path_for
+from catalog_sqlite import SqliteCatalogStore, write_sqlite
+from catalog_writer import write_catalog
+from generate_images import add_image_urls, batch_generate_image_urls, generate_image_url, image_url_chunks
+from process_categories import categorize_series, extract_category_from_name
+from scrape_cache import ScrapeCache
+from scrape_moldes import scrape_multiple_moldes
+from scrape_telemetry import ScrapeTelemetry
+from search_index import SearchIndex
+from stub_bricklink import start_stub_server
+from webscraping import app_catalog_format, merge_chunks, merge_molde_data_with_inventory, merge_molde_frame
+from xlsx_reader import read_workbook_columns
+
+DEFAULT_SIZES = [4000, 40000]
+CASES = ("ingest", "render", "search", "sqlite", "categorize", "images", "merge", "pipeline", "scrape")
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+
+# Typing a query letter by letter, then a few complete ones
+QUERIES = ["p", "pl", "pla", "plat", "plate", "plate 2", "plate 2x", "plate 2x4",
+           "red", "black tile", "slope 45", "technic liftarm", "3001", "round 1 x 1"]
+PIECE_QUERIES = [
+    {"category": "PLATE", "sort": "price"},
+    {"category": "BRICK", "sort": "name", "offset": 50},
+    {"q": "tile round", "sort": "default"},
+    {"q": "black", "category": "SLOPE", "sort": "-price"},
+]
+
+# Scraper fixture: molds, stub latency, page size and a scaled-down
+# politeness budget (100 requests/s instead of Bricklink's 0.5)
+SCRAPE_MOLDES = 200
+SCRAPE_LATENCY = 0.02
+SCRAPE_PAGE_KB = 200
+SCRAPE_DELAY_RANGE = (0.005, 0.015)
+SCRAPE_CONCURRENCY = 4
+CHUNK_ROWS = 5000
+
+
+def measure(run: Callable[[], Any], repeat: int, reset: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Median and min wall time of ``run`` over ``repeat`` calls (``reset`` untimed before each)."""
+    times = []
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {"seconds": round(statistics.median(times), 6), "min_seconds": round(min(times), 6), "runs": repeat}
+
+
+class Suite:
+    """Collects results as ``<case>/<size>/<variant>`` -> measurement."""
+
+    def __init__(self, repeat: int, cold_repeat: int):
+        self.repeat = repeat
+        self.cold_repeat = cold_repeat
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, size: int, run: Callable[[], Any],
+               reset: Optional[Callable[[], None]] = None, warm: bool = True) -> None:
+        """Time ``run`` cold (after ``reset``) and, unless ``warm`` is False, warm."""
+        with contextlib.redirect_stdout(io.StringIO()):
+            variants = {"cold": measure(run, self.cold_repeat, reset)}
+            if warm:
+                run()
+                variants["warm"] = measure(run, self.repeat)
+        for variant, result in variants.items():
+            self.results[f"{name}/{size}/{variant}"] = result
+            print(f"  {name:<42} {size:>7} {variant:<4} {result['seconds'] * 1000:10.2f} ms")
+
+
+class Fixture:
+    """Synthetic catalog, its workbooks and its inputs for one size."""
+
+    def __init__(self, rows: int, directory: str):
+        self.rows = rows
+        self.directory = directory
+        self.frame = synthetic.generate_catalog_frame(rows)
+        self.inventory = synthetic.inventory_frame(self.frame)
+        self.molde_data = synthetic.molde_data_for(self.frame)
+        self.catalog_path = synthetic.write_frame_excel(self.frame, os.path.join(directory, "bricklink_pieces.xlsx"))
+        self.inventory_path = synthetic.write_frame_excel(
+            self.inventory.rename(columns={"ID_COLOR": "ID", "ID_MOLDE": "ID MOLDE"}),
+            os.path.join(directory, "datos_inventario.xlsx"))
+        self.ingest_cache = os.path.join(directory, "ingest_cache")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.columns, self.version = load_catalog(self.catalog_path)
+
+    def remove_snapshot(self) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(snapshot_path_for(self.catalog_path))
+
+    def remove_ingest_cache(self) -> None:
+        shutil.rmtree(self.ingest_cache, ignore_errors=True)
+
+    def store(self) -> CatalogStore:
+        return CatalogStore(self.columns, version=self.version)
+
+    def inventory_chunks(self):
+        for start in range(0, self.rows, CHUNK_ROWS):
+            yield self.inventory.iloc[start:start + CHUNK_ROWS]
+
+
+def bench_ingest(suite: Suite, fixture: Fixture) -> None:
+    suite.record("ingest.load_catalog", fixture.rows, lambda: CatalogStore.load(fixture.catalog_path),
+                 reset=fixture.remove_snapshot)
+    suite.record("ingest.read_inventory", fixture.rows,
+                 lambda: read_workbook_columns(fixture.inventory_path, fixture.ingest_cache),
+                 reset=fixture.remove_ingest_cache)
+
+
+def bench_render(suite: Suite, fixture: Fixture) -> None:
+    os.environ["CATALOG_PATH"] = fixture.catalog_path
+    os.environ["CATALOG_POLL_SECONDS"] = "0"
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as webapp
+        webapp.catalog_manager = CatalogManager(fixture.catalog_path, poll_interval=0,
+                                                on_load=webapp.fragment_cache.build)
+        store = webapp.catalog_manager.current()
+    client = webapp.app.test_client()
+
+    def get_index():
+        response = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200, response.status_code
+
+    def new_version():
+        # Empty render caches: the request renders the cards it shows and the page
+        webapp.page_cache.clear()
+        webapp.fragment_cache._fragments.clear()
+
+    for mode in ("paged", "full"):
+        webapp.RENDER_MODE = mode
+        suite.record(f"render.index.{mode}", fixture.rows, get_index, reset=new_version)
+    webapp.RENDER_MODE = os.environ.get("CATALOG_RENDER_MODE", "paged")
+
+    def api_pieces():
+        for params in PIECE_QUERIES:
+            assert client.get("/api/pieces", query_string=dict(params, format="html")).status_code == 200
+
+    def fresh_store():
+        webapp.catalog_manager._store = fixture.store()
+        webapp.fragment_cache.build(webapp.catalog_manager._store)
+
+    suite.record("render.api_pieces", fixture.rows, api_pieces, reset=fresh_store)
+    webapp.catalog_manager._store = store
+
+
+def bench_search(suite: Suite, fixture: Fixture) -> None:
+    stores: List[CatalogStore] = []
+
+    def fresh_store():
+        stores[:] = [fixture.store()]
+
+    def search():
+        for query in QUERIES:
+            stores[0].search(query)
+
+    def query_rows():
+        for params in PIECE_QUERIES:
+            stores[0].query_rows(**params)
+
+    pieces = fixture.store().pieces
+    suite.record("search.build_index", fixture.rows, lambda: SearchIndex(pieces), warm=False)
+    suite.record("search.search", fixture.rows, search, reset=fresh_store)
+    suite.record("search.query_rows", fixture.rows, query_rows, reset=fresh_store)
+
+
+def bench_sqlite(suite: Suite, fixture: Fixture) -> None:
+    path = os.path.join(fixture.directory, "bricklink_pieces.sqlite")
+    suite.record("sqlite.write_sqlite", fixture.rows, lambda: write_sqlite(fixture.columns, path, fixture.version),
+                 warm=False)
+    stores: List[SqliteCatalogStore] = []
+
+    def fresh_store():
+        # New connections: SQLite's page cache starts empty (the OS cache does not)
+        stores[:] = [SqliteCatalogStore(path)]
+
+    def search():
+        for query in QUERIES:
+            stores[0].query_rows(q=query)
+
+    def query_rows():
+        for params in PIECE_QUERIES:
+            stores[0].query_rows(**params)
+
+    suite.record("sqlite.open", fixture.rows, lambda: SqliteCatalogStore(path), warm=False)
+    suite.record("sqlite.search", fixture.rows, search, reset=fresh_store)
+    suite.record("sqlite.query_rows", fixture.rows, query_rows, reset=fresh_store)
+
+
+def bench_categorize(suite: Suite, fixture: Fixture) -> None:
+    names = fixture.frame["Piece_Name"]
+    name_list = names.tolist()
+    suite.record("categorize.extract_category_from_name", fixture.rows,
+                 lambda: [extract_category_from_name(name) for name in name_list])
+    suite.record("categorize.categorize_series", fixture.rows, lambda: categorize_series(names))
+
+
+def bench_images(suite: Suite, fixture: Fixture) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        merged = merge_molde_frame(fixture.molde_data, fixture.inventory)
+    pieces = merged.to_dict(orient="records")
+    arguments = list(zip(merged["ID_MOLDE"], merged["Color"], merged["ID_COLOR"]))
+    suite.record("images.generate_image_url", fixture.rows,
+                 lambda: [generate_image_url(*args) for args in arguments])
+    suite.record("images.batch_generate_image_urls", fixture.rows,
+                 lambda: batch_generate_image_urls([dict(piece) for piece in pieces]))
+    suite.record("images.add_image_urls", fixture.rows, lambda: add_image_urls(merged))
+
+
+def bench_merge(suite: Suite, fixture: Fixture) -> None:
+    inventory_pieces = fixture.inventory.to_dict(orient="records")
+    suite.record("merge.merge_molde_data_with_inventory", fixture.rows,
+                 lambda: merge_molde_data_with_inventory(fixture.molde_data, inventory_pieces))
+    suite.record("merge.merge_molde_frame", fixture.rows,
+                 lambda: merge_molde_frame(fixture.molde_data, fixture.inventory))
+
+
+def bench_pipeline(suite: Suite, fixture: Fixture) -> None:
+    output_path = os.path.join(fixture.directory, "pipeline", "bricklink_pieces.xlsx")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    suite.record("pipeline.merge_images_write", fixture.rows, lambda: write_catalog(
+        image_url_chunks(merge_chunks(fixture.molde_data, fixture.inventory_chunks())), app_catalog_format(),
+        output_path),
+        warm=False)
+
+
+def bench_scrape(suite: Suite, directory: str) -> None:
+    server, base_url = start_stub_server(SCRAPE_LATENCY, SCRAPE_PAGE_KB)
+    moldes = [str(3000 + i) for i in range(SCRAPE_MOLDES)]
+    for molde in moldes:
+        server.page(molde)  # build the pages outside the timed runs
+    caches: List[ScrapeCache] = []
+    runs: List[Dict[str, Any]] = []
+
+    def empty_cache():
+        for cache in caches:
+            cache.close()
+        path = os.path.join(directory, "scrape_cache.sqlite")
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        caches[:] = [ScrapeCache(path)]
+
+    def scrape():
+        telemetry = ScrapeTelemetry()
+        requests_before = server.requests
+        results = scrape_multiple_moldes(moldes, delay_range=SCRAPE_DELAY_RANGE, concurrency=SCRAPE_CONCURRENCY,
+                                         base_url=base_url, cache=caches[0], telemetry=telemetry)
+        assert all(data["name"] != "N/A" for data in results.values())
+        latency = telemetry.summary()["latency"]["total"]
+        runs.append({"requests": server.requests - requests_before,
+                     "p50_ms": latency.get("p50_ms"), "p95_ms": latency.get("p95_ms")})
+
+    # Cold: empty scrape cache, every mold fetched; warm: every mold cached
+    suite.record("scrape.scrape_multiple_moldes", SCRAPE_MOLDES, scrape, reset=empty_cache)
+    suite.results[f"scrape.scrape_multiple_moldes/{SCRAPE_MOLDES}/cold"].update(runs[0])
+    suite.results[f"scrape.scrape_multiple_moldes/{SCRAPE_MOLDES}/warm"].update(runs[-1])
+    for cache in caches:
+        cache.close()
+    server.shutdown()
+
+
+SIZED_CASES = {
+    "ingest": bench_ingest,
+    "render": bench_render,
+    "search": bench_search,
+    "sqlite": bench_sqlite,
+    "categorize": bench_categorize,
+    "images": bench_images,
+    "merge": bench_merge,
+    "pipeline": bench_pipeline,
+}
+
+
+def run_metadata(sizes: List[int], repeat: int) -> Dict[str, Any]:
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "sizes": sizes,
+        "repeat": repeat,
+    }
+
+
+def compare(old_path: str, results: Dict[str, Dict[str, Any]], threshold: float = 0.1) -> None:
+    """Print new/old time for every key in both runs, flagging changes over ``threshold``."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    print(f"\nCompared with {old_path} (commit {str(old['meta'].get('commit'))[:12]}):")
+    for key in sorted(set(old["results"]) & set(results)):
+        before, after = old["results"][key]["seconds"], results[key]["seconds"]
+        ratio = after / before if before else float("inf")
+        flag = "  slower" if ratio > 1 + threshold else "  faster" if ratio < 1 - threshold else ""
+        print(f"  {key:<52} {before * 1000:10.2f} -> {after * 1000:10.2f} ms  {ratio:5.2f}x{flag}")
+
+
+def parse_sizes(value: str) -> List[int]:
+    """Parse ``4000,40000`` (raises ValueError if invalid)."""
+    sizes = [int(part) for part in value.split(",") if part.strip()]
+    if not sizes or min(sizes) <= 0:
+        raise ValueError(f"invalid sizes {value!r}")
+    return sizes
+
+
+def parse_cases(value: str) -> List[str]:
+    """Parse ``render,search`` (raises ValueError for unknown cases)."""
+    cases = [part.strip() for part in value.split(",") if part.strip()]
+    unknown = sorted(set(cases) - set(CASES))
+    if unknown or not cases:
+        raise ValueError(f"unknown cases {', '.join(unknown)}; expected {', '.join(CASES)}")
+    return cases
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=parse_sizes, default=DEFAULT_SIZES,
+                        help="catalog sizes (default 4000,40000; add 400000 for the large run)")
+    parser.add_argument("--cases", type=parse_cases, default=list(CASES),
+                        help=f"cases to run (default all: {','.join(CASES)})")
+    parser.add_argument("--repeat", type=int, default=5, help="warm runs per case (median reported)")
+    parser.add_argument("--cold-repeat", type=int, default=1, help="cold runs per case")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="results file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    suite = Suite(args.repeat, args.cold_repeat)
+    meta = run_metadata(args.sizes, args.repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            cases = [case for case in args.cases if case in SIZED_CASES]
+            if not cases:
+                break
+            print(f"{size} pieces")
+            directory = os.path.join(tmp, str(size))
+            os.makedirs(directory)
+            fixture = Fixture(size, directory)
+            for case in cases:
+                SIZED_CASES[case](suite, fixture)
+        if "scrape" in args.cases:
+            print(f"scraper ({SCRAPE_MOLDES} molds, stub server)")
+            bench_scrape(suite, tmp)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{(meta['commit'] or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": suite.results}, f, indent=1, sort_keys=True)
+        f.write("\n")
+    print(f"Results written to {output}")
+    if args.compare:
+        compare(args.compare, suite.results)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
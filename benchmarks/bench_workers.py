@@ -0,0 +1,85 @@
+"""Measure per-worker memory for gunicorn with and without preload.
+
+Starts gunicorn with ``gunicorn_config.py`` at several worker counts,
+sends some traffic, then reads RSS and PSS (shared pages split between
+the processes mapping them) from /proc for the master and each worker.
+Linux only.
+
+Usage (from the project root):
+    python benchmarks/bench_workers.py [rows]
+"""
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from synthetic import PROJECT_ROOT, write_catalog_excel
+
+from catalog import load_catalog_records
+
+
+def smaps_kb(pid: int) -> dict:
+    """Return Rss/Pss in kB from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def children(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_until_up(port: int, timeout: float = 120) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/catalog/version", timeout=2).read()
+            return
+        except OSError:
+            time.sleep(0.3)
+    raise RuntimeError("gunicorn did not come up")
+
+
+def measure(workers: int, preload: bool, catalog_path: str, port: int) -> None:
+    env = dict(os.environ, PORT=str(port), CATALOG_PATH=catalog_path,
+               GUNICORN_PRELOAD="1" if preload else "0", CATALOG_POLL_SECONDS="0")
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_config.py", "-w", str(workers), "app:app"],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(port)
+        # Wait for every worker to finish booting, then hit each a few times
+        while len(children(master.pid)) < workers:
+            time.sleep(0.2)
+        time.sleep(1)
+        for path in ["/", "/api/pieces?q=plate", "/api/pieces?category=BRICK&offset=50"] * (4 * workers):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=30).read()
+
+        master_mem = smaps_kb(master.pid)
+        worker_mem = [smaps_kb(pid) for pid in children(master.pid)]
+        rss = sum(m["Rss"] for m in worker_mem) / len(worker_mem) / 1024
+        pss = sum(m["Pss"] for m in worker_mem) / len(worker_mem) / 1024
+        total_pss = (master_mem["Pss"] + sum(m["Pss"] for m in worker_mem)) / 1024
+        print(f"{'preload' if preload else 'per-worker':<10} {workers} workers | "
+              f"RSS/worker {rss:6.1f} MB | PSS/worker {pss:6.1f} MB | total PSS {total_pss:7.1f} MB")
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = write_catalog_excel(rows, os.path.join(tmp, "bricklink_pieces.xlsx"))
+        load_catalog_records(catalog_path)  # build the snapshot once up front
+        for preload in (False, True):
+            for workers in (1, 2, 4, 8):
+                measure(workers, preload, catalog_path, 18000 + workers + (100 if preload else 0))
@@ -0,0 +1,81 @@
+"""Local stand-in for Bricklink catalog pages, for scraper benchmarks.
+
+Serves ``/v2/catalog/catalogitem.page?P=<id>`` with the two elements the
+scraper reads, after a fixed artificial latency, and counts requests and
+new connections so keep-alive reuse can be checked. With ``page_kb`` the
+pages are full-size synthetic catalog pages (``synthetic.generate_molde_page``)
+so parsing costs what it does on the real site.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+import threading
+import time
+
+from synthetic import generate_molde_page
+
+PAGE_TEMPLATE = """<html><head><title>{id}</title></head><body>
+<h1 id="item-name-title">Stub Plate {id} x 4</h1>
+<span id="item-weight-info">0.{id}g</span>
+</body></html>"""
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def do_GET(self) -> None:
+        with self.server.stats_lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        piece_id = parse_qs(urlparse(self.path).query).get("P", [""])[0]
+        if not piece_id or piece_id.startswith("missing"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self.server.page(piece_id)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start_stub_server(latency: float = 0.2, page_kb: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub server on a free port in a daemon thread.
+
+    Args:
+        latency: Seconds each response is delayed.
+        page_kb: Serve synthetic catalog pages of about this size instead
+            of the minimal page (built once per ID).
+
+    Returns:
+        The server (``requests`` / ``connections`` counters, ``shutdown()``)
+        and its base URL.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.requests = 0
+    server.connections = 0
+    server.stats_lock = threading.Lock()
+    pages = {}
+
+    def page(piece_id: str) -> bytes:
+        body = pages.get(piece_id)
+        if body is None:
+            html = generate_molde_page(piece_id, page_kb) if page_kb else PAGE_TEMPLATE.format(id=piece_id)
+            body = pages[piece_id] = html.encode("utf-8")
+        return body
+
+    server.page = page
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
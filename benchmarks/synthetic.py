@@ -0,0 +1,211 @@
+"""Synthetic catalog generator for the RekuBricks benchmarks.
+
+Builds frames shaped like ``data/bricklink_pieces.xlsx`` at any size so
+ingest and render paths can be timed beyond the real ~4k inventory, with
+the color, category and colors-per-mold mix of the real catalog, plus
+catalog pages for the scraper fixtures.
+"""
+from typing import Any, Dict, List
+import os
+import random
+import sys
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "webscraping"))
+sys.path.insert(0, PROJECT_ROOT)
+
+from categories import categories  # noqa: E402
+from color_ids import color_ids  # noqa: E402
+from xlsx_writer import XlsxStreamWriter  # noqa: E402
+
+SHAPES: List[str] = ["1 x 1", "1 x 2", "1 x 4", "2 x 2", "2 x 4", "1 x 6", "4 x 4", "6 x 8"]
+SUFFIXES: List[str] = ["", " with Groove", ", Round", " with Stud on Side", ", Modified", " Inverted"]
+
+# Share of catalog rows per color and category in the real inventory; the
+# colors and categories not listed share what is left along a 1/rank tail
+COLOR_SHARES: Dict[str, float] = {
+    "BLACK": 0.112, "LIGHT BLUISH GRAY": 0.102, "WHITE": 0.087, "DARK BLUISH GRAY": 0.083,
+    "RED": 0.055, "REDDISH BROWN": 0.048, "YELLOW": 0.041, "TAN": 0.038, "BLUE": 0.033,
+    "GREEN": 0.024, "LIME": 0.022, "ORANGE": 0.018,
+}
+CATEGORY_SHARES: Dict[str, float] = {
+    "PLATE": 0.271, "MISCELLANEOUS": 0.183, "BRICK": 0.163, "SLOPE": 0.116, "TILE": 0.105,
+    "MINIFIGURE": 0.049, "BAR": 0.029, "CONNECTOR": 0.018, "LIFTARM": 0.018, "PANEL": 0.015,
+    "PLANT": 0.012, "VEHICLE": 0.009,
+}
+# Color variants per mold: most molds come in one color, a few in dozens
+VARIANTS_PER_MOLD: Dict[int, float] = {
+    1: 0.42, 2: 0.14, 3: 0.09, 4: 0.07, 5: 0.05, 6: 0.045, 7: 0.04, 8: 0.03, 9: 0.02,
+    12: 0.04, 20: 0.03, 40: 0.02,
+}
+# Name patterns per category; names whose category only shows up later in
+# the name and MISCELLANEOUS names (no category word at all) are included
+NAME_TEMPLATES: Dict[str, List[str]] = {
+    "PLATE": ["Plate {shape}{suffix}", "Plate, Round {shape}", "Plate, Modified {shape} with Clip"],
+    "BRICK": ["Brick {shape}{suffix}", "Brick, Round {shape}", "Brick, Modified {shape} with Studs on Side"],
+    "SLOPE": ["Slope 45 {shape}", "Slope, Inverted 33 {shape}", "Slope 30 {shape}{suffix}"],
+    "TILE": ["Tile {shape}", "Tile, Round {shape}", "Tile, Modified {shape} with Bar Handle"],
+    "MISCELLANEOUS": ["Technic, Pin with Friction Ridges", "Hinge {shape} Locking", "Wedge {shape} Right",
+                      "Window {shape} Frame", "Door {shape} Left", "Wheel 18mm D. x {shape}",
+                      "Technic, Axle {shape}", "Fence {shape} Spindled"],
+    "MINIFIGURE": ["Minifigure, Utensil {shape}", "Minifigure, Headgear Hair Short", "Minifigure, Weapon Sword"],
+    "BAR": ["Bar {shape} with Clip", "Bar Holder with Clip"],
+    "CONNECTOR": ["Technic Connector, Pin with Bushing", "Technic Connector, Axle {shape}"],
+    "LIFTARM": ["Technic, Liftarm Thick {shape}", "Technic, Liftarm Thin {shape}"],
+    "PANEL": ["Panel {shape} with Side Supports", "Panel {shape} Rounded Corner"],
+    "PLANT": ["Plant, Flower Stem", "Plant Leaves {shape}"],
+    "VEHICLE": ["Vehicle, Mudguard {shape}", "Vehicle, Base {shape}"],
+}
+
+
+def _shares(names: List[str], listed: Dict[str, float]) -> np.ndarray:
+    """Probability of each name: ``listed`` shares, Zipf tail for the rest."""
+    rest = [name for name in names if name not in listed]
+    # The tail continues the ranks after the listed names
+    tail = 1 / np.arange(len(listed) + 1, len(listed) + len(rest) + 1)
+    weights = dict(listed)
+    weights.update(zip(rest, max(0.0, 1 - sum(listed.values())) * tail / tail.sum()))
+    shares = np.array([weights[name] for name in names])
+    return shares / shares.sum()
+
+
+def generate_catalog_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Return a frame with the exported catalog columns and ``rows`` rows.
+
+    Rows are grouped by mold like the real catalog: each mold gets one
+    category, name, weight and price and ``VARIANTS_PER_MOLD`` distinct
+    colors, drawn with the ``COLOR_SHARES`` / ``CATEGORY_SHARES`` mix.
+    """
+    rng = np.random.default_rng(seed)
+    colors = list(color_ids)
+    variants = np.array(list(VARIANTS_PER_MOLD))
+    counts = rng.choice(variants, size=max(rows, 1), p=_shares(list(VARIANTS_PER_MOLD), VARIANTS_PER_MOLD))
+    moldes = int(np.searchsorted(np.cumsum(counts), rows)) + 1
+    counts = counts[:moldes]
+    counts[-1] -= counts.sum() - rows
+
+    # Weighted sampling of distinct colors per mold: the top keys of
+    # log(share) + Gumbel noise
+    keys = np.log(_shares(colors, COLOR_SHARES)) + rng.gumbel(size=(moldes, len(colors)))
+    color_codes = np.argsort(-keys, axis=1)[np.arange(len(colors)) < counts[:, None]]
+
+    molde_categories = rng.choice(categories, size=moldes, p=_shares(categories, CATEGORY_SHARES))
+    picks = rng.random(moldes).tolist()
+    shapes = rng.choice(SHAPES, size=moldes).tolist()
+    suffixes = rng.choice(SUFFIXES, size=moldes).tolist()
+    lettered = (rng.random(moldes) < 0.05).tolist()
+    id_moldes, names = [], []
+    for i, category in enumerate(molde_categories.tolist()):
+        id_moldes.append(f"{3000 + i}b" if lettered[i] else str(3000 + i))
+        templates = NAME_TEMPLATES.get(category, [category.title() + " {shape}{suffix}"])
+        names.append(templates[int(picks[i] * len(templates))].format(shape=shapes[i], suffix=suffixes[i]))
+    weights = [f"{weight:.2f}g" for weight in rng.lognormal(-0.5, 1.0, size=moldes)]
+    prices = np.round(rng.uniform(0.5, 25, size=moldes), 2)
+
+    def per_row(values) -> List:
+        return np.repeat(np.asarray(values, dtype=object), counts).tolist()
+
+    row_moldes = per_row(id_moldes)
+    row_colors = [colors[code] for code in color_codes.tolist()]
+    return pd.DataFrame({
+        "Piece_ID": row_moldes,
+        "ID_COLOR": "",
+        "ID_MOLDE": row_moldes,
+        "Piece_Name": per_row(names),
+        "Color": [color.title() for color in row_colors],
+        "Image_URL": [f"https://img.bricklink.com/P/{color_ids[color]}/{id_molde}.jpg"
+                      for color, id_molde in zip(row_colors, row_moldes)],
+        "Weight": per_row(weights),
+        "Category": per_row(molde_categories),
+        "Price": np.repeat(prices, counts),
+    })
+
+
+def inventory_frame(catalog: pd.DataFrame) -> pd.DataFrame:
+    """The inventory (``import_inventory_frame()`` shape) a catalog was built from."""
+    return pd.DataFrame({"ID_COLOR": catalog["ID_COLOR"], "ID_MOLDE": catalog["ID_MOLDE"],
+                         "COLOR": catalog["Color"].str.upper()})
+
+
+def molde_data_for(catalog: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """Scraped data (``scrape_multiple_moldes()`` shape) for the molds of a catalog."""
+    first = catalog.drop_duplicates("ID_MOLDE")
+    return {id_molde: {"name": name, "weight": weight, "category": category}
+            for id_molde, name, weight, category in zip(first["ID_MOLDE"], first["Piece_Name"],
+                                                         first["Weight"], first["Category"])}
+
+
+def write_catalog_excel(rows: int, path: str, seed: int = 42) -> str:
+    """Write a synthetic catalog workbook and return its path."""
+    write_frame_excel(generate_catalog_frame(rows, seed), path)
+    return path
+
+
+def write_frame_excel(df: pd.DataFrame, path: str) -> str:
+    """Write a frame as a one-sheet workbook (header + rows), like ``to_excel``."""
+    writer = XlsxStreamWriter(path)
+    writer.append(list(df.columns))
+    writer.write_frame(df)
+    writer.close()
+    return path
+
+
+# Markup variants seen around the two elements the scraper reads
+_NAME_TEMPLATES: List[str] = [
+    '<h1 id="item-name-title">{name}</h1>',
+    '<h1 class="item-title" id="item-name-title" style="margin:0">\n    {name}\n</h1>',
+    "<h1 id='item-name-title'><span class=\"ldr\">{name}</span></h1>",
+]
+_WEIGHT_TEMPLATES: List[str] = [
+    '<span id="item-weight-info">{weight}</span>',
+    '<span class="info" id="item-weight-info">&nbsp;{weight}<br/></span>',
+    "",  # page without a weight
+]
+
+
+def generate_molde_page(id_molde: str, size_kb: int = 200, seed: int = 42) -> str:
+    """Return a catalog-page-like HTML document of roughly ``size_kb`` KB.
+
+    The bulk is scripts, styles and price-guide tables like the real page;
+    the name and weight elements vary in attribute order, quoting, nesting
+    and entities so parsers can be checked against BeautifulSoup.
+    """
+    rng = random.Random(f"{seed}-{id_molde}")
+    shape = rng.choice(SHAPES)
+    name = rng.choice([f"Plate {shape}", f"Brick {shape}{rng.choice(SUFFIXES)}",
+                       f"Tile, Round {shape} &amp; Hole", f"Slope 45&deg; {shape}"])
+    weight = f"{rng.uniform(0.05, 5):.2f}g"
+
+    head = ["<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Bricklink</title>"]
+    head.append("<style>" + " ".join(f".c{i}{{margin:{i}px;padding:0}}" for i in range(400)) + "</style>")
+    head.append("<script>var blo = {" + ",".join(f"k{i}:'{i * 7}'" for i in range(300))
+                + "}; if (a < b && c > d) { x = '<h1>'; }</script></head><body>")
+    nav = "<nav>" + "".join(f'<a href="/c/{i}" class="nav">Category {i}</a>' for i in range(80)) + "</nav>"
+    item = (f"<!-- item {id_molde} --><div id=\"item-header\" data-id=\"item-name-title\">"
+            + rng.choice(_NAME_TEMPLATES).format(name=name)
+            + "<table><tr><td>Item No:</td><td>" + id_molde + "</td></tr><tr><td>Weight:</td><td>"
+            + rng.choice(_WEIGHT_TEMPLATES).format(weight=weight) + "</td></tr></table></div>")
+
+    body = [nav, item]
+    size = sum(map(len, head)) + len(nav) + len(item)
+    row = 0
+    while size < size_kb * 1024:
+        cells = "".join(f"<td class=\"pg\">{rng.uniform(0.01, 3):.3f}</td>" for _ in range(8))
+        chunk = f"<tr id=\"pg-{row}\"><td><img src=\"/img/{row}.png\" alt=\"\"></td>{cells}</tr>"
+        body.append(chunk)
+        size += len(chunk)
+        row += 1
+    return "".join(head) + "".join(body[:2]) + "<table>" + "".join(body[2:]) + "</table></body></html>"
+
+
+def write_molde_fixtures(directory: str, count: int, size_kb: int = 200) -> str:
+    """Write ``count`` synthetic catalog pages as ``<id_molde>.html`` files."""
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        id_molde = str(3000 + i)
+        with open(os.path.join(directory, f"{id_molde}.html"), "w", encoding="utf-8") as f:
+            f.write(generate_molde_page(id_molde, size_kb))
+    return directory
@@ -0,0 +1,590 @@
+"""Catalog loading for the RekuBricks web application.
+
+Cleans the piece data exported by the webscraper, keeps a compiled
+snapshot next to the Excel file so workers don't have to parse the
+workbook with openpyxl on every boot, and exposes the result through
+an immutable ``CatalogStore``.
+"""
+from array import array
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+import hashlib
+import os
+import pickle
+import threading
+import time
+import numpy as np
+from columnar import ColumnarPieces
+from search_index import SearchIndex
+
+if TYPE_CHECKING:
+    # Imported where needed: a server booting from the snapshot never
+    # parses the workbook and so never pays for importing pandas
+    import pandas as pd
+
+# Bump whenever the cleaning rules or the payload layout change so old
+# snapshots are rebuilt instead of loaded.
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".pkl"
+
+
+def snapshot_path_for(excel_path: str) -> str:
+    """Return the snapshot path that lives next to the given Excel file."""
+    return os.path.splitext(excel_path)[0] + SNAPSHOT_SUFFIX
+
+
+def file_digest(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def clean_pieces_frame(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Apply defensive defaults and drop rows the catalog cannot show.
+
+    Shared by the app and the scraper pipeline so the snapshot written by
+    either side is identical.
+    """
+    import pandas as pd
+
+    df = df.copy()
+
+    # Handle missing Price column gracefully
+    if "Price" not in df.columns:
+        df["Price"] = 0.0
+
+    # Handle missing Category column gracefully
+    if "Category" not in df.columns:
+        df["Category"] = "Otros"
+
+    # Handle missing ID columns gracefully (for backward compatibility)
+    if "ID_COLOR" not in df.columns:
+        df["ID_COLOR"] = ""
+    if "ID_MOLDE" not in df.columns:
+        df["ID_MOLDE"] = df["Piece_ID"]  # Use Piece_ID as fallback
+
+    # Clean and validate data
+    df = df.dropna(subset=['Piece_ID', 'Piece_Name'])  # Remove rows without essential data
+    df['Price'] = pd.to_numeric(df['Price'], errors='coerce').fillna(0.0)  # Convert price to numeric
+    df['Image_URL'] = df['Image_URL'].fillna('N/A')  # Handle missing images
+    df['Color'] = df['Color'].fillna('Sin color')  # Handle missing colors
+    df['Category'] = df['Category'].fillna('Sin categoría')  # Handle missing categories
+    df['ID_COLOR'] = df['ID_COLOR'].fillna('')  # Handle missing ID_COLOR
+    df['ID_MOLDE'] = df['ID_MOLDE'].fillna('')  # Handle missing ID_MOLDE
+
+    # Convert to string and clean special characters
+    df['Piece_ID'] = df['Piece_ID'].astype(str).str.strip() # TODO: consieder using only ID_MOLDE+COLOR instead
+    df['Piece_Name'] = df['Piece_Name'].astype(str).str.strip()
+    df['Color'] = df['Color'].astype(str).str.strip()
+    df['Category'] = df['Category'].astype(str).str.strip()
+    df['Image_URL'] = df['Image_URL'].astype(str).str.strip()
+    df['ID_COLOR'] = df['ID_COLOR'].astype(str).str.strip().replace('nan', '')  # Convert NaN string to empty
+    df['ID_MOLDE'] = df['ID_MOLDE'].astype(str).str.strip().replace('nan', '')  # Convert NaN string to empty
+
+    # Remove any rows where essential fields are empty after cleaning
+    df = df[df['Piece_ID'] != '']
+    df = df[df['Piece_Name'] != '']
+    df = df[df['Image_URL'] != '']
+    df = df[df['Image_URL'] != 'N/A']
+
+    return df
+
+
+def frame_to_records(df: "pd.DataFrame") -> List[Dict[str, Any]]:
+    """Convert a cleaned frame to plain row dicts (no numpy scalars)."""
+    return df.to_dict(orient="records")
+
+
+def frame_to_columns(df: "pd.DataFrame") -> Dict[str, List[Any]]:
+    """Convert a cleaned frame to column name -> list of plain values."""
+    return {col: df[col].tolist() for col in df.columns}
+
+
+def write_snapshot(records: List[Dict[str, Any]], excel_path: str,
+                   snapshot_path: Optional[str] = None,
+                   source_digest: Optional[str] = None) -> str:
+    """Write cleaned records as a versioned snapshot tied to ``excel_path``.
+
+    See ``write_column_snapshot``; this is the row-dict entry point used
+    by the scraper pipeline.
+    """
+    columns = list(records[0].keys()) if records else []
+    return write_column_snapshot({col: [row[col] for row in records] for col in columns},
+                                 excel_path, snapshot_path, source_digest)
+
+
+def write_column_snapshot(columns: Mapping[str, List[Any]], excel_path: str,
+                          snapshot_path: Optional[str] = None,
+                          source_digest: Optional[str] = None) -> str:
+    """Write cleaned columns as a versioned snapshot tied to ``excel_path``.
+
+    The payload is stored column-wise and records the digest of the source
+    workbook, so a snapshot is only trusted for the exact file it was built
+    from. The write goes through a temp file and ``os.replace`` so readers
+    never see a partial snapshot.
+
+    Returns:
+        Path of the written snapshot.
+    """
+    if snapshot_path is None:
+        snapshot_path = snapshot_path_for(excel_path)
+    if source_digest is None and os.path.exists(excel_path):
+        source_digest = file_digest(excel_path)
+
+    names = list(columns)
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "source_digest": source_digest,
+        "columns": names,
+        "data": {col: list(columns[col]) for col in names},
+        "rows": len(columns[names[0]]) if names else 0,
+    }
+
+    tmp_path = f"{snapshot_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_path
+
+
+def _read_snapshot_payload(excel_path: str, snapshot_path: str) -> Optional[Dict[str, Any]]:
+    """Return the snapshot payload if it is current for ``excel_path``."""
+    if not os.path.exists(snapshot_path):
+        return None
+
+    try:
+        with open(snapshot_path, "rb") as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {snapshot_path}: {e}")
+        return None
+
+    if not isinstance(payload, dict) or payload.get("version") != SNAPSHOT_VERSION:
+        return None
+    if os.path.exists(excel_path) and payload.get("source_digest") != file_digest(excel_path):
+        return None
+    return payload
+
+
+def _payload_records(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rebuild row dicts from a column-wise snapshot payload."""
+    columns = payload["columns"]
+    data = payload["data"]
+    return [dict(zip(columns, row)) for row in zip(*(data[col] for col in columns))]
+
+
+def read_snapshot(excel_path: str, snapshot_path: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """Load records from the snapshot if it is current for ``excel_path``.
+
+    Returns None when the snapshot is missing, was written by another
+    snapshot version, or was built from a different workbook. When the
+    workbook itself is missing, an existing snapshot is used as-is.
+    """
+    if snapshot_path is None:
+        snapshot_path = snapshot_path_for(excel_path)
+    payload = _read_snapshot_payload(excel_path, snapshot_path)
+    return _payload_records(payload) if payload is not None else None
+
+
+def load_catalog(excel_path: str,
+                 phases: Optional[Dict[str, float]] = None) -> Tuple[Dict[str, List[Any]], str]:
+    """Load cleaned piece columns, preferring a current snapshot.
+
+    Falls back to parsing the Excel file when the snapshot is stale or
+    missing, and regenerates the snapshot from the freshly cleaned data.
+
+    Args:
+        excel_path: The catalog workbook.
+        phases: If given, the wall time of each step ("catalog read",
+            "cleaning", "snapshot write") is stored in it.
+
+    Returns:
+        Column name -> values, and the SHA-256 digest of the workbook they
+        came from.
+    """
+    phases = {} if phases is None else phases
+    start = time.perf_counter()
+    snapshot_path = snapshot_path_for(excel_path)
+    payload = _read_snapshot_payload(excel_path, snapshot_path)
+    if payload is not None:
+        columns = {col: payload["data"][col] for col in payload["columns"]}
+        phases["catalog read"] = time.perf_counter() - start
+        print(f"Loaded {payload['rows']} pieces from snapshot {snapshot_path}")
+        return columns, payload.get("source_digest") or ""
+
+    print("Loading pieces from Excel (snapshot missing or stale)...")
+    import pandas as pd
+
+    source_digest = file_digest(excel_path)
+    df = pd.read_excel(excel_path)
+    phases["catalog read"] = time.perf_counter() - start
+    start = time.perf_counter()
+    columns = frame_to_columns(clean_pieces_frame(df))
+    phases["cleaning"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        path = write_column_snapshot(columns, excel_path, snapshot_path, source_digest)
+        print(f"Wrote catalog snapshot {path}")
+    except OSError as e:
+        # Read-only deployments still serve from the Excel file
+        print(f"Could not write catalog snapshot: {e}")
+    phases["snapshot write"] = time.perf_counter() - start
+
+    return columns, source_digest
+
+
+def load_catalog_records(excel_path: str) -> List[Dict[str, Any]]:
+    """Load cleaned piece records, preferring a current snapshot."""
+    columns, _ = load_catalog(excel_path)
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*(columns[col] for col in names))]
+
+
+# Orderings accepted by CatalogStore.query
+SORT_OPTIONS: Tuple[str, ...] = ("default", "name", "price", "-price", "id")
+
+
+def piece_key(piece: Mapping[str, Any]) -> str:
+    """Return the composite cart key for a piece (matches the card's data-id)."""
+    color_slug = str(piece["Color"]).replace(" ", "-").replace("/", "-").lower()
+    return f"{piece['Piece_ID']}-{color_slug}"
+
+
+class CatalogStore:
+    """Immutable view of the cleaned catalog and its derived structures.
+
+    Built from one parse of the source in a single pass, so the piece list,
+    the category filter and every lookup always agree with each other.
+    Pieces are held column-wise (see ``columnar.py``) and row positions are
+    kept in ``array('I')`` buffers, so a large catalog costs a few bytes per
+    field instead of a dict per piece.
+
+    Attributes:
+        version: Identifier of the source content the store was built from.
+        load_seconds: Wall time spent loading and indexing the catalog.
+        load_phases: Step name -> wall time of that load (see ``load``).
+        loaded_at: Unix timestamp of when the store was built.
+        pieces: Read-only row mappings in source order.
+        categories: Sorted categories that have at least one piece.
+        category_counts: Category -> number of pieces.
+        category_index: Category -> row positions in ``pieces``.
+    """
+
+    def __init__(self, columns: Mapping[str, Sequence[Any]], version: str = "",
+                 load_seconds: float = 0.0):
+        pieces = ColumnarPieces(columns)
+        counts: Dict[str, int] = {}
+        category_rows: Dict[str, array] = {}
+        by_key: Dict[str, int] = {}
+
+        piece_ids = pieces.column("Piece_ID") if len(pieces) else []
+        colors = pieces.column("Color") if len(pieces) else []
+        for idx, category in enumerate(pieces.column("Category") if len(pieces) else []):
+            counts[category] = counts.get(category, 0) + 1
+            rows = category_rows.get(category)
+            if rows is None:
+                rows = category_rows[category] = array("I")
+            rows.append(idx)
+            by_key.setdefault(piece_key({"Piece_ID": piece_ids[idx], "Color": colors[idx]}), idx)
+
+        self.version = version
+        self.load_seconds = load_seconds
+        self.load_phases: Dict[str, float] = {}
+        self.loaded_at = time.time()
+        self.pieces: ColumnarPieces = pieces
+        self.categories: Tuple[str, ...] = tuple(sorted(counts))
+        self.category_counts: Mapping[str, int] = MappingProxyType(counts)
+        self.category_index: Mapping[str, Sequence[int]] = MappingProxyType(category_rows)
+        self._by_key: Mapping[str, int] = MappingProxyType(by_key)
+
+        self.search_index = SearchIndex(pieces)
+
+        # Row positions in each sort order; category orders and ranks are derived lazily
+        positions = range(len(pieces))
+        if len(pieces):
+            names = [name.lower() for name in pieces.column("Piece_Name")]
+            prices = pieces.column("Price")
+        else:
+            names = prices = []
+        self._orders: Dict[Tuple[str, Optional[str]], array] = {
+            ("default", None): array("I", positions),
+            ("name", None): array("I", sorted(positions, key=lambda i: (names[i], i))),
+            ("price", None): array("I", sorted(positions, key=lambda i: (prices[i], i))),
+            ("-price", None): array("I", sorted(positions, key=lambda i: (-prices[i], i))),
+            ("id", None): array("I", sorted(positions, key=lambda i: (piece_ids[i], i))),
+        }
+        self._ranks: Dict[str, np.ndarray] = {}
+        self._masks: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_records(cls, records: Sequence[Mapping[str, Any]], version: str = "",
+                     load_seconds: float = 0.0) -> "CatalogStore":
+        """Build a store from row dicts (all rows share the first row's keys)."""
+        names = list(records[0].keys()) if records else []
+        return cls({name: [row[name] for row in records] for name in names},
+                   version=version, load_seconds=load_seconds)
+
+    @classmethod
+    def load(cls, excel_path: str) -> "CatalogStore":
+        """Parse the catalog source once and build the store.
+
+        ``load_phases`` of the result has the wall time of each load step
+        (see ``load_catalog``) and of building the store and its index.
+        """
+        start = time.perf_counter()
+        phases: Dict[str, float] = {}
+        columns, source_digest = load_catalog(excel_path, phases)
+        build_start = time.perf_counter()
+        store = cls(columns, version=f"v{SNAPSHOT_VERSION}-{source_digest[:12]}")
+        phases["store build"] = time.perf_counter() - build_start
+        store.load_phases = phases
+        store.load_seconds = time.perf_counter() - start
+        return store
+
+    @staticmethod
+    def source_paths(excel_path: str) -> Tuple[str, ...]:
+        """Files whose changes mean a new catalog version (see ``CatalogManager``)."""
+        return excel_path, snapshot_path_for(excel_path)
+
+    def __len__(self) -> int:
+        return len(self.pieces)
+
+    def describe(self) -> str:
+        """One-line report for startup logs."""
+        return self.search_index.describe()
+
+    def get(self, key: str) -> Optional[Mapping[str, Any]]:
+        """Look up a piece by its composite cart key (see ``piece_key``)."""
+        idx = self._by_key.get(key)
+        return self.pieces[idx] if idx is not None else None
+
+    def pieces_at(self, rows: Sequence[int]) -> List[Mapping[str, Any]]:
+        """Return the pieces at the given row positions, in that order."""
+        return [self.pieces[idx] for idx in rows]
+
+    def pieces_in_category(self, category: str) -> List[Mapping[str, Any]]:
+        """Return the pieces of one category in source order."""
+        return [self.pieces[idx] for idx in self.category_index.get(category, ())]
+
+    def _ordered_rows(self, sort: str, category: Optional[str]) -> Sequence[int]:
+        """Return row positions for a sort order, optionally within a category."""
+        key = (sort, category)
+        rows = self._orders.get(key)
+        if rows is None:
+            if sort == "default":
+                rows = self.category_index.get(category, array("I"))
+            else:
+                order = np.frombuffer(self._orders[(sort, None)], dtype=np.uint32)
+                rows = array("I", order[self._category_mask(category)[order]].tolist())
+            # Memoizing a derived order is idempotent, so it is safe across threads
+            self._orders[key] = rows
+        return rows
+
+    def _rank(self, sort: str) -> np.ndarray:
+        """Return row position -> index in the given sort order."""
+        rank = self._ranks.get(sort)
+        if rank is None:
+            rank = np.empty(len(self.pieces), dtype=np.uint32)
+            rank[np.frombuffer(self._orders[(sort, None)], dtype=np.uint32)] = np.arange(len(self.pieces))
+            self._ranks[sort] = rank
+        return rank
+
+    def _category_mask(self, category: str) -> np.ndarray:
+        """Return a boolean row mask for one category."""
+        mask = self._masks.get(category)
+        if mask is None:
+            mask = np.zeros(len(self.pieces), dtype=bool)
+            rows = self.category_index.get(category)
+            if rows is not None:
+                mask[np.frombuffer(rows, dtype=np.uint32)] = True
+            self._masks[category] = mask
+        return mask
+
+    def search(self, q: str, category: Optional[str] = None,
+               limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ranked row positions and scores for a search query (the best ``limit`` if given)."""
+        if category and category != "all":
+            rows, scores = self.search_index.search(q, self._category_mask(category), cache_key=category)
+        else:
+            rows, scores = self.search_index.search(q)
+        return (rows, scores) if limit is None else (rows[:limit], scores[:limit])
+
+    def count(self, q: str, category: Optional[str] = None) -> int:
+        """Number of pieces matching a search query."""
+        return len(self.search(q, category)[0])
+
+    def query(self, category: Optional[str] = None, q: Optional[str] = None,
+              sort: str = "default", offset: int = 0,
+              limit: int = 50) -> Tuple[List[Mapping[str, Any]], int]:
+        """Filter, sort and page the catalog.
+
+        Same arguments as ``query_rows``; returns the pieces themselves.
+        """
+        rows, total = self.query_rows(category, q, sort, offset, limit)
+        return [self.pieces[i] for i in rows], total
+
+    def query_rows(self, category: Optional[str] = None, q: Optional[str] = None,
+                   sort: str = "default", offset: int = 0,
+                   limit: int = 50) -> Tuple[List[int], int]:
+        """Filter, sort and page the catalog by row position.
+
+        Args:
+            category: Only include pieces of this category (None or "all" for every category).
+            q: Search terms, prefix-matched against name, color and IDs.
+            sort: One of ``SORT_OPTIONS``; "default" orders search results by relevance.
+            offset: Number of matching pieces to skip.
+            limit: Maximum number of pieces to return.
+
+        Returns:
+            Row positions of the requested page and the total number of matches.
+        """
+        if sort not in SORT_OPTIONS:
+            raise ValueError(f"unknown sort {sort!r}; expected one of {', '.join(SORT_OPTIONS)}")
+        if category == "all":
+            category = None
+
+        if q and q.strip():
+            rows, _ = self.search(q, category)
+            if sort != "default":
+                rows = rows[np.argsort(self._rank(sort)[rows], kind="stable")]
+            page = rows[offset:offset + limit].tolist()
+        else:
+            rows = self._ordered_rows(sort, category)
+            page = list(rows[offset:offset + limit])
+
+        return page, len(rows)
+
+
+class CatalogManager:
+    """Owns the active ``CatalogStore`` and hot-swaps new versions.
+
+    A background thread polls the source files (the workbook and snapshot,
+    or the database for ``SqliteCatalogStore``) for changes, builds the
+    new store off the request path and swaps the reference in one
+    assignment. Requests that already hold the old store keep using it; a
+    file that fails to load (or loads empty) never replaces a good catalog.
+    """
+
+    def __init__(self, excel_path: str, poll_interval: float = 30.0,
+                 on_load: Optional[Callable[[CatalogStore], None]] = None,
+                 on_reload: Optional[Callable[[str, float, Optional[CatalogStore]], None]] = None,
+                 store_class: Any = CatalogStore):
+        self.excel_path = excel_path
+        self.poll_interval = poll_interval
+        # Builds stores from ``excel_path`` (``load``) and names the files to poll (``source_paths``)
+        self.store_class = store_class
+        # Called with each new store before it goes live (e.g. to prebuild caches)
+        self.on_load = on_load
+        # Called after every load attempt with its outcome ("loaded",
+        # "unchanged" or "failed"), its duration and the active store
+        self.on_reload = on_reload
+        self.last_error: Optional[str] = None
+        self._store: Optional[CatalogStore] = None
+        self._fingerprint: Optional[Tuple] = None
+        self._reload_lock = threading.Lock()
+        self._watcher_pid: Optional[int] = None
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _source_fingerprint(self, skip: int = 0) -> Tuple:
+        """Return (mtime, size) of each source file, if present, after the first ``skip``."""
+        return tuple(self._stat(path) for path in self.store_class.source_paths(self.excel_path)[skip:])
+
+    def current(self) -> CatalogStore:
+        """Return the active store, loading it synchronously the first time."""
+        store = self._store
+        if store is None:
+            self.reload()
+            store = self._store
+            if store is None:
+                raise RuntimeError(f"Catalog could not be loaded: {self.last_error}")
+        return store
+
+    def reload(self) -> bool:
+        """Build a store from the current files and swap it in if valid.
+
+        Returns:
+            True when a new store became active.
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            # Stat the workbook before loading so an edit made mid-load is
+            # picked up by the next poll
+            excel_stat = self._stat(self.excel_path)
+            try:
+                store = self.store_class.load(self.excel_path)
+                if len(store) == 0 and self._store is not None and len(self._store) > 0:
+                    raise ValueError("new catalog has no usable pieces")
+                if self.on_load is not None:
+                    self.on_load(store)
+            except Exception as e:
+                # Remember the bad file so it isn't retried until it changes again
+                self._fingerprint = self._source_fingerprint()
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Catalog reload failed, keeping version "
+                      f"{self._store.version if self._store else None}: {self.last_error}")
+                self._report("failed", start)
+                return False
+
+            # The load may have rewritten the snapshot; that alone is not a change
+            self._fingerprint = (excel_stat,) + self._source_fingerprint(skip=1)
+            self.last_error = None
+            if self._store is not None and store.version == self._store.version:
+                self._report("unchanged", start)
+                return False
+            self._store = store
+            print(f"Catalog version {store.version} active: {len(store)} pieces "
+                  f"loaded in {store.load_seconds:.3f}s")
+            self._report("loaded", start)
+            return True
+
+    def _report(self, result: str, start: float) -> None:
+        if self.on_reload is not None:
+            self.on_reload(result, time.perf_counter() - start, self._store)
+
+    def check_for_changes(self) -> bool:
+        """Reload if the source files changed since the last load attempt."""
+        if self._source_fingerprint() == self._fingerprint:
+            return False
+        return self.reload()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                print(f"Catalog watcher error: {e}")
+
+    def ensure_watcher(self) -> None:
+        """Start the polling thread once per process (safe to call per request).
+
+        Threads don't survive ``fork``, so the owning pid is tracked and a
+        forked worker starts its own watcher on first use.
+        """
+        if self.poll_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch, name="catalog-watcher", daemon=True).start()
+
+    def status(self) -> Dict[str, Any]:
+        """Describe the active catalog for rollout checks."""
+        store = self._store
+        return {
+            "version": store.version if store else None,
+            "pieces": len(store) if store else 0,
+            "categories": len(store.categories) if store else 0,
+            "load_seconds": round(store.load_seconds, 4) if store else None,
+            "loaded_at": store.loaded_at if store else None,
+            "last_reload_error": self.last_error,
+        }
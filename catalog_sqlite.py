@@ -0,0 +1,461 @@
+"""SQLite storage backend for the catalog.
+
+``CatalogStore`` keeps every piece, sort order and the search index in
+each worker, so worker memory grows with the inventory. The pipeline can
+also publish the cleaned catalog as a SQLite database (``--export
+sqlite``): a ``pieces`` table in source order with indexes on Category,
+ID_MOLDE, ID_COLOR, Price and the sort keys, and a contentless FTS5 table
+over the same fields ``SearchIndex`` searches. ``SqliteCatalogStore``
+answers the same queries from it through a small pool of read-only
+connections, so a worker only holds the rows of the page it is serving
+plus a bounded SQLite page cache.
+
+Run ``python catalog_sqlite.py [workbook]`` to build the database from an
+existing catalog without running the pipeline.
+"""
+from collections.abc import Sequence as SequenceABC
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+import argparse
+import contextlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+import numpy as np
+from catalog import SNAPSHOT_VERSION, SORT_OPTIONS, load_catalog, piece_key
+from search_index import FIELD_WEIGHTS, query_terms, tokenize
+
+# Bump whenever the tables or the indexed text change so old databases are
+# rejected instead of queried
+SCHEMA_VERSION = 1
+SQLITE_SUFFIX = ".sqlite"
+
+# Idle read-only connections kept per worker, and the SQLite page cache of each
+POOL_SIZE = int(os.environ.get("CATALOG_SQLITE_POOL", "4"))
+CACHE_KIB = int(os.environ.get("CATALOG_SQLITE_CACHE_KB", "2048"))
+
+# Internal columns next to the catalog's own: the "name" sort key
+# (``str.lower``, which SQLite's lower() only does for ASCII) and the cart key
+_NAME_KEY = "_name_key"
+_PIECE_KEY = "_piece_key"
+
+# Sort option -> ORDER BY; every order ends on the source position, as in CatalogStore
+_ORDER_BY = {
+    "default": "pieces.row",
+    "name": f"pieces.{_NAME_KEY}, pieces.row",
+    "price": "pieces.Price, pieces.row",
+    "-price": "pieces.Price DESC, pieces.row",
+    "id": "pieces.Piece_ID, pieces.row",
+}
+
+_INDEXES = (
+    ("pieces_category", "Category"),
+    ("pieces_molde", "ID_MOLDE"),
+    ("pieces_color", "ID_COLOR"),
+    ("pieces_price", "Price"),
+    ("pieces_price_desc", "Price DESC, row"),
+    ("pieces_name", _NAME_KEY),
+    ("pieces_id", "Piece_ID"),
+    ("pieces_key", _PIECE_KEY),
+)
+
+# FTS5 columns in FIELD_WEIGHTS order, ranked by bm25 with the same weights.
+# Text is stored pre-tokenized (see search_index.tokenize) so "2 x 4" is one
+# "2x4" token here too; prefix indexes keep one- and two-letter queries fast.
+_FTS_COLUMNS = tuple(field.lower() for field, _ in FIELD_WEIGHTS)
+_BM25 = f"bm25(pieces_fts, {', '.join(str(weight) for _, weight in FIELD_WEIGHTS)})"
+_FTS_OPTIONS = "tokenize = \"unicode61 remove_diacritics 0 tokenchars '_'\", prefix = '1 2'"
+
+# Row positions bound per IN (...) query
+_BATCH_ROWS = 500
+
+
+def sqlite_path_for(excel_path: str) -> str:
+    """Return the database path that lives next to the given Excel file."""
+    return os.path.splitext(excel_path)[0] + SQLITE_SUFFIX
+
+
+def fts5_available() -> bool:
+    """Whether this Python's SQLite was built with FTS5."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _match_expression(terms: Sequence[str]) -> str:
+    """FTS5 query matching rows with every term as a token prefix."""
+    # Terms are \w+ tokens, so they never contain quotes
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def write_sqlite(columns: Mapping[str, Sequence[Any]], path: str, source_digest: str = "") -> str:
+    """Write cleaned catalog columns as a database at ``path`` (replaced if present).
+
+    Callers publishing over a live database write to a temp path and
+    ``os.replace`` it, as ``catalog_writer.SqliteExporter`` does.
+
+    Args:
+        columns: Column name -> values, as returned by ``load_catalog``.
+        path: Database file to write.
+        source_digest: SHA-256 of the workbook the columns came from; the
+            store's version is derived from it, as for the snapshot.
+
+    Returns:
+        ``path``.
+    """
+    names = list(columns)
+    size = len(columns[names[0]]) if names else 0
+    if os.path.exists(path):
+        os.remove(path)
+
+    conn = sqlite3.connect(path)
+    try:
+        # A fresh file nobody reads yet: no journal needed until it is published
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("schema_version", str(SCHEMA_VERSION)),
+            ("source_digest", source_digest or ""),
+            ("columns", json.dumps(names)),
+            ("rows", str(size)),
+        ])
+        # Untyped columns keep each value's Python type; Price is always a float
+        column_defs = [f"{_quote(name)} REAL" if name == "Price" else _quote(name) for name in names]
+        conn.execute(f"CREATE TABLE pieces (row INTEGER PRIMARY KEY, "
+                     f"{', '.join(column_defs)}, {_NAME_KEY} TEXT, {_PIECE_KEY} TEXT)")
+
+        data = [columns[name] for name in names]
+        piece_ids = columns["Piece_ID"] if size else []
+        piece_names = columns["Piece_Name"] if size else []
+        colors = columns["Color"] if size else []
+        conn.executemany(
+            f"INSERT INTO pieces VALUES ({', '.join('?' * (len(names) + 3))})",
+            ((row, *(column[row] for column in data), str(piece_names[row]).lower(),
+              piece_key({"Piece_ID": piece_ids[row], "Color": colors[row]})) for row in range(size)))
+        for index, definition in _INDEXES:
+            conn.execute(f"CREATE INDEX {index} ON pieces ({definition})")
+
+        conn.execute(f"CREATE VIRTUAL TABLE pieces_fts USING fts5({', '.join(_FTS_COLUMNS)}, "
+                     f"content = '', {_FTS_OPTIONS})")
+        fields = [columns[field] if field in columns else [""] * size for field, _ in FIELD_WEIGHTS]
+        # Names and colors repeat across color variants; tokenize each value once
+        token_memo: Dict[Any, str] = {}
+
+        def indexed_text(value: Any) -> str:
+            text = token_memo.get(value)
+            if text is None:
+                text = token_memo[value] = " ".join(tokenize(value))
+            return text
+
+        conn.executemany(
+            f"INSERT INTO pieces_fts (rowid, {', '.join(_FTS_COLUMNS)}) "
+            f"VALUES (?, {', '.join('?' * len(_FTS_COLUMNS))})",
+            ((row, *(indexed_text(field[row]) for field in fields)) for row in range(size)))
+        conn.execute("INSERT INTO pieces_fts (pieces_fts) VALUES ('optimize')")
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.close()
+    return path
+
+
+class ConnectionPool:
+    """Read-only connections to one database, shared by the request threads.
+
+    Connections are opened on demand and up to ``size`` idle ones are
+    kept. SQLite connections must not cross ``fork``, so a forked worker
+    drops the inherited ones and opens its own.
+    """
+
+    def __init__(self, path: str, size: int = POOL_SIZE, cache_kib: int = CACHE_KIB):
+        self.path = path
+        self.size = size
+        self.cache_kib = cache_kib
+        self._uri = f"file:{quote(os.path.abspath(path))}?mode=ro"
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA cache_size = -{self.cache_kib}")
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for the ``with`` block."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._idle = queue.LifoQueue()
+            idle = self._idle
+        try:
+            conn = idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if idle is self._idle and idle.qsize() < self.size:
+                idle.put(conn)
+            else:
+                conn.close()
+
+
+class SqlitePieces(SequenceABC):
+    """Sequence of pieces read from the database by row position.
+
+    Rows are plain dicts with the catalog's columns. Iterating reads the
+    table in batches, so rendering every card never holds the whole
+    catalog either.
+    """
+
+    def __init__(self, pool: ConnectionPool, column_names: Sequence[str], size: int):
+        self.pool = pool
+        self.column_names: Tuple[str, ...] = tuple(column_names)
+        self._size = size
+        self._select = f"SELECT row, {', '.join(_quote(name) for name in self.column_names)} FROM pieces"
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _row(self, values: Sequence[Any]) -> Dict[str, Any]:
+        return dict(zip(self.column_names, values))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.at(range(*index.indices(self._size)))
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("piece index out of range")
+        return self.at([index])[0]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for start in range(0, self._size, _BATCH_ROWS):
+            with self.pool.connection() as conn:
+                rows = conn.execute(f"{self._select} WHERE row >= ? ORDER BY row LIMIT ?",
+                                    (start, _BATCH_ROWS)).fetchall()
+            for values in rows:
+                yield self._row(values[1:])
+
+    def at(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        """Return the pieces at ``rows``, in that order."""
+        rows = list(rows)
+        found: Dict[int, Dict[str, Any]] = {}
+        with self.pool.connection() as conn:
+            for start in range(0, len(rows), _BATCH_ROWS):
+                batch = sorted(set(rows[start:start + _BATCH_ROWS]))
+                cursor = conn.execute(f"{self._select} WHERE row IN ({', '.join('?' * len(batch))})", batch)
+                for values in cursor:
+                    found[values[0]] = self._row(values[1:])
+        return [found[row] for row in rows]
+
+
+class SqliteCatalogStore:
+    """The ``CatalogStore`` query interface over a catalog database.
+
+    Only the category list and counts are held in memory; pieces, sort
+    orders and search results are indexed lookups. Search matches the same
+    prefix terms in the same fields as ``SearchIndex`` and ranks by BM25
+    with its field weights, so results are the same pieces but equally
+    relevant ones may come in a different order. Scores are the negated
+    BM25 values (higher is better).
+
+    Attributes:
+        path: The database file.
+        version: Identifier of the source content (same scheme as
+            ``CatalogStore``, so both backends agree on ETags).
+        load_seconds: Wall time spent opening the database.
+        load_phases: Step name -> wall time of that load.
+        loaded_at: Unix timestamp of when the store was opened.
+        pieces: ``SqlitePieces`` in source order.
+        categories: Sorted categories that have at least one piece.
+        category_counts: Category -> number of pieces.
+    """
+
+    def __init__(self, path: str, pool: Optional[ConnectionPool] = None):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} does not exist; publish it with the pipeline's "
+                                    f"--export sqlite or python catalog_sqlite.py")
+        self.path = path
+        self.pool = pool or ConnectionPool(path)
+        with self.pool.connection() as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if meta.get("schema_version") != str(SCHEMA_VERSION):
+                raise ValueError(f"{path} has schema version {meta.get('schema_version')}, "
+                                 f"expected {SCHEMA_VERSION}")
+            counts = dict(conn.execute("SELECT Category, COUNT(*) FROM pieces GROUP BY Category"))
+
+        self.version = f"v{SNAPSHOT_VERSION}-{meta['source_digest'][:12]}"
+        self.load_seconds = 0.0
+        self.load_phases: Dict[str, float] = {}
+        self.loaded_at = time.time()
+        self.pieces = SqlitePieces(self.pool, json.loads(meta["columns"]), int(meta["rows"]))
+        self.categories: Tuple[str, ...] = tuple(sorted(counts))
+        self.category_counts: Mapping[str, int] = counts
+
+    @classmethod
+    def load(cls, path: str) -> "SqliteCatalogStore":
+        """Open the database; ``load_phases`` has its "catalog read" time."""
+        start = time.perf_counter()
+        store = cls(path)
+        store.load_seconds = time.perf_counter() - start
+        store.load_phases = {"catalog read": store.load_seconds}
+        return store
+
+    @staticmethod
+    def source_paths(path: str) -> Tuple[str, ...]:
+        """Files whose changes mean a new catalog version (see ``CatalogManager``)."""
+        return (path,)
+
+    def __len__(self) -> int:
+        return len(self.pieces)
+
+    def describe(self) -> str:
+        """One-line report for startup logs."""
+        return (f"SQLite catalog {self.path}: {os.path.getsize(self.path) / 1024 / 1024:.2f} MB, "
+                f"FTS5 search, up to {self.pool.size} idle read-only connections")
+
+    def get(self, key: str) -> Optional[Mapping[str, Any]]:
+        """Look up a piece by its composite cart key (see ``piece_key``)."""
+        with self.pool.connection() as conn:
+            found = conn.execute(f"SELECT row FROM pieces WHERE {_PIECE_KEY} = ? ORDER BY row LIMIT 1",
+                                 (key,)).fetchone()
+        return self.pieces[found[0]] if found else None
+
+    def pieces_at(self, rows: Sequence[int]) -> List[Mapping[str, Any]]:
+        """Return the pieces at the given row positions, in that order."""
+        return self.pieces.at(rows)
+
+    def pieces_in_category(self, category: str) -> List[Mapping[str, Any]]:
+        """Return the pieces of one category in source order."""
+        with self.pool.connection() as conn:
+            rows = [row for row, in conn.execute("SELECT row FROM pieces WHERE Category = ? ORDER BY row",
+                                                  (category,))]
+        return self.pieces.at(rows)
+
+    def _matches(self, q: str, category: Optional[str], join: bool = False) -> Tuple[str, List[Any]]:
+        """FROM/WHERE clause and parameters of a search, or ("", []) for no terms.
+
+        ``pieces`` is only joined for a category or when ``join`` is set (to
+        sort by its columns); counting and ranking the FTS table alone is
+        several times faster for broad queries such as "p".
+        """
+        terms = query_terms(q)
+        if not terms:
+            return "", []
+        params: List[Any] = [_match_expression(terms)]
+        if not category and not join:
+            return "FROM pieces_fts WHERE pieces_fts MATCH ?", params
+        clause = "FROM pieces_fts JOIN pieces ON pieces.row = pieces_fts.rowid WHERE pieces_fts MATCH ?"
+        if category:
+            clause += " AND pieces.Category = ?"
+            params.append(category)
+        return clause, params
+
+    def search(self, q: str, category: Optional[str] = None,
+               limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ranked row positions and scores for a search query.
+
+        Only the best ``limit`` matches are read when given (see ``count``
+        for the total).
+        """
+        if category == "all":
+            category = None
+        clause, params = self._matches(q, category)
+        if not clause:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float64)
+        sql = f"SELECT pieces_fts.rowid, -{_BM25} {clause} ORDER BY {_BM25}, pieces_fts.rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.pool.connection() as conn:
+            found = conn.execute(sql, params).fetchall()
+        rows = np.fromiter((row for row, _ in found), dtype=np.uint32, count=len(found))
+        scores = np.fromiter((score for _, score in found), dtype=np.float64, count=len(found))
+        return rows, scores
+
+    def count(self, q: str, category: Optional[str] = None) -> int:
+        """Number of pieces matching a search query."""
+        if category == "all":
+            category = None
+        clause, params = self._matches(q, category)
+        if not clause:
+            return 0
+        with self.pool.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) {clause}", params).fetchone()[0]
+
+    def query(self, category: Optional[str] = None, q: Optional[str] = None,
+              sort: str = "default", offset: int = 0,
+              limit: int = 50) -> Tuple[List[Mapping[str, Any]], int]:
+        """Filter, sort and page the catalog (see ``CatalogStore.query``)."""
+        rows, total = self.query_rows(category, q, sort, offset, limit)
+        return self.pieces.at(rows), total
+
+    def query_rows(self, category: Optional[str] = None, q: Optional[str] = None,
+                   sort: str = "default", offset: int = 0,
+                   limit: int = 50) -> Tuple[List[int], int]:
+        """Filter, sort and page the catalog by row position (see ``CatalogStore.query_rows``)."""
+        if sort not in SORT_OPTIONS:
+            raise ValueError(f"unknown sort {sort!r}; expected one of {', '.join(SORT_OPTIONS)}")
+        if category == "all":
+            category = None
+
+        if q and q.strip():
+            count_clause, count_params = self._matches(q, category)
+            if not count_clause:
+                return [], 0
+            clause, params = self._matches(q, category, join=sort != "default")
+            order = f"{_BM25}, pieces_fts.rowid" if sort == "default" else _ORDER_BY[sort]
+            with self.pool.connection() as conn:
+                total = conn.execute(f"SELECT COUNT(*) {count_clause}", count_params).fetchone()[0]
+                page = conn.execute(f"SELECT pieces_fts.rowid {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+                                    params + [limit, offset]).fetchall()
+        else:
+            where, params = ("WHERE pieces.Category = ?", [category]) if category else ("", [])
+            total = self.category_counts.get(category, 0) if category else len(self.pieces)
+            with self.pool.connection() as conn:
+                page = conn.execute(f"SELECT pieces.row FROM pieces {where} ORDER BY {_ORDER_BY[sort]} "
+                                    f"LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+        return [row for row, in page], total
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the catalog database for CATALOG_BACKEND=sqlite.")
+    parser.add_argument("workbook", nargs="?", default=os.environ.get("CATALOG_PATH", "data/bricklink_pieces.xlsx"),
+                        help="catalog workbook (its snapshot is used when current)")
+    parser.add_argument("--output", metavar="PATH", help="database path (default: next to the workbook)")
+    args = parser.parse_args(argv)
+
+    output = args.output or sqlite_path_for(args.workbook)
+    start = time.perf_counter()
+    columns, source_digest = load_catalog(args.workbook)
+    tmp_path = f"{output}.tmp-{os.getpid()}"
+    try:
+        write_sqlite(columns, tmp_path, source_digest)
+        os.replace(tmp_path, output)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    rows = len(next(iter(columns.values()))) if columns else 0
+    print(f"Wrote {rows} pieces to {output} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
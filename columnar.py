@@ -0,0 +1,113 @@
+"""Compact column-oriented storage for catalog rows.
+
+Instead of one dict per piece repeating the same keys, each column is
+stored once: ``Price`` as a float array, repetitive text columns (colors,
+categories, molds, names...) dictionary-encoded as an integer code array
+plus one tuple of distinct values, and the rest as plain tuples. Rows are
+exposed as lightweight read-only mapping views so templates and JSON
+code keep using ``piece['Color']`` and ``piece.get(...)``.
+"""
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+# Numeric columns stored as C doubles
+FLOAT_COLUMNS: Tuple[str, ...] = ("Price",)
+# Text columns are dictionary-encoded when at most this share of values is distinct
+ENCODE_MAX_DISTINCT_RATIO = 0.5
+
+
+class PieceRow(Mapping):
+    """Read-only mapping view of one row in ``ColumnarPieces``."""
+
+    __slots__ = ("_pieces", "_index")
+
+    def __init__(self, pieces: "ColumnarPieces", index: int):
+        self._pieces = pieces
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        return self._pieces._cells[key](self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._pieces.column_names)
+
+    def __len__(self) -> int:
+        return len(self._pieces.column_names)
+
+    def __repr__(self) -> str:
+        return f"PieceRow({dict(self)!r})"
+
+
+class ColumnarPieces(Sequence):
+    """Immutable sequence of pieces backed by per-column storage."""
+
+    def __init__(self, columns: Mapping[str, Sequence[Any]]):
+        self.column_names: Tuple[str, ...] = tuple(columns)
+        self._size = len(next(iter(columns.values()))) if columns else 0
+        self._plain: Dict[str, Any] = {}
+        self._encoded: Dict[str, Tuple[array, Tuple[Any, ...]]] = {}
+
+        for name, values in columns.items():
+            if len(values) != self._size:
+                raise ValueError(f"column {name!r} has {len(values)} values, expected {self._size}")
+            if name in FLOAT_COLUMNS:
+                self._plain[name] = array("d", (float(v) for v in values))
+                continue
+            distinct: Dict[Any, int] = {}
+            codes = array("I", (distinct.setdefault(v, len(distinct)) for v in values))
+            if len(distinct) <= max(1, self._size * ENCODE_MAX_DISTINCT_RATIO):
+                self._encoded[name] = (codes, tuple(distinct))
+            else:
+                self._plain[name] = tuple(values)
+
+        # Column -> row index -> value, resolved once so row views skip the dispatch
+        self._cells: Dict[str, Callable[[int], Any]] = {
+            name: column.__getitem__ for name, column in self._plain.items()}
+        for name, (codes, values) in self._encoded.items():
+            self._cells[name] = lambda index, codes=codes, values=values: values[codes[index]]
+
+    @classmethod
+    def from_records(cls, records: Sequence[Mapping[str, Any]]) -> "ColumnarPieces":
+        """Build from row dicts (all rows share the first row's keys)."""
+        names = list(records[0].keys()) if records else []
+        return cls({name: [row[name] for row in records] for name in names})
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [PieceRow(self, i) for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("piece index out of range")
+        return PieceRow(self, index)
+
+    def __iter__(self) -> Iterator[PieceRow]:
+        for i in range(self._size):
+            yield PieceRow(self, i)
+
+    def value(self, name: str, index: int) -> Any:
+        """Return one cell; raises KeyError for unknown columns."""
+        return self._cells[name](index)
+
+    def column(self, name: str) -> List[Any]:
+        """Return a whole column decoded as a list."""
+        encoded = self._encoded.get(name)
+        if encoded is not None:
+            codes, values = encoded
+            return [values[c] for c in codes]
+        return list(self._plain[name])
+
+    def encoded(self, name: str) -> Tuple[array, Tuple[Any, ...]]:
+        """Return (codes, distinct values) for a dictionary-encoded column."""
+        return self._encoded[name]
+
+    def is_encoded(self, name: str) -> bool:
+        return name in self._encoded
+
+    def columns(self) -> Dict[str, List[Any]]:
+        """Return every column decoded (the snapshot payload layout)."""
+        return {name: self.column(name) for name in self.column_names}
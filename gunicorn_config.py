@@ -1,5 +1,7 @@
 """Gunicorn configuration for production deployment."""
+import gc
 import os
+import tempfile
 
 # Bind to 0.0.0.0 with PORT from environment
 bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
@@ -11,6 +13,55 @@ worker_connections = 1000
 timeout = 120  # Increase timeout for large Excel file loading
 keepalive = 5
 
+# Preload mode: load the catalog once in the master and let workers inherit
+# it copy-on-write instead of each building its own copy. Set
+# GUNICORN_PRELOAD=0 to load per worker (e.g. to use `kill -HUP` code reloads).
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+
+# Workers write their metrics here so /metrics can merge them (see
+# metrics.py); on_starting clears what earlier server runs left behind.
+metrics_dir = os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), "rekubricks-metrics"))
+os.makedirs(metrics_dir, exist_ok=True)
+
+
+def on_starting(server):
+    """Start every server run with empty metrics.
+
+    Runs once per master, unlike this module, which SIGHUP re-reads while
+    workers keep writing their files. A preloaded app has already recorded
+    its warmup by now, so the master's own file is kept.
+    """
+    keep = f"metrics-{os.getpid()}.json" if preload_app else None
+    for name in os.listdir(metrics_dir):
+        if name.startswith("metrics-") and name != keep:
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def child_exit(server, worker):
+    """Keep an exited worker's counters but stop reporting its gauges."""
+    import metrics
+    metrics.mark_process_dead(metrics_dir, worker.pid)
+
+
+def when_ready(server):
+    """Freeze the preloaded heap before workers fork.
+
+    Moves every object loaded so far (the catalog, indexes and card
+    fragments) out of the garbage collector's generations, so collections
+    in the workers don't write to those pages and un-share them.
+
+    The master's metrics file (written at the end of the warmup) keeps
+    its counters, such as the catalog load, but drops its gauges: the
+    workers report those themselves, and the master's copies would never
+    be updated again.
+    """
+    if preload_app:
+        import metrics
+        metrics.mark_process_dead(metrics_dir, os.getpid())
+        gc.freeze()
+        server.log.info("Froze %d preloaded objects before forking workers", gc.get_freeze_count())
+
 # Logging
 accesslog = "-"  # Log to stdout
 errorlog = "-"   # Log to stderr
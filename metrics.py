@@ -0,0 +1,280 @@
+"""Request and catalog metrics in the Prometheus text format.
+
+Gunicorn runs the app in several worker processes and a scrape of
+``/metrics`` lands on only one of them, so every process keeps its values
+in memory and writes them to ``<directory>/metrics-<pid>.json`` (about once
+a second while they change, and at exit). Rendering merges the files of
+every process: counters and histograms are summed, gauges are reported
+per process with a ``pid`` label. Files of exited workers are kept so
+counters never go backwards; ``mark_process_dead`` drops their gauges.
+
+Without a directory (``python app.py``, tests) only the current process
+is reported.
+"""
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import atexit
+import contextlib
+import glob
+import json
+import math
+import os
+import threading
+import time
+
+METRICS_DIR = os.environ.get("METRICS_DIR") or None
+FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", "1"))
+
+# Seconds; covers cache hits (sub-millisecond) to a cold full-catalog render
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS: Tuple[float, ...] = tuple(float(1024 * 4 ** i) for i in range(9))  # 1 KiB .. 64 MiB
+
+LabelValues = Tuple[str, ...]
+
+
+def _file_for(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def _write_json(path: str, payload: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    """One metric family; values live in the owning ``MetricsRegistry``."""
+
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self.registry.lock() as values:
+            series = values.setdefault(self.name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self.registry.lock() as values:
+            values.setdefault(self.name, {})[key] = float(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str,
+                 labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.registry.lock() as values:
+            series = values.setdefault(self.name, {})
+            # Per-bucket (non-cumulative) counts, +Inf last, then the sum
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0.0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the wall time of the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class MetricsRegistry:
+    """Metric families of the app and this process's values.
+
+    Args:
+        directory: Shared folder for the per-process files, or None to
+            report only this process.
+        flush_seconds: Minimum interval between background writes.
+    """
+
+    def __init__(self, directory: Optional[str] = METRICS_DIR, flush_seconds: float = FLUSH_SECONDS):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._metrics: Dict[str, Metric] = {}
+        # Metric name -> label values -> number (counter, gauge) or bucket list (histogram)
+        self._values: Dict[str, Dict[LabelValues, Any]] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._dirty = False
+        self._flusher_pid: Optional[int] = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    def _add(self, metric: Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(self, name, documentation, labelnames, buckets))
+
+    @contextlib.contextmanager
+    def lock(self, update: bool = True) -> Iterator[Dict[str, Dict[LabelValues, Any]]]:
+        """Hold the lock and yield this process's values (marked changed if ``update``)."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: the parent's counts are in the parent's file,
+                # the gauges (e.g. the inherited catalog) still hold here
+                self._pid = os.getpid()
+                self._values = {name: series for name, series in self._values.items()
+                                if self._metrics[name].kind == "gauge"}
+                self._dirty = True
+            self._dirty = self._dirty or update
+            yield self._values
+
+    def _snapshot(self) -> Dict[str, Any]:
+        with self.lock(update=False) as values:
+            return {
+                "pid": self._pid,
+                "kinds": {name: self._metrics[name].kind for name in values},
+                "values": {name: [[list(key), list(value) if isinstance(value, list) else value]
+                                  for key, value in series.items()] for name, series in values.items()},
+            }
+
+    def flush(self) -> None:
+        """Write this process's values to its file (no-op without a directory)."""
+        if not self.directory:
+            return
+        with self.lock(update=False):
+            if not self._dirty:
+                return
+            self._dirty = False
+        snapshot = self._snapshot()
+        _write_json(_file_for(self.directory, snapshot["pid"]), snapshot)
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Metrics flush error: {e}")
+
+    def ensure_flusher(self) -> None:
+        """Start the background writer once per process (safe to call per request)."""
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name="metrics-flusher", daemon=True).start()
+
+    def _collect(self) -> List[Dict[str, Any]]:
+        """Snapshots of every process: the files, with this process live."""
+        snapshots = {}
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    continue  # removed or replaced while listing
+                snapshots[snapshot["pid"]] = snapshot
+        current = self._snapshot()
+        snapshots[current["pid"]] = current
+        return [snapshots[pid] for pid in sorted(snapshots)]
+
+    def render(self) -> str:
+        """The merged metrics of all processes in the Prometheus text format."""
+        snapshots = self._collect()
+        lines: List[str] = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            if isinstance(metric, Gauge):
+                for snapshot in snapshots:
+                    for key, value in snapshot["values"].get(name, []):
+                        labels = _labels(metric.labelnames + ("pid",), key + [str(snapshot["pid"])])
+                        lines.append(f"{name}{labels} {_format_value(value)}")
+                continue
+
+            merged: Dict[LabelValues, Any] = {}
+            for snapshot in snapshots:
+                for key, value in snapshot["values"].get(name, []):
+                    key = tuple(key)
+                    if isinstance(metric, Histogram):
+                        state = merged.setdefault(key, [0.0] * len(value))
+                        merged[key] = [a + b for a, b in zip(state, value)]
+                    else:
+                        merged[key] = merged.get(key, 0.0) + value
+            for key, value in sorted(merged.items()):
+                if isinstance(metric, Counter):
+                    lines.append(f"{name}{_labels(metric.labelnames, key)} {_format_value(value)}")
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(metric.buckets + (math.inf,), value):
+                    cumulative += count
+                    labels = _labels(metric.labelnames + ("le",), key + (_format_value(bound),))
+                    lines.append(f"{name}_bucket{labels} {_format_value(cumulative)}")
+                lines.append(f"{name}_sum{_labels(metric.labelnames, key)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_labels(metric.labelnames, key)} {_format_value(cumulative)}")
+        return "\n".join(lines) + "\n"
+
+
+def mark_process_dead(directory: str, pid: int) -> None:
+    """Drop the gauges of an exited worker, keeping its counters and histograms."""
+    path = _file_for(directory, pid)
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return
+    for name, kind in snapshot["kinds"].items():
+        if kind == "gauge":
+            snapshot["values"].pop(name, None)
+    _write_json(path, snapshot)
@@ -0,0 +1,192 @@
+"""Inverted index for catalog search.
+
+Tokenizes piece names, colors and IDs once at catalog load so searches
+are dictionary lookups instead of a substring scan over every piece.
+Dimensions such as "2 x 4" are kept together as a single "2x4" token.
+"""
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+import re
+import sys
+import threading
+import time
+import numpy as np
+
+# Field weights: an ID hit outranks a name hit, which outranks a color hit
+FIELD_WEIGHTS: Tuple[Tuple[str, int], ...] = (
+    ("Piece_ID", 8),
+    ("ID_MOLDE", 8),
+    ("Piece_Name", 4),
+    ("Color", 2),
+)
+# Exact token matches score this many times more than prefix matches
+EXACT_BONUS = 2
+
+_DIMENSION_RE = re.compile(r"(\d+)\s*x\s*(?=\d)")
+_TOKEN_RE = re.compile(r"\w+")
+# A query typed up to "2 x" should keep matching 2x4, 2x2, ...
+_TRAILING_DIMENSION_RE = re.compile(r"(\d+)\s*x\s*$")
+
+
+def tokenize(text: Any) -> List[str]:
+    """Split text into lowercase search tokens, joining "2 x 4" into "2x4"."""
+    text = _DIMENSION_RE.sub(r"\1x", str(text).lower())
+    return _TOKEN_RE.findall(text)
+
+
+def query_terms(query: Any) -> Tuple[str, ...]:
+    """Distinct search tokens of a query; a trailing "2 x" is kept as the prefix "2x"."""
+    query = _TRAILING_DIMENSION_RE.sub(r"\1x", str(query).lower())
+    return tuple(dict.fromkeys(tokenize(query)))
+
+
+def _field_codes(pieces: Sequence[Mapping[str, Any]], field: str) -> Tuple[np.ndarray, Sequence[Any]]:
+    """Return per-row value codes and the distinct values of one field.
+
+    Dictionary-encoded ``ColumnarPieces`` columns are used as-is; anything
+    else is encoded here.
+    """
+    if hasattr(pieces, "is_encoded") and pieces.is_encoded(field):
+        codes, values = pieces.encoded(field)
+        return np.frombuffer(codes, dtype=np.uint32), values
+    if hasattr(pieces, "column_names"):
+        column = pieces.column(field) if field in pieces.column_names else [""] * len(pieces)
+    else:
+        column = [piece.get(field, "") for piece in pieces]
+    distinct: Dict[Any, int] = {}
+    codes = np.fromiter((distinct.setdefault(value, len(distinct)) for value in column),
+                        dtype=np.uint32, count=len(column))
+    return codes, tuple(distinct)
+
+
+class SearchIndex:
+    """Token -> postings index with prefix matching and weighted ranking.
+
+    Postings are numpy arrays of row positions with a parallel array of
+    field weights, so scoring a term is a handful of vector operations over
+    the catalog instead of a Python loop per matching piece. Results are
+    memoized per normalized query in a small LRU, which covers the repeated
+    prefixes of typing.
+    """
+
+    def __init__(self, pieces: Sequence[Mapping[str, Any]], cache_size: int = 256):
+        start = time.perf_counter()
+        # Token -> (row positions, weight) chunks, one chunk per distinct field value
+        chunks: Dict[str, List[Tuple[np.ndarray, int]]] = {}
+        # Names and colors repeat across color variants; tokenize each value once
+        token_memo: Dict[Any, List[str]] = {}
+        for field, weight in FIELD_WEIGHTS:
+            codes, values = _field_codes(pieces, field)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+            for code, value in enumerate(values):
+                tokens = token_memo.get(value)
+                if tokens is None:
+                    tokens = token_memo[value] = list(dict.fromkeys(tokenize(value)))
+                if not tokens or bounds[code] == bounds[code + 1]:
+                    continue
+                rows = order[bounds[code]:bounds[code + 1]]
+                for token in tokens:
+                    chunks.setdefault(token, []).append((rows, weight))
+
+        self._size = len(pieces)
+        self._tokens: List[str] = sorted(chunks)
+        self._rows: Dict[str, np.ndarray] = {}
+        self._weights: Dict[str, np.ndarray] = {}
+        for token, parts in chunks.items():
+            rows = np.concatenate([part for part, _ in parts]).astype(np.uint32)
+            weights = np.concatenate([np.full(len(part), weight, dtype=np.uint8) for part, weight in parts])
+            if len(parts) > 1:
+                # Keep the best weight when a row has the token in several fields
+                order = np.lexsort((-weights.astype(np.int16), rows))
+                rows, weights = rows[order], weights[order]
+                first = np.ones(len(rows), dtype=bool)
+                first[1:] = rows[1:] != rows[:-1]
+                rows, weights = rows[first], weights[first]
+            self._rows[token] = rows
+            self._weights[token] = weights
+
+        self._cache: "OrderedDict[Tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+        self.build_seconds = time.perf_counter() - start
+
+    @property
+    def token_count(self) -> int:
+        return len(self._tokens)
+
+    @property
+    def posting_count(self) -> int:
+        return sum(len(rows) for rows in self._rows.values())
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the token list, maps and postings."""
+        size = sys.getsizeof(self._tokens) + sys.getsizeof(self._rows) + sys.getsizeof(self._weights)
+        for token in self._tokens:
+            size += sys.getsizeof(token) + self._rows[token].nbytes + self._weights[token].nbytes
+        return size
+
+    def _expand(self, prefix: str) -> Iterable[str]:
+        """Yield every indexed token that starts with ``prefix``."""
+        tokens = self._tokens
+        i = bisect_left(tokens, prefix)
+        while i < len(tokens) and tokens[i].startswith(prefix):
+            yield tokens[i]
+            i += 1
+
+    def _term_scores(self, term: str) -> np.ndarray:
+        """Return the best score of every row for one query term (prefix match)."""
+        scores = np.zeros(self._size, dtype=np.uint8)
+        for token in self._expand(term):
+            rows = self._rows[token]
+            weights = self._weights[token] * (EXACT_BONUS if token == term else 1)
+            # Rows are unique within a token, so a gather/scatter max is safe
+            scores[rows] = np.maximum(scores[rows], weights)
+        return scores
+
+    def search(self, query: str, mask: Optional[np.ndarray] = None,
+               cache_key: Any = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ranked row positions and scores for pieces matching every term.
+
+        Each term matches as a prefix of a token in any indexed field.
+        Results are ordered by descending score, then catalog order.
+
+        Args:
+            query: Free-text search query.
+            mask: Optional boolean array restricting the rows considered.
+            cache_key: Identifies ``mask`` in the result cache.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint16)
+
+        key = (terms, cache_key)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        total = np.zeros(self._size, dtype=np.uint16)
+        alive = np.ones(self._size, dtype=bool) if mask is None else mask.copy()
+        for term in terms:
+            scores = self._term_scores(term)
+            alive &= scores > 0
+            total += scores
+
+        rows = np.flatnonzero(alive)
+        scores = total[rows]
+        order = np.lexsort((rows, -scores.astype(np.int32)))
+        result = (rows[order], scores[order])
+
+        with self._cache_lock:
+            self._cache[key] = result
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def describe(self) -> str:
+        """One-line build report for startup logs."""
+        return (f"Search index: {self.token_count} tokens, {self.posting_count} postings, "
+                f"built in {self.build_seconds * 1000:.1f} ms, ~{self.memory_bytes() / 1024 / 1024:.2f} MB")
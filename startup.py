@@ -0,0 +1,85 @@
+"""Wall-time profile of the app's cold start.
+
+The host scales the app to zero, so every cold start pays for the
+interpreter, the imports, reading the catalog, building its caches and
+rendering the first page before the first byte goes out. ``app.py``
+records each of those phases here; the profile is printed at the end of
+the warmup and served by ``/catalog/version`` and ``/metrics``.
+
+Import this module before anything heavy: the "imports" phase is counted
+from the moment it is first imported.
+"""
+from typing import Any, Dict, Iterator, Optional
+import contextlib
+import os
+import time
+
+_IMPORTED_AT = time.perf_counter()
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started (Linux only, else None)."""
+    try:
+        with open("/proc/self/stat", encoding="ascii") as f:
+            # The command name may contain spaces; fields resume after ")"
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+
+
+class StartupProfile:
+    """Ordered phase -> seconds of one process's startup.
+
+    Attributes:
+        phases: Wall time per phase, in the order they were first recorded.
+        interpreter_seconds: Process age when this module was imported
+            (interpreter start-up plus whatever ran before, e.g. gunicorn's
+            boot), or None where it can't be read.
+        total_seconds: Interpreter time plus the phases, set by ``finish``.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        age = process_age()
+        self.interpreter_seconds = None if age is None else max(0.0, age - (time.perf_counter() - _IMPORTED_AT))
+        self.total_seconds: Optional[float] = None
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add ``seconds`` to a phase (ignored once the profile is finished)."""
+        if self.total_seconds is None:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Record the wall time of the ``with`` block as ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def since_import(self) -> float:
+        """Seconds since this module was imported (the end of the "imports" phase)."""
+        return time.perf_counter() - _IMPORTED_AT
+
+    def finish(self) -> None:
+        """Close the profile; later phases (e.g. catalog reloads) are not added."""
+        self.total_seconds = (self.interpreter_seconds or 0.0) + sum(self.phases.values())
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "interpreter_seconds": None if self.interpreter_seconds is None else round(self.interpreter_seconds, 4),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "total_seconds": None if self.total_seconds is None else round(self.total_seconds, 4),
+        }
+
+    def summary_line(self) -> str:
+        """One line for the startup log, e.g. ``Startup 0.61s: imports 0.21s | ...``."""
+        parts = [f"{name} {seconds:.3f}s" for name, seconds in self.phases.items()]
+        if self.interpreter_seconds is not None:
+            parts.insert(0, f"interpreter {self.interpreter_seconds:.3f}s")
+        total = self.total_seconds if self.total_seconds is not None else sum(self.phases.values())
+        return f"Startup {total:.3f}s: " + " | ".join(parts)
@@ -7,10 +7,38 @@ let visibleCardsCount = 50; // Initial load count
 let allCards = [];
 let isLoading = false;
 
+// Server-side paging: Flask renders the first page, the rest comes from /api/pieces
+let cardGrid = null;
+let serverPaging = false;
+let nextOffset = null;
+let requestGeneration = 0;
+let searchDebounceTimer = null;
+
+// Static export (static_site.py): pages are JSON shards under staticRoot and
+// search runs in the browser on search.json
+let staticRoot = null;
+let staticPages = new Map();
+let staticSearchIndex = null;
+let staticResults = null;
+
 /**
  * Initialize lazy loading on page load
  */
 function initializeLazyLoading() {
+    cardGrid = document.getElementById('cardGrid');
+    serverPaging = Boolean(cardGrid && (cardGrid.dataset.api || cardGrid.dataset.static));
+
+    if (serverPaging) {
+        if (cardGrid.dataset.static) {
+            staticRoot = cardGrid.dataset.static;
+            currentCategory = cardGrid.dataset.category || 'all';
+        }
+        const offset = cardGrid.dataset.nextOffset;
+        nextOffset = offset === '' ? null : parseInt(offset, 10);
+        setupInfiniteScroll();
+        return;
+    }
+
     allCards = Array.from(document.querySelectorAll('.card'));
     
     // Initially hide all cards except first batch
@@ -62,6 +90,13 @@ function setupInfiniteScroll() {
 function loadMoreCards() {
     if (isLoading) return;
     
+    if (serverPaging) {
+        if (nextOffset !== null) {
+            fetchPiecesPage(nextOffset, false);
+        }
+        return;
+    }
+    
     isLoading = true;
     const loadBatchSize = 50;
     
@@ -87,6 +122,179 @@ function loadMoreCards() {
     }, 100);
 }
 
+/**
+ * Build the /api/pieces URL for the current filters
+ * @param {number} offset - Number of matching pieces to skip
+ */
+function buildPiecesUrl(offset) {
+    const params = new URLSearchParams({
+        offset: offset,
+        limit: cardGrid.dataset.pageSize,
+        format: 'html'
+    });
+    if (currentCategory !== 'all') params.set('category', currentCategory);
+    if (currentSearchTerm !== '') params.set('q', currentSearchTerm);
+    return `${cardGrid.dataset.api}?${params}`;
+}
+
+/**
+ * Fetch a page of rendered cards from the server
+ * @param {number} offset - Number of matching pieces to skip
+ * @param {boolean} replace - Replace the grid (new filters) instead of appending
+ */
+function fetchPiecesPage(offset, replace) {
+    // A new search/filter invalidates any page still in flight
+    if (replace) requestGeneration++;
+    const generation = requestGeneration;
+    isLoading = true;
+
+    const page = staticRoot
+        ? fetchStaticPage(offset)
+        : fetch(buildPiecesUrl(offset)).then(response => response.json());
+    return page
+        .then(data => {
+            if (generation !== requestGeneration) return;
+            if (replace) {
+                cardGrid.querySelectorAll('.card').forEach(card => card.remove());
+            }
+            const sentinel = document.getElementById('scroll-sentinel');
+            sentinel.insertAdjacentHTML('beforebegin', data.html);
+            nextOffset = data.next_offset;
+            updateAllCardButtons();
+        })
+        .catch(error => console.error('Error al cargar piezas:', error))
+        .finally(() => {
+            if (generation === requestGeneration) isLoading = false;
+        });
+}
+
+// ==================== STATIC EXPORT ====================
+
+/**
+ * Fetch a JSON file of the static export once and keep it
+ * @param {string} path - Path under staticRoot
+ */
+function fetchStaticJson(path) {
+    if (!staticPages.has(path)) {
+        const request = fetch(`${staticRoot}${path}`).then(response => {
+            if (!response.ok) throw new Error(`${path}: ${response.status}`);
+            return response.json();
+        });
+        // Drop failed requests so they are retried
+        request.catch(() => staticPages.delete(path));
+        staticPages.set(path, request);
+    }
+    return staticPages.get(path);
+}
+
+/**
+ * Shard path of one page of a listing ("all" or a category slug)
+ */
+function staticPagePath(listing, page) {
+    return `${listing}/page-${String(page).padStart(4, '0')}.json`;
+}
+
+/**
+ * Split a query into search terms, as search_index.query_terms does
+ * ("2 x 4" becomes "2x4", a trailing "2 x" the prefix "2x")
+ */
+function searchTerms(query) {
+    const text = query.toLowerCase()
+        .replace(/(\d+)\s*x\s*$/u, '$1x')
+        .replace(/(\d+)\s*x\s*(?=\d)/gu, '$1x');
+    return [...new Set(text.match(/[\p{L}\p{N}_]+/gu) || [])];
+}
+
+/**
+ * Rows matching every term (as a token prefix), best score first, then
+ * catalog order: the ranking of search_index.SearchIndex
+ */
+function rankSearchResults(index, terms, category) {
+    const rowCount = index.category_codes.length;
+    const totals = new Uint16Array(rowCount);
+    const alive = new Uint8Array(rowCount).fill(1);
+    const categoryCode = category === 'all' ? -1 : index.categories.indexOf(category);
+
+    terms.forEach(term => {
+        const best = new Uint8Array(rowCount);
+        index.fields.forEach(field => {
+            // Score each distinct value once; values repeat across color variants
+            const valueScores = field.tokens.map(tokens => {
+                let score = 0;
+                tokens.forEach(token => {
+                    if (token.startsWith(term)) {
+                        score = Math.max(score, field.weight * (token === term ? index.exact_bonus : 1));
+                    }
+                });
+                return score;
+            });
+            field.codes.forEach((code, row) => {
+                if (valueScores[code] > best[row]) best[row] = valueScores[code];
+            });
+        });
+        for (let row = 0; row < rowCount; row++) {
+            if (best[row] === 0) alive[row] = 0;
+            totals[row] += best[row];
+        }
+    });
+
+    const rows = [];
+    for (let row = 0; row < rowCount; row++) {
+        if (alive[row] && (categoryCode < 0 || index.category_codes[row] === categoryCode)) rows.push(row);
+    }
+    return rows.sort((a, b) => totals[b] - totals[a] || a - b);
+}
+
+/**
+ * Load search.json and split its token strings once
+ */
+function loadStaticSearchIndex() {
+    if (!staticSearchIndex) {
+        staticSearchIndex = fetchStaticJson('search.json').then(index => {
+            index.fields.forEach(field => {
+                field.tokens = field.values.map(text => (text ? text.split(' ') : []));
+            });
+            return index;
+        });
+        staticSearchIndex.catch(() => { staticSearchIndex = null; });
+    }
+    return staticSearchIndex;
+}
+
+/**
+ * One page of the current filters from the static export, shaped like
+ * the /api/pieces response the grid expects
+ * @param {number} offset - Number of matching pieces to skip
+ */
+function fetchStaticPage(offset) {
+    const pageSize = parseInt(cardGrid.dataset.pageSize, 10);
+    const terms = searchTerms(currentSearchTerm);
+
+    if (terms.length === 0) {
+        const option = document.querySelector('#categoryFilter option:checked');
+        const listing = currentCategory === 'all' || !option ? 'all' : option.dataset.slug;
+        return fetchStaticJson(staticPagePath(listing, Math.floor(offset / pageSize)))
+            .then(data => ({ html: data.cards.join(''), next_offset: data.next_offset }));
+    }
+
+    return loadStaticSearchIndex().then(index => {
+        const key = `${terms.join(' ')}\n${currentCategory}`;
+        if (!staticResults || staticResults.key !== key) {
+            staticResults = { key: key, rows: rankSearchResults(index, terms, currentCategory) };
+        }
+        const results = staticResults.rows;
+        const rows = results.slice(offset, offset + pageSize);
+        // Cards come from the "all" listing, which is in catalog order
+        const pages = [...new Set(rows.map(row => Math.floor(row / index.page_size)))];
+        return Promise.all(pages.map(page => fetchStaticJson(staticPagePath('all', page)))).then(shards => {
+            const byPage = new Map(pages.map((page, i) => [page, shards[i]]));
+            const html = rows.map(row => byPage.get(Math.floor(row / index.page_size)).cards[row % index.page_size]);
+            const next = offset + rows.length;
+            return { html: html.join(''), next_offset: next < results.length ? next : null };
+        });
+    });
+}
+
 /**
  * Check if card matches current search term
  */
@@ -126,6 +334,12 @@ function searchProducts(searchTerm) {
     }
     // Reset lazy loading
     visibleCardsCount = 50;
+    if (serverPaging) {
+        // Wait for the user to pause typing before asking the server
+        clearTimeout(searchDebounceTimer);
+        searchDebounceTimer = setTimeout(() => fetchPiecesPage(0, true), 200);
+        return;
+    }
     applyFilters();
 }
 
@@ -136,6 +350,11 @@ function searchProducts(searchTerm) {
 function filterByCategory(category) {
     currentCategory = category;
     visibleCardsCount = 50; // Reset on category change
+    if (serverPaging) {
+        clearTimeout(searchDebounceTimer);
+        fetchPiecesPage(0, true);
+        return;
+    }
     applyFilters();
 }
 
@@ -0,0 +1,271 @@
+"""Static-site export of the catalog for CDN hosting.
+
+The catalog only changes when the pipeline runs, so the whole site can be
+rendered ahead of time and served by any static host with no Python at
+request time. The build reuses ``templates/index.html`` and the card
+macro with the catalog snapshot, and writes:
+
+- ``index.html`` and ``categoria/<slug>/index.html``: the catalog page
+  with the first page of every piece / of one category;
+- ``catalog/<hash>/<listing>/page-NNNN.json``: every page of each listing
+  (``all`` or a category slug), paged like ``/api/pieces`` with the piece
+  data and the rendered cards;
+- ``catalog/<hash>/search.json``: the search index, used by
+  ``script.js`` to search in the browser with the ranking of
+  ``search_index.SearchIndex``;
+- ``assets/<name>.<hash>.<ext>``: the files of ``static/``;
+- ``build.json``: version, sizes and timings of the build.
+
+Asset and shard paths carry a hash of their content (for shards, of the
+catalog version, the card template and the page size), so the host can
+cache them forever; only the HTML pages need revalidation. The site is
+built next to the output folder and swapped in when complete.
+
+Usage (from the project root):
+    python static_site.py [--catalog data/bricklink_pieces.xlsx] [--output dist] [--page-size 50]
+"""
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import time
+import unicodedata
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+from catalog import CatalogStore, piece_key
+from render_cache import FragmentCache
+from search_index import EXACT_BONUS, FIELD_WEIGHTS, tokenize
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(PROJECT_ROOT, "templates")
+STATIC_DIR = os.path.join(PROJECT_ROOT, "static")
+
+DEFAULT_OUTPUT = os.path.join(PROJECT_ROOT, "dist")
+DEFAULT_PAGE_SIZE = int(os.environ.get("CATALOG_PAGE_SIZE", "50"))
+
+# Bump when the shard or search index layout changes (part of the shard hash)
+STATIC_FORMAT = 1
+HASH_LENGTH = 12
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(filename: str, data: bytes) -> str:
+    """``style.css`` -> ``style.<hash>.css``."""
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{content_hash(data)}{ext}"
+
+
+def category_slugs(categories: Sequence[str]) -> Dict[str, str]:
+    """Category -> unique ASCII folder name ("Ladrillos 2x4" -> "ladrillos-2x4").
+
+    "all" is reserved for the listing of every piece.
+    """
+    slugs: Dict[str, str] = {}
+    used = {"all"}
+    for category in categories:
+        ascii_name = unicodedata.normalize("NFKD", category).encode("ascii", "ignore").decode("ascii")
+        base = re.sub(r"[^a-z0-9]+", "-", ascii_name.lower()).strip("-") or "categoria"
+        slug, suffix = base, 2
+        while slug in used:
+            slug, suffix = f"{base}-{suffix}", suffix + 1
+        used.add(slug)
+        slugs[category] = slug
+    return slugs
+
+
+def _json_item(piece: Mapping[str, Any]) -> Dict[str, Any]:
+    """A piece as in /api/pieces, with NaN cells as null (JSON.parse rejects NaN)."""
+    item = {key: None if isinstance(value, float) and math.isnan(value) else value
+            for key, value in piece.items()}
+    item["key"] = piece_key(piece)
+    return item
+
+
+def search_index_payload(store: CatalogStore, page_size: int) -> Dict[str, Any]:
+    """The search index for ``script.js``: per field, the tokens of each
+    distinct value and every row's value code, plus each row's category."""
+    fields = []
+    token_memo: Dict[Any, str] = {}
+    for field, weight in FIELD_WEIGHTS:
+        column = store.pieces.column(field) if field in store.pieces.column_names else [""] * len(store)
+        codes: Dict[str, int] = {}
+        row_codes = []
+        for value in column:
+            text = token_memo.get(value)
+            if text is None:
+                text = token_memo[value] = " ".join(dict.fromkeys(tokenize(value)))
+            row_codes.append(codes.setdefault(text, len(codes)))
+        fields.append({"name": field, "weight": weight, "values": list(codes), "codes": row_codes})
+    category_codes = {category: code for code, category in enumerate(store.categories)}
+    return {
+        "version": store.version,
+        "page_size": page_size,
+        "exact_bonus": EXACT_BONUS,
+        "fields": fields,
+        "categories": list(store.categories),
+        "category_codes": [category_codes[category] for category in store.pieces.column("Category")]
+        if len(store) else [],
+    }
+
+
+class SiteWriter:
+    """Writes files under one folder and tallies their sizes by kind."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files = 0
+        self.bytes: Dict[str, int] = {}
+
+    def write(self, path: str, data: bytes, kind: str) -> None:
+        full_path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(data)
+        self.files += 1
+        self.bytes[kind] = self.bytes.get(kind, 0) + len(data)
+
+    def write_json(self, path: str, payload: Any, kind: str = "json") -> None:
+        self.write(path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), kind)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.bytes.values())
+
+
+def build_site(store: CatalogStore, output: str = DEFAULT_OUTPUT, page_size: int = DEFAULT_PAGE_SIZE,
+               log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Render the static site of ``store`` into ``output`` (replaced when done).
+
+    Returns:
+        The build report (also written as ``build.json``).
+    """
+    start = time.perf_counter()
+    phases: Dict[str, float] = {}
+    tmp_dir = f"{output.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    site = SiteWriter(tmp_dir)
+    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=select_autoescape(["html"]))
+
+    try:
+        phase_start = time.perf_counter()
+        assets: Dict[str, str] = {}
+        for filename in sorted(os.listdir(STATIC_DIR)):
+            with open(os.path.join(STATIC_DIR, filename), "rb") as f:
+                data = f.read()
+            assets[filename] = f"assets/{hashed_name(filename, data)}"
+            site.write(assets[filename], data, "assets")
+        phases["assets"] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        fragments = FragmentCache(lambda: env.get_template("_card.html").module.card)
+        fragments.build(store)
+        phases["cards"] = time.perf_counter() - phase_start
+
+        with open(os.path.join(TEMPLATES_DIR, "_card.html"), "rb") as f:
+            card_template = f.read()
+        data_hash = content_hash(f"{STATIC_FORMAT}\n{store.version}\n{page_size}\n".encode("utf-8") + card_template)
+        data_dir = f"catalog/{data_hash}"
+
+        phase_start = time.perf_counter()
+        slugs = category_slugs(store.categories)
+        listings: List[Tuple[Optional[str], str]] = [(None, "all")] + [(c, slugs[c]) for c in store.categories]
+        shards = 0
+        for category, listing in listings:
+            total = store.category_counts.get(category, 0) if category else len(store)
+            for page, offset in enumerate(range(0, max(total, 1), page_size)):
+                rows, _ = store.query_rows(category=category, offset=offset, limit=page_size)
+                next_offset = offset + len(rows)
+                site.write_json(f"{data_dir}/{listing}/page-{page:04d}.json", {
+                    "version": store.version,
+                    "total": total,
+                    "offset": offset,
+                    "limit": page_size,
+                    "next_offset": next_offset if next_offset < total else None,
+                    "items": [_json_item(piece) for piece in store.pieces_at(rows)],
+                    "cards": fragments.rows(store, rows),
+                })
+                shards += 1
+        phases["shards"] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        site.write_json(f"{data_dir}/search.json", search_index_payload(store, page_size))
+        phases["search index"] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        template = env.get_template("index.html")
+        for category, listing in listings:
+            path = "index.html" if category is None else f"categoria/{listing}/index.html"
+            root = "../" * path.count("/")
+            rows, total = store.query_rows(category=category, limit=page_size)
+
+            def url_for(endpoint: str, filename: str = "", root: str = root) -> str:
+                if endpoint != "static":
+                    raise ValueError(f"no static URL for endpoint {endpoint!r}")
+                return root + assets[filename]
+
+            html = template.render(url_for=url_for, categories=store.categories, paged=True,
+                                   page_size=page_size, total=total,
+                                   next_offset=page_size if page_size < total else None,
+                                   cards_html=Markup("".join(fragments.rows(store, rows))),
+                                   static_root=f"{root}{data_dir}/", current_category=category or "all",
+                                   category_slugs=slugs)
+            site.write(path, html.encode("utf-8"), "html")
+        phases["pages"] = time.perf_counter() - phase_start
+
+        report = {
+            "version": store.version,
+            "data_hash": data_hash,
+            "pieces": len(store),
+            "categories": len(store.categories),
+            "page_size": page_size,
+            "html_pages": len(listings),
+            "shards": shards,
+            "files": site.files + 1,
+            "bytes": dict(sorted(site.bytes.items())),
+            "total_bytes": site.total_bytes,
+            "phases": {name: round(seconds, 4) for name, seconds in phases.items()},
+            "build_seconds": round(time.perf_counter() - start, 4),
+        }
+        site.write_json("build.json", report, kind="report")
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Swap the finished site in; the old one is removed afterwards
+    old_dir = f"{output.rstrip(os.sep)}.old-{os.getpid()}"
+    if os.path.exists(output):
+        os.replace(output, old_dir)
+    os.replace(tmp_dir, output)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    sizes = ", ".join(f"{kind} {size / 1024 / 1024:.2f} MB" for kind, size in report["bytes"].items())
+    log(f"Static site {store.version}: {len(store)} pieces, {len(listings)} pages, {shards} shards -> {output}")
+    log("  " + " | ".join(f"{name} {seconds:.3f}s" for name, seconds in phases.items()))
+    log(f"  {report['files']} files, {report['total_bytes'] / 1024 / 1024:.2f} MB ({sizes}) "
+        f"built in {report['build_seconds']:.2f}s")
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Pre-render the catalog as a static site.")
+    parser.add_argument("--catalog", metavar="PATH",
+                        default=os.environ.get("CATALOG_PATH", "data/bricklink_pieces.xlsx"),
+                        help="catalog workbook (its snapshot is used when current)")
+    parser.add_argument("--output", metavar="DIR", default=DEFAULT_OUTPUT, help="site folder (default: dist)")
+    parser.add_argument("--page-size", metavar="N", type=int, default=DEFAULT_PAGE_SIZE,
+                        help="pieces per page and per shard (default: CATALOG_PAGE_SIZE or 50)")
+    args = parser.parse_args(argv)
+    if args.page_size < 1:
+        parser.error("--page-size must be at least 1")
+    build_site(CatalogStore.load(args.catalog), args.output, args.page_size)
+
+
+if __name__ == "__main__":
+    main()
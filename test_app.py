@@ -0,0 +1,333 @@
+"""
+Offline checks of the web app's catalog backends, caches and exports.
+Run with pytest from the project root:
+    python -m pytest test_app.py
+"""
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import static_site
+from catalog import SORT_OPTIONS, CatalogManager, CatalogStore
+from catalog_sqlite import SqliteCatalogStore, fts5_available, write_sqlite
+from metrics import MetricsRegistry, mark_process_dead
+from search_index import SearchIndex
+
+
+def _piece(piece_id, name, color, category, price, id_molde=None):
+    return {
+        "Piece_ID": piece_id,
+        "Piece_Name": name,
+        "Color": color,
+        "Category": category,
+        "Price": price,
+        "Image_URL": f"https://img.example/{piece_id}.png",
+        "ID_COLOR": "",
+        "ID_MOLDE": id_molde or piece_id.split("-")[0],
+    }
+
+
+PIECES = [
+    _piece("3001-5", "Brick 2 x 4", "Red", "Bricks", 1.5),
+    _piece("3001-11", "Brick 2 x 4", "Black", "Bricks", 1.5),
+    _piece("3004-5", "Brick 1 x 2", "Red", "Bricks", 0.25),
+    _piece("3020-1", "Plate 2 x 4", "White", "Plates", 0.75),
+    _piece("3023-5", "Plate 1 x 2", "Red", "Plates", 0.1),
+    _piece("3710-2", "Plate 1 x 4", "Tan", "Plates", 0.2),
+    _piece("3070b-1", "Tile 1 x 1 with Groove", "White", "Tiles", 0.05),
+    _piece("3040-5", "Slope 45 2 x 1", "Red", "Slopes", 0.3),
+    _piece("98138-1", "Tile Round 1 x 1", "Trans-Clear", "Tiles", 0.1),
+    _piece("3022-9", "Plate 2 x 2", "Light Bluish Gray", "Plates", 0.3),
+]
+
+
+def _columns(pieces):
+    return {name: [piece[name] for piece in pieces] for name in pieces[0]}
+
+
+def _write_catalog(path, pieces):
+    pd.DataFrame(pieces).to_excel(path, index=False)
+    return path
+
+
+# -- CatalogStore and SqliteCatalogStore ------------------------------------
+
+@pytest.fixture(scope="module")
+def stores(tmp_path_factory):
+    if not fts5_available():
+        pytest.skip("SQLite was built without FTS5")
+    path = str(tmp_path_factory.mktemp("sqlite") / "bricklink_pieces.sqlite")
+    write_sqlite(_columns(PIECES), path, "0" * 64)
+    return CatalogStore(_columns(PIECES)), SqliteCatalogStore(path)
+
+
+@pytest.mark.parametrize("q", [None, "", "plate", "pla", "2 x", "red brick", "3001", "nothing"])
+@pytest.mark.parametrize("category", [None, "all", "Plates", "Tiles", "Missing"])
+@pytest.mark.parametrize("sort", SORT_OPTIONS)
+def test_sqlite_query_rows_matches_memory(stores, q, category, sort):
+    """Both backends filter, sort and page alike (search relevance ties aside)."""
+    memory, sqlite = stores
+    if q and sort == "default":
+        # BM25 and SearchIndex may order equally relevant pieces differently
+        rows, total = memory.query_rows(category, q, sort, limit=len(PIECES))
+        sqlite_rows, sqlite_total = sqlite.query_rows(category, q, sort, limit=len(PIECES))
+        assert (sorted(sqlite_rows), sqlite_total) == (sorted(rows), total)
+        return
+    for offset, limit in [(0, 50), (0, 2), (1, 3), (len(PIECES), 5)]:
+        expected = memory.query_rows(category, q, sort, offset, limit)
+        assert sqlite.query_rows(category, q, sort, offset, limit) == expected
+
+
+def test_sqlite_search_and_count_match_memory(stores):
+    """``search`` finds the same pieces, ``limit`` keeps the best and ``count`` the total."""
+    memory, sqlite = stores
+    for q in ["p", "brick", "2 x 4", "red"]:
+        rows, _ = memory.search(q)
+        sqlite_rows, _ = sqlite.search(q)
+        assert sorted(sqlite_rows.tolist()) == sorted(rows.tolist())
+        assert sqlite.count(q) == memory.count(q) == len(rows)
+        assert len(sqlite.search(q, limit=2)[0]) == len(memory.search(q, limit=2)[0]) == min(2, len(rows))
+    assert sqlite.pieces_at([3, 0]) == [dict(PIECES[3]), dict(PIECES[0])]
+
+
+# -- SearchIndex --------------------------------------------------------------
+
+def _search(index, query, pieces=PIECES, **kwargs):
+    rows, scores = index.search(query, **kwargs)
+    return [pieces[row]["Piece_ID"] for row in rows], scores.tolist()
+
+
+def test_search_index_matches_prefixes_of_every_term():
+    """Each term is a token prefix; all terms must match."""
+    index = SearchIndex(PIECES)
+    assert sorted(_search(index, "pla")[0]) == ["3020-1", "3022-9", "3023-5", "3710-2"]
+    assert sorted(_search(index, "til gro")[0]) == ["3070b-1"]
+    # "2 x 4" is the single token "2x4"; a trailing "2 x" is its prefix
+    assert sorted(_search(index, "plate 2 x 4")[0]) == ["3020-1"]
+    assert sorted(_search(index, "plate 2 x")[0]) == ["3020-1", "3022-9"]
+    assert _search(index, "brick tan") == ([], [])
+    assert _search(index, "  ") == ([], [])
+
+
+def test_search_index_ranks_ids_then_names_then_colors():
+    """Exact tokens beat prefixes, ID fields beat names, names beat colors."""
+    index = SearchIndex(PIECES)
+    ids, scores = _search(index, "3001")
+    assert ids == ["3001-5", "3001-11"] and scores == [16, 16]
+    # "red" is an exact color; "re" only a prefix of it
+    assert _search(index, "red")[1][0] == 2 * _search(index, "re")[1][0]
+    pieces = PIECES + [_piece("9999-1", "Red Plate", "Blue", "Plates", 1.0)]
+    ids, scores = _search(SearchIndex(pieces), "red", pieces)
+    assert ids[0] == "9999-1" and scores[0] > scores[1]
+    # Equal scores keep catalog order
+    assert ids[1:] == ["3001-5", "3004-5", "3023-5", "3040-5"]
+
+
+def test_search_index_mask_restricts_rows():
+    index = SearchIndex(PIECES)
+    mask = CatalogStore(_columns(PIECES))._category_mask("Bricks")
+    assert _search(index, "red", mask=mask, cache_key="Bricks")[0] == ["3001-5", "3004-5"]
+    assert len(_search(index, "red")[0]) == 4
+
+
+# -- CatalogManager -------------------------------------------------------------
+
+def test_catalog_manager_reloads_changed_file(tmp_path):
+    path = _write_catalog(str(tmp_path / "bricklink_pieces.xlsx"), PIECES[:4])
+    manager = CatalogManager(path, poll_interval=0)
+    first = manager.current()
+    assert len(first) == 4
+    assert manager.check_for_changes() is False
+
+    _write_catalog(path, PIECES)
+    assert manager.check_for_changes() is True
+    assert len(manager.current()) == len(PIECES)
+    assert manager.current().version != first.version
+    assert manager.status()["last_reload_error"] is None
+
+
+@pytest.mark.parametrize("broken", [
+    b"not a workbook",
+    # Every row lacks an image, so nothing is left after cleaning
+    [dict(piece, Image_URL=None) for piece in PIECES],
+])
+def test_catalog_manager_keeps_store_on_bad_file(tmp_path, broken):
+    path = _write_catalog(str(tmp_path / "bricklink_pieces.xlsx"), PIECES)
+    results = []
+    manager = CatalogManager(path, poll_interval=0, on_reload=lambda result, *_: results.append(result))
+    store = manager.current()
+
+    if isinstance(broken, bytes):
+        with open(path, "wb") as f:
+            f.write(broken)
+    else:
+        _write_catalog(path, broken)
+    assert manager.check_for_changes() is False
+    assert manager.current() is store
+    assert manager.status()["last_reload_error"]
+    # The bad file is not retried until it changes again
+    assert manager.check_for_changes() is False
+    assert results == ["loaded", "failed"]
+
+
+# -- Index page ETags -------------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def webapp(tmp_path_factory):
+    path = _write_catalog(str(tmp_path_factory.mktemp("catalog") / "bricklink_pieces.xlsx"), PIECES)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("CATALOG_PATH", path)
+        mp.setenv("CATALOG_POLL_SECONDS", "0")
+        for name in ("CATALOG_BACKEND", "CATALOG_STREAM", "CATALOG_FAST_START", "CATALOG_RENDER_MODE"):
+            mp.delenv(name, raising=False)
+        import app
+    return app
+
+
+def _encodings(webapp):
+    page, _ = webapp._index_page(webapp.get_store())
+    return list(page.bodies)
+
+
+@pytest.mark.parametrize("encoding", ["identity", "gzip", "br"])
+def test_index_etag_revalidates_each_encoding(webapp, encoding):
+    """Each encoding has its own ETag, and a client holding it gets a 304."""
+    if encoding not in _encodings(webapp):
+        pytest.skip(f"{encoding} is not available")
+    client = webapp.app.test_client()
+    headers = {"Accept-Encoding": encoding}
+    response = client.get("/", headers=headers)
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding", "identity") == encoding
+    etag = response.headers["ETag"]
+
+    revalidated = client.get("/", headers=dict(headers, **{"If-None-Match": etag}))
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+    assert revalidated.data == b""
+
+    stale = client.get("/", headers=dict(headers, **{"If-None-Match": '"v0-stale"'}))
+    assert stale.status_code == 200
+
+
+def test_index_etags_differ_per_encoding(webapp):
+    client = webapp.app.test_client()
+    etags = {encoding: client.get("/", headers={"Accept-Encoding": encoding}).headers["ETag"]
+             for encoding in _encodings(webapp)}
+    assert len(set(etags.values())) == len(etags)
+    # A client that switched encodings still revalidates the variant it holds
+    response = client.get("/", headers={"Accept-Encoding": "identity", "If-None-Match": etags["gzip"]})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etags["gzip"]
+
+
+# -- Metrics across processes -----------------------------------------------------
+
+def _registry(directory):
+    registry = MetricsRegistry(str(directory), flush_seconds=60)
+    requests = registry.counter("test_requests_total", "Requests.", ("route",))
+    pieces = registry.gauge("test_catalog_pieces", "Pieces.")
+    seconds = registry.histogram("test_load_seconds", "Loads.", buckets=(0.1, 1.0))
+    return registry, requests, pieces, seconds
+
+
+def _copy_as_pid(directory, pid):
+    """Make this process's metrics file look like another worker's."""
+    with open(os.path.join(directory, f"metrics-{os.getpid()}.json"), encoding="utf-8") as f:
+        snapshot = json.load(f)
+    snapshot["pid"] = pid
+    with open(os.path.join(directory, f"metrics-{pid}.json"), "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+
+
+def test_metrics_merge_counters_across_pids(tmp_path):
+    registry, requests, pieces, seconds = _registry(tmp_path)
+    requests.inc(route="/", amount=3)
+    pieces.set(10)
+    seconds.observe(0.5)
+    registry.flush()
+    _copy_as_pid(str(tmp_path), 999999)
+    requests.inc(route="/")
+
+    text = registry.render()
+    assert 'test_requests_total{route="/"} 7' in text
+    assert 'test_load_seconds_bucket{le="1"} 2' in text
+    assert "test_load_seconds_count 2" in text
+    assert f'test_catalog_pieces{{pid="{os.getpid()}"}} 10' in text
+    assert 'test_catalog_pieces{pid="999999"} 10' in text
+
+
+def test_metrics_drop_gauges_of_dead_processes(tmp_path):
+    registry, requests, pieces, _ = _registry(tmp_path)
+    requests.inc(route="/")
+    pieces.set(10)
+    registry.flush()
+    _copy_as_pid(str(tmp_path), 999999)
+
+    mark_process_dead(str(tmp_path), 999999)
+    text = registry.render()
+    assert 'pid="999999"' not in text
+    assert 'test_requests_total{route="/"} 2' in text
+    mark_process_dead(str(tmp_path), 123456789)  # no file: nothing to do
+
+
+# -- Static site --------------------------------------------------------------------
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_build_site_writes_pages_shards_and_index(tmp_path):
+    store = CatalogStore(_columns(PIECES), version="v1-test")
+    output = str(tmp_path / "dist")
+    report = static_site.build_site(store, output, page_size=3, log=lambda line: None)
+
+    assert _read_json(os.path.join(output, "build.json")) == report
+    slugs = static_site.category_slugs(store.categories)
+    assert os.path.isfile(os.path.join(output, "index.html"))
+    for slug in slugs.values():
+        assert os.path.isfile(os.path.join(output, "categoria", slug, "index.html"))
+    assert report["html_pages"] == len(store.categories) + 1
+
+    data_dir = os.path.join(output, "catalog", report["data_hash"])
+    keys = []
+    for page in range(4):
+        shard = _read_json(os.path.join(data_dir, "all", f"page-{page:04d}.json"))
+        assert shard["total"] == len(PIECES) and shard["offset"] == page * 3
+        assert len(shard["cards"]) == len(shard["items"])
+        keys += [item["key"] for item in shard["items"]]
+    assert shard["next_offset"] is None
+    assert len(set(keys)) == len(PIECES)
+    plates = _read_json(os.path.join(data_dir, slugs["Plates"], "page-0000.json"))
+    assert plates["total"] == 4 and {item["Category"] for item in plates["items"]} == {"Plates"}
+
+    search = _read_json(os.path.join(data_dir, "search.json"))
+    assert search["version"] == "v1-test" and len(search["category_codes"]) == len(PIECES)
+    for asset in os.listdir(os.path.join(output, "assets")):
+        assert asset.count(".") == 2  # name.<hash>.ext
+
+
+def test_build_site_swaps_output_only_when_complete(tmp_path, monkeypatch):
+    store = CatalogStore(_columns(PIECES), version="v1-test")
+    output = tmp_path / "dist"
+    output.mkdir()
+    (output / "stale.html").write_text("old")
+
+    def fail(*args):
+        raise RuntimeError("build failed")
+
+    with monkeypatch.context() as mp:
+        mp.setattr(static_site, "search_index_payload", fail)
+        with pytest.raises(RuntimeError):
+            static_site.build_site(store, str(output), page_size=3, log=lambda line: None)
+    assert sorted(os.listdir(tmp_path)) == ["dist"]
+    assert (output / "stale.html").read_text() == "old"
+
+    static_site.build_site(store, str(output), page_size=3, log=lambda line: None)
+    assert sorted(os.listdir(tmp_path)) == ["dist"]
+    assert not (output / "stale.html").exists()
+    assert (output / "index.html").exists()
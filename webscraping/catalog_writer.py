@@ -0,0 +1,399 @@
+"""Incremental writer for the published catalog (Excel + app snapshot + exports).
+
+Chunks of finished piece rows are appended to a streamed temp workbook
+(see ``xlsx_writer``; rows are compressed as they arrive instead of kept
+as a cell tree in memory) and to the snapshot columns, so the pipeline
+never holds the whole catalog as a DataFrame or list of dicts. The published workbook is
+only replaced on ``commit``; if a stage fails mid-run, ``abort`` saves the
+rows written so far next to it as ``<name>.partial.xlsx``.
+
+The cleaned snapshot columns are the one table every extra export is
+written from (Parquet/Feather files, JSON/CSV shards for static hosting,
+the SQLite database the app can serve from).
+All outputs are written to temp paths first and only renamed into place
+once every one of them succeeded, so a failed export never leaves a
+half-written file where the app or the web server reads.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+import abc
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from xlsx_writer import XlsxStreamWriter
+
+try:
+    import pyarrow  # noqa: F401  (backs DataFrame.to_parquet / to_feather)
+except ImportError:  # optional: pip install pyarrow
+    pyarrow = None
+
+DEFAULT_OUTPUT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "bricklink_pieces.xlsx")
+
+# Extra exports written by every pipeline run, e.g. "json,parquet"
+DEFAULT_EXPORT_FORMATS = os.environ.get("PIPELINE_EXPORTS", "")
+
+# Rows per JSON/CSV shard
+DEFAULT_SHARD_ROWS = int(os.environ.get("PIPELINE_SHARD_ROWS", "1000"))
+
+# Shard versions kept in data/catalog_export (the live one and the one before,
+# for clients that fetched the previous manifest)
+KEEP_EXPORT_VERSIONS = 2
+
+# Column order of the published workbook
+COLUMN_ORDER = [
+    "Piece_ID",
+    "ID_COLOR",
+    "ID_MOLDE",
+    "Piece_Name",
+    "Color",
+    "Image_URL",
+    "Weight",
+    "Category",
+    "Price",
+]
+
+
+class CatalogFormat:
+    """The app's side of the published catalog, passed in by the caller.
+
+    The cleaning rules, the snapshot and the SQLite database are defined
+    next to app.py (``catalog.py``, ``catalog_sqlite.py``), which this
+    package doesn't import; ``webscraping.app_catalog_format`` builds
+    this from them.
+
+    Attributes:
+        clean_frame: Applies the app's defaults and drops rows it can't show.
+        file_digest: SHA-256 hex digest of a file (the workbook's version).
+        snapshot_path_for: Workbook path -> snapshot path.
+        write_snapshot: Writes the snapshot columns
+            (``columns, excel_path, path, source_digest``).
+        sqlite_path_for: Workbook path -> database path.
+        write_sqlite: Writes the database (``columns, path, source_digest``).
+        fts5_available: Whether this Python's SQLite can build the search table.
+    """
+
+    def __init__(self, clean_frame: Callable[[pd.DataFrame], pd.DataFrame],
+                 file_digest: Callable[[str], str],
+                 snapshot_path_for: Callable[[str], str],
+                 write_snapshot: Callable[[Mapping[str, List[Any]], str, str, str], Any],
+                 sqlite_path_for: Callable[[str], str],
+                 write_sqlite: Callable[[Mapping[str, List[Any]], str, str], Any],
+                 fts5_available: Callable[[], bool]):
+        self.clean_frame = clean_frame
+        self.file_digest = file_digest
+        self.snapshot_path_for = snapshot_path_for
+        self.write_snapshot = write_snapshot
+        self.sqlite_path_for = sqlite_path_for
+        self.write_sqlite = write_sqlite
+        self.fts5_available = fts5_available
+
+
+def partial_path_for(output_path: str) -> str:
+    """Where the rows of a failed run are saved (``x.xlsx`` -> ``x.partial.xlsx``)."""
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.partial{ext}"
+
+
+def _remove(path: Optional[str]) -> None:
+    if path and os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif path and os.path.exists(path):
+        os.remove(path)
+
+
+class Exporter(abc.ABC):
+    """One extra output of the catalog, written from the cleaned columns.
+
+    ``stage`` writes the output to temp paths; ``publish`` renames them
+    into place and only runs after every exporter staged successfully;
+    ``discard`` removes whatever ``stage`` left behind.
+    """
+
+    @abc.abstractmethod
+    def stage(self, table: Mapping[str, List[Any]], source_digest: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def publish(self) -> List[str]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def discard(self) -> None:
+        raise NotImplementedError
+
+
+class ColumnFileExporter(Exporter):
+    """The cleaned catalog as one Parquet or Feather file next to the workbook."""
+
+    def __init__(self, output_path: str, kind: str = "parquet"):
+        self.kind = kind
+        self.path = f"{os.path.splitext(output_path)[0]}.{kind}"
+        self._tmp_path: Optional[str] = None
+
+    def stage(self, table: Mapping[str, List[Any]], source_digest: str) -> None:
+        self._tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        frame = pd.DataFrame({col: table[col] for col in table})
+        if self.kind == "feather":
+            frame.to_feather(self._tmp_path)
+        else:
+            frame.to_parquet(self._tmp_path, index=False)
+
+    def publish(self) -> List[str]:
+        os.replace(self._tmp_path, self.path)
+        self._tmp_path = None
+        return [self.path]
+
+    def discard(self) -> None:
+        _remove(self._tmp_path)
+        self._tmp_path = None
+
+
+class ShardExporter(Exporter):
+    """The cleaned catalog as JSON and/or CSV shards for static hosting.
+
+    Each run writes a new version folder under ``data/catalog_export``
+    and then swaps ``manifest.json``, which lists the shard files of the
+    live version. Readers that start from the manifest always get a
+    complete set of shards.
+    """
+
+    def __init__(self, output_path: str, formats: Sequence[str] = ("json",),
+                 shard_rows: int = DEFAULT_SHARD_ROWS):
+        self.formats = list(formats)
+        self.shard_rows = shard_rows
+        self.root = os.path.join(os.path.dirname(os.path.abspath(output_path)), "catalog_export")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        self._version: Optional[str] = None
+        self._tmp_dir: Optional[str] = None
+        self._tmp_manifest: Optional[str] = None
+
+    def stage(self, table: Mapping[str, List[Any]], source_digest: str) -> None:
+        self._version = f"{source_digest[:12]}-{time.time_ns():x}"
+        self._tmp_dir = os.path.join(self.root, f".tmp-{os.getpid()}")
+        _remove(self._tmp_dir)
+        os.makedirs(self._tmp_dir)
+
+        frame = pd.DataFrame({col: table[col] for col in table})
+        shards: Dict[str, List[Dict[str, Any]]] = {fmt: [] for fmt in self.formats}
+        for index, start in enumerate(range(0, len(frame), self.shard_rows)):
+            shard = frame.iloc[start:start + self.shard_rows]
+            for fmt in self.formats:
+                name = f"pieces-{index:04d}.{fmt}"
+                path = os.path.join(self._tmp_dir, name)
+                if fmt == "csv":
+                    shard.to_csv(path, index=False)
+                else:
+                    shard.to_json(path, orient="records", force_ascii=False)
+                shards[fmt].append({"file": f"{self._version}/{name}", "rows": len(shard)})
+
+        manifest = {
+            "version": self._version,
+            "source_digest": source_digest,
+            "rows": len(frame),
+            "columns": list(table),
+            "shards": shards,
+        }
+        self._tmp_manifest = f"{self.manifest_path}.tmp-{os.getpid()}"
+        with open(self._tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    def publish(self) -> List[str]:
+        os.replace(self._tmp_dir, os.path.join(self.root, self._version))
+        os.replace(self._tmp_manifest, self.manifest_path)
+        self._tmp_dir = self._tmp_manifest = None
+
+        versions = sorted((entry for entry in os.scandir(self.root)
+                           if entry.is_dir() and not entry.name.startswith(".")),
+                          key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+        for entry in versions[KEEP_EXPORT_VERSIONS:]:
+            if entry.name != self._version:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        return [self.manifest_path]
+
+    def discard(self) -> None:
+        _remove(self._tmp_dir)
+        _remove(self._tmp_manifest)
+        self._tmp_dir = self._tmp_manifest = None
+
+
+class SqliteExporter(Exporter):
+    """The cleaned catalog as the database of ``CATALOG_BACKEND=sqlite``."""
+
+    def __init__(self, output_path: str, catalog_format: CatalogFormat):
+        self.catalog_format = catalog_format
+        self.path = catalog_format.sqlite_path_for(output_path)
+        self._tmp_path: Optional[str] = None
+
+    def stage(self, table: Mapping[str, List[Any]], source_digest: str) -> None:
+        self._tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        self.catalog_format.write_sqlite(table, self._tmp_path, source_digest)
+
+    def publish(self) -> List[str]:
+        os.replace(self._tmp_path, self.path)
+        self._tmp_path = None
+        return [self.path]
+
+    def discard(self) -> None:
+        _remove(self._tmp_path)
+        self._tmp_path = None
+
+
+EXPORT_FORMATS = ("parquet", "feather", "json", "csv", "sqlite")
+
+
+def parse_export_formats(value: str) -> List[str]:
+    """Parse a comma-separated list of export formats (e.g. ``"json,parquet"``)."""
+    formats = [fmt.strip().lower() for fmt in value.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"unknown export format(s) {', '.join(unknown)}; "
+                         f"choose from {', '.join(EXPORT_FORMATS)}")
+    return list(dict.fromkeys(formats))
+
+
+def build_exporters(formats: Sequence[str], catalog_format: CatalogFormat,
+                    output_path: str = DEFAULT_OUTPUT_PATH,
+                    shard_rows: int = DEFAULT_SHARD_ROWS) -> List[Exporter]:
+    """Exporters for ``formats``; Parquet/Feather are skipped without pyarrow, SQLite without FTS5."""
+    exporters: List[Exporter] = []
+    for kind in ("parquet", "feather"):
+        if kind not in formats:
+            continue
+        if pyarrow is None:
+            print(f"⚠️  pyarrow no está instalado: se omite la exportación {kind}")
+            continue
+        exporters.append(ColumnFileExporter(output_path, kind))
+    shard_formats = [fmt for fmt in formats if fmt in ("json", "csv")]
+    if shard_formats:
+        exporters.append(ShardExporter(output_path, shard_formats, shard_rows))
+    if "sqlite" in formats:
+        if catalog_format.fts5_available():
+            exporters.append(SqliteExporter(output_path, catalog_format))
+        else:
+            print("⚠️  SQLite sin FTS5 en este Python: se omite la exportación sqlite")
+    return exporters
+
+
+class CatalogWriter:
+    """Append piece chunks to the catalog workbook and snapshot as they arrive.
+
+    Attributes:
+        output_path: Published workbook path.
+        catalog_format: The app's cleaning and snapshot helpers.
+        exporters: Extra outputs written from the snapshot columns on commit.
+        exported: Paths the exporters published on commit.
+        rows: Rows written to the workbook so far.
+    """
+
+    def __init__(self, catalog_format: CatalogFormat, output_path: str = DEFAULT_OUTPUT_PATH,
+                 exporters: Optional[Sequence[Exporter]] = None):
+        self.output_path = output_path
+        self.catalog_format = catalog_format
+        self.exporters = list(exporters or [])
+        self.exported: List[str] = []
+        self.rows = 0
+        # Rows are compressed into the temp workbook as they arrive
+        self._tmp_path = f"{output_path}.tmp-{os.getpid()}.xlsx"
+        self._sheet = XlsxStreamWriter(self._tmp_path)
+        self._columns: Optional[List[str]] = None
+        self._snapshot: Dict[str, List[Any]] = {}
+        # One shared object per distinct value across chunks
+        self._interned: Dict[str, Dict[Any, Any]] = {}
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """Append one chunk of piece rows."""
+        if self._columns is None:
+            self._columns = [col for col in COLUMN_ORDER if col in chunk.columns]
+            self._sheet.append(self._columns)
+        chunk = chunk[self._columns]
+        # Missing values become empty cells, as with DataFrame.to_excel
+        self._sheet.write_frame(chunk)
+        self.rows += len(chunk)
+
+        cleaned = self.catalog_format.clean_frame(chunk)
+        for col in cleaned.columns:
+            codes, uniques = pd.factorize(cleaned[col], use_na_sentinel=False)
+            interned = self._interned.setdefault(col, {})
+            values = [interned.setdefault(value, value) for value in uniques.tolist()]
+            self._snapshot.setdefault(col, []).extend(np.array(values + [None], dtype=object)[:-1][codes].tolist())
+
+    def commit(self) -> Tuple[str, str]:
+        """Publish the workbook, its snapshot and the exports.
+
+        Everything is staged to temp paths first; nothing is renamed into
+        place unless every output was written.
+
+        Returns:
+            Paths of the workbook and the snapshot.
+        """
+        if self._columns is None:
+            self._columns = list(COLUMN_ORDER)
+            self._sheet.append(self._columns)
+        tmp_path = self._tmp_path
+        snapshot_path = self.catalog_format.snapshot_path_for(self.output_path)
+        tmp_snapshot_path = f"{snapshot_path}.tmp-{os.getpid()}"
+        try:
+            self._sheet.close()
+            source_digest = self.catalog_format.file_digest(tmp_path)
+            self.catalog_format.write_snapshot(self._snapshot, self.output_path, tmp_snapshot_path,
+                                               source_digest)
+            for exporter in self.exporters:
+                exporter.stage(self._snapshot, source_digest)
+        except BaseException:
+            for path in (tmp_path, tmp_snapshot_path):
+                _remove(path)
+            for exporter in self.exporters:
+                exporter.discard()
+            raise
+
+        # The workbook goes first: until the snapshot follows, the app sees
+        # a digest mismatch and reads the new workbook itself
+        os.replace(tmp_path, self.output_path)
+        os.replace(tmp_snapshot_path, snapshot_path)
+        for exporter in self.exporters:
+            self.exported.extend(exporter.publish())
+        partial_path = partial_path_for(self.output_path)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        return self.output_path, snapshot_path
+
+    def abort(self) -> str:
+        """Save the rows written so far without touching the published catalog.
+
+        Returns:
+            Path of the partial workbook.
+        """
+        partial_path = partial_path_for(self.output_path)
+        self._sheet.close()
+        os.replace(self._tmp_path, partial_path)
+        return partial_path
+
+
+def write_catalog(chunks: Iterable[pd.DataFrame], catalog_format: CatalogFormat,
+                  output_path: str = DEFAULT_OUTPUT_PATH,
+                  exporters: Optional[Sequence[Exporter]] = None) -> Tuple[str, str, int]:
+    """Drain a stream of piece chunks into the published catalog.
+
+    If any upstream stage raises, the rows already written are saved with
+    ``CatalogWriter.abort`` and the error is re-raised.
+
+    Returns:
+        Workbook path, snapshot path and number of rows written.
+    """
+    writer = CatalogWriter(catalog_format, output_path, exporters)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+    except BaseException:
+        partial_path = writer.abort()
+        print(f"⚠️  Pipeline interrumpido: {writer.rows} filas guardadas en {partial_path}")
+        raise
+    excel_path, snapshot_path = writer.commit()
+    for path in writer.exported:
+        print(f"✓ Exportado: {path}")
+    return excel_path, snapshot_path, writer.rows
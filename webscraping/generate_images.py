@@ -1,7 +1,13 @@
 """Generate image URLs without HTTP using color_ids and Bricklink patterns."""
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+import pandas as pd
 from color_ids import color_ids
 
+IMAGE_URL_PREFIX = "https://img.bricklink.com/P/"
+# Normalized color name -> color ID as it appears in the URL
+_COLOR_ID_TEXT = {name: str(color_id) for name, color_id in color_ids.items() if color_id}
+
 
 def generate_image_url(id_molde: str, color_name: str, id_color: str | None = None) -> str:
     """
@@ -72,3 +78,101 @@ def batch_generate_image_urls(pieces_list: List[Dict]) -> List[Dict]:
     print()
     
     return pieces_list
+
+
+def _distinct_text(pieces_df: pd.DataFrame, column: str) -> Tuple[np.ndarray, List[str]]:
+    """Factorize a column into per-row codes and its distinct values as text.
+    
+    Missing values and a missing column read as "" (like ``dict.get(column, "")``).
+    """
+    if column not in pieces_df.columns:
+        return np.zeros(len(pieces_df), dtype=np.intp), [""]
+    codes, uniques = pd.factorize(pieces_df[column])
+    # Missing values get code -1; point them at a trailing ""
+    codes[codes < 0] = len(uniques)
+    return codes, [value if isinstance(value, str) else str(value) for value in uniques] + [""]
+
+
+def image_url_column(pieces_df: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized ``generate_image_url`` over a DataFrame of pieces.
+    
+    Gives the same URL per row as ``batch_generate_image_urls``. Each
+    column is factorized first, so color IDs are resolved once per
+    distinct ID_COLOR / color name and each URL string is built once per
+    distinct (color ID, ID_MOLDE) pair.
+    
+    Args:
+        pieces_df (pd.DataFrame): Pieces with ID_MOLDE and COLOR or Color
+            (ID_COLOR optional)
+    
+    Returns:
+        pd.Series: Image URL per row, "N/A" where no color ID is known
+    """
+    molde_codes, moldes = _distinct_text(pieces_df, "ID_MOLDE")
+    id_color_codes, id_colors = _distinct_text(pieces_df, "ID_COLOR")
+    color_codes, colors = _distinct_text(pieces_df, "COLOR")
+    if "Color" in pieces_df.columns:
+        # COLOR falls back to Color where it is empty
+        fallback_codes, fallback = _distinct_text(pieces_df, "Color")
+        empty = np.array([color == "" for color in colors], dtype=bool)[color_codes]
+        color_codes = np.where(empty, fallback_codes + len(colors), color_codes)
+        colors = colors + fallback
+    
+    # Candidate color IDs: every numeric ID_COLOR, then every mapped color name
+    numeric = [id_color.strip() if id_color.strip().isdigit() else None for id_color in id_colors]
+    color_id_texts = numeric + [_COLOR_ID_TEXT.get(color.strip().upper()) for color in colors]
+    is_numeric = np.array([value is not None for value in numeric], dtype=bool)
+    color_id_codes = np.where(is_numeric[id_color_codes], id_color_codes, color_codes + len(numeric))
+    
+    stride = len(moldes)
+    pair_codes, pairs = pd.factorize(color_id_codes.astype(np.int64) * stride + molde_codes)
+    urls = []
+    for pair in pairs.tolist():
+        color_id = color_id_texts[pair // stride]
+        urls.append(f"{IMAGE_URL_PREFIX}{color_id}/{moldes[pair % stride]}.jpg" if color_id else "N/A")
+    return pd.Series(np.array(urls, dtype=object)[pair_codes], index=pieces_df.index, dtype=object)
+
+
+def add_image_urls(pieces_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    DataFrame counterpart of ``batch_generate_image_urls``.
+    
+    Args:
+        pieces_df (pd.DataFrame): Pieces (see ``image_url_column``)
+    
+    Returns:
+        pd.DataFrame: Same frame with an 'Image_URL' column added
+    """
+    print("\n🖼️  Generando URLs de imágenes...")
+    
+    pieces_df["Image_URL"] = image_url_column(pieces_df)
+    total = len(pieces_df)
+    failed = int((pieces_df["Image_URL"] == "N/A").sum())
+    
+    print(f"✓ URLs generadas: {total - failed}/{total}")
+    if failed > 0:
+        print(f"⚠️  URLs no generadas (color no mapeado): {failed}/{total}")
+    print()
+    
+    return pieces_df
+
+
+def image_url_chunks(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """
+    Streaming stage: ``add_image_urls`` per chunk of pieces.
+    
+    Yields:
+        Each chunk with its 'Image_URL' column; totals are printed once the
+        input is exhausted.
+    """
+    total = failed = 0
+    for chunk in chunks:
+        chunk["Image_URL"] = image_url_column(chunk)
+        total += len(chunk)
+        failed += int((chunk["Image_URL"] == "N/A").sum())
+        yield chunk
+    
+    print(f"✓ URLs generadas: {total - failed}/{total}")
+    if failed > 0:
+        print(f"⚠️  URLs no generadas (color no mapeado): {failed}/{total}")
@@ -3,44 +3,78 @@
 Provides functions to load the full inventory and the list of unique
 ID_MOLDEs with normalized column names and defensive defaults.
 """
-from typing import List, Dict
+from typing import Dict, Iterator, List
 import pandas as pd
 import os
+from xlsx_reader import WorkbookColumns, read_workbook_columns
 
+# Inventory rows per chunk in the streaming pipeline
+DEFAULT_CHUNK_ROWS = int(os.environ.get("PIPELINE_CHUNK_ROWS", "5000"))
 
-def import_excel() -> List[Dict]:
-    """Import full inventory (all color variants) from datos_inventario.xlsx.
+INVENTORY_RENAMES = {
+    "ID": "ID_COLOR",
+    "ID MOLDE": "ID_MOLDE",
+    "COLOR": "COLOR",
+}
 
-    Returns a list of dicts with keys like ID_COLOR, ID_MOLDE, COLOR. Column
-    names are normalized to uppercase and string types are enforced for IDs.
-    """
+
+def _data_path(filename: str) -> str:
     # Get the project root directory (one level up from webscraping folder)
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(current_dir)
-    excel_path = os.path.join(project_root, "data", "datos_inventario.xlsx")
-    
-    inventory_df = pd.read_excel(excel_path)
-    inventory_df.columns = [col.strip().upper() for col in inventory_df.columns] 
+    return os.path.join(project_root, "data", filename)
 
-    inventory_df = inventory_df.rename(columns={
-        "ID": "ID_COLOR",       
-        "ID MOLDE": "ID_MOLDE",
-        "COLOR": "COLOR"
-    })
 
-    inventory_df = inventory_df.fillna("")
-    
-    # Convert ID_MOLDE and ID_COLOR to strings to match scraper format
-    inventory_df["ID_MOLDE"] = inventory_df["ID_MOLDE"].astype(str).str.strip()
-    inventory_df["ID_COLOR"] = inventory_df["ID_COLOR"].astype(str).str.strip()
-    
-    # Remove 'nan' string values
-    inventory_df["ID_MOLDE"] = inventory_df["ID_MOLDE"].replace('nan', '')
-    inventory_df["ID_COLOR"] = inventory_df["ID_COLOR"].replace('nan', '')
-    
-    pieces = inventory_df.to_dict(orient="records")
-    print(f"✓ Se cargaron {len(pieces)} piezas desde datos_inventario.xlsx")
-    return pieces
+def _id_text(values: pd.Series) -> pd.Series:
+    """IDs as stripped strings, with missing values as ''."""
+    return values.fillna("").astype(str).str.strip().replace('nan', '')
+
+
+def read_inventory_columns() -> WorkbookColumns:
+    """Read datos_inventario.xlsx column-wise, normalized for the scraper.
+
+    Column names are uppercased (``ID`` -> ``ID_COLOR``, ``ID MOLDE`` ->
+    ``ID_MOLDE``), missing values become '' and the ID columns are strings,
+    as ``pd.read_excel`` + the old per-frame cleanup gave. The cleanup runs
+    once per distinct value; the workbook is read in one streaming pass
+    (or loaded from the ingest cache when unchanged).
+    """
+    workbook = read_workbook_columns(_data_path("datos_inventario.xlsx"))
+    names = [INVENTORY_RENAMES.get(col.strip().upper(), col.strip().upper()) for col in workbook.names]
+    transforms = {name: (lambda values: values.fillna("")) for name in names}
+    transforms["ID_MOLDE"] = transforms["ID_COLOR"] = _id_text
+    return workbook.map_columns(names, transforms)
+
+
+def inventory_unique_moldes(inventory: WorkbookColumns) -> List[str]:
+    """Non-empty ID_MOLDEs of the inventory, in order of first appearance."""
+    return [id_molde for id_molde in dict.fromkeys(inventory.values("ID_MOLDE").tolist()) if id_molde]
+
+
+def import_inventory_frame() -> pd.DataFrame:
+    """Import full inventory (all color variants) from datos_inventario.xlsx.
+
+    Returns a DataFrame with columns like ID_COLOR, ID_MOLDE, COLOR (see
+    ``read_inventory_columns``).
+    """
+    inventory_df = read_inventory_columns().frame()
+    print(f"✓ Se cargaron {len(inventory_df)} piezas desde datos_inventario.xlsx")
+    return inventory_df
+
+
+def import_excel() -> List[Dict]:
+    """Import full inventory as a list of dicts (see ``import_inventory_frame``)."""
+    return import_inventory_frame().to_dict(orient="records")
+
+
+def iter_inventory_chunks(chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield the full inventory in chunks of at most ``chunk_rows`` rows.
+
+    Only one chunk is decoded at a time; the rest stays column-encoded.
+    """
+    inventory = read_inventory_columns()
+    print(f"✓ Se cargaron {inventory.rows} piezas desde datos_inventario.xlsx")
+    yield from inventory.iter_frames(chunk_rows)
 
 
 def import_unique_moldes() -> List[str]:
@@ -49,25 +83,15 @@ def import_unique_moldes() -> List[str]:
     Returns a list of unique ID_MOLDE strings; falls back to extracting
     from the full inventory if the file doesn't exist.
     """
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(current_dir)
-    excel_path = os.path.join(project_root, "data", "id_molde.xlsx")
-    
     try:
-        moldes_df = pd.read_excel(excel_path)
+        moldes_columns = read_workbook_columns(_data_path("id_molde.xlsx"))
         # Normalize column names
-        moldes_df.columns = [col.strip().upper() for col in moldes_df.columns]
+        names = {col.strip().upper(): col for col in moldes_columns.names}
         
-        # Try common column name variations
-        if "ID_MOLDE" in moldes_df.columns:
-            moldes = moldes_df["ID_MOLDE"].astype(str).str.strip().unique().tolist()
-        elif "ID MOLDE" in moldes_df.columns:
-            moldes = moldes_df["ID MOLDE"].astype(str).str.strip().unique().tolist()
-        elif "MOLDE" in moldes_df.columns:
-            moldes = moldes_df["MOLDE"].astype(str).str.strip().unique().tolist()
-        else:
-            # Use first column as fallback
-            moldes = moldes_df.iloc[:, 0].astype(str).str.strip().unique().tolist()
+        # Try common column name variations, first column as fallback
+        column = next((names[name] for name in ("ID_MOLDE", "ID MOLDE", "MOLDE") if name in names),
+                      moldes_columns.names[0])
+        moldes = list(dict.fromkeys(moldes_columns.values(column).astype(str).str.strip().tolist()))
         
         # Remove empty strings and 'nan'
         moldes = [m for m in moldes if m and m.lower() != 'nan']
@@ -77,11 +101,34 @@ def import_unique_moldes() -> List[str]:
     
     except FileNotFoundError:
         print("⚠️  Archivo id_molde.xlsx no encontrado. Extrayendo IDs únicos de datos_inventario.xlsx...")
-        # Fallback: extract unique moldes from full inventory
-        pieces = import_excel()
-        moldes = list(set([p["ID_MOLDE"] for p in pieces if p["ID_MOLDE"]]))
+        # Unique values come out of the same pass that reads the inventory,
+        # and the pass is cached for the merge step
+        moldes = inventory_unique_moldes(read_inventory_columns())
         print(f"✓ Se extrajeron {len(moldes)} ID_MOLDEs únicos del inventario completo")
         return moldes
     except Exception as e:
         print(f"❌ Error al leer id_molde.xlsx: {e}")
-        return []
\ No newline at end of file
+        return []
+
+
+def import_published_catalog(filename: str = "bricklink_pieces.xlsx") -> List[Dict]:
+    """Import the previously published catalog (output of webscraping.py).
+
+    Every column is read as text so IDs keep their exact form; ``Price`` is
+    converted back to a number (or "" when unset). Returns an empty list
+    when the catalog has not been generated yet.
+    """
+    excel_path = _data_path(filename)
+    
+    if not os.path.exists(excel_path):
+        print(f"⚠️  Catálogo publicado {filename} no encontrado")
+        return []
+    
+    catalog_df = pd.read_excel(excel_path, dtype=str, keep_default_na=False)
+    if "Price" in catalog_df.columns:
+        prices = pd.to_numeric(catalog_df["Price"], errors="coerce")
+        catalog_df["Price"] = prices.astype(object).where(prices.notna(), "")
+    
+    pieces = catalog_df.to_dict(orient="records")
+    print(f"✓ Se cargaron {len(pieces)} piezas del catálogo publicado {filename}")
+    return pieces
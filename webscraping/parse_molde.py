@@ -0,0 +1,224 @@
+"""Extract piece name and weight from a Bricklink catalog page.
+
+Catalog pages are large, and only two elements are needed, so building
+a full BeautifulSoup tree is wasted work. The fast path jumps to each
+element with a regex and feeds only that element to a small
+``html.parser`` tokenizer; start tags inside comments, scripts and
+styles are skipped. If an element can't be located or read this way
+(misnested or unterminated markup), the page gets the full parse. The
+result is the same ``.text.strip()`` value the full parse gives.
+
+Run over saved pages to measure parse throughput offline:
+    python parse_molde.py fixtures_dir [--workers N] [--parser fast|strainer|soup]
+"""
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import argparse
+import os
+import re
+import time
+from bs4 import BeautifulSoup, SoupStrainer
+
+NAME_ID = "item-name-title"
+WEIGHT_ID = "item-weight-info"
+TARGETS: Tuple[Tuple[str, str], ...] = (("h1", NAME_ID), ("span", WEIGHT_ID))
+
+# Elements without a closing tag; they never change the nesting depth
+_VOID_TAGS = frozenset({"area", "base", "br", "col", "embed", "hr", "img", "input",
+                        "link", "meta", "param", "source", "track", "wbr"})
+# BeautifulSoup's ``.text`` leaves out the contents of these
+_SKIP_TEXT_TAGS = frozenset({"script", "style", "template"})
+
+
+def _start_tag_re(tag: str, element_id: str) -> "re.Pattern[str]":
+    return re.compile(
+        rf"<{tag}\s[^>]*?(?<=\s)id\s*=\s*(?:\"{element_id}\"|'{element_id}'|{element_id}(?=[\s/>]))[^>]*>",
+        re.IGNORECASE)
+
+
+_START_TAGS = {element_id: _start_tag_re(tag, element_id) for tag, element_id in TARGETS}
+
+
+class _ElementText(HTMLParser):
+    """Collect the text of the first element fed to it, up to its end tag.
+
+    Open tags are tracked on a stack and an end tag closes everything
+    opened after its start tag, as BeautifulSoup does, so ``</h1>`` ends
+    the element even when a ``<p>`` inside it was never closed. An end tag
+    with no open start tag here may close an ancestor (and the element
+    with it), which only the full parse can tell, so ``unsure`` is set.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: List[str] = []
+        self.done = False
+        self.unsure = False
+        self.closing = False
+        self.parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if not self.done and tag not in _VOID_TAGS:
+            self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag not in self.stack:
+            self.done = self.unsure = True
+            return
+        del self.stack[len(self.stack) - 1 - self.stack[::-1].index(tag):]
+        if not self.stack:
+            self.done = True
+
+    def handle_data(self, data):
+        if self.closing:
+            # Markup left unterminated at the end of the page (e.g. "<!--")
+            self.unsure = True
+        if not self.done and self.stack and not _SKIP_TEXT_TAGS.intersection(self.stack):
+            self.parts.append(data)
+
+
+# Start of a region whose contents are not markup (a comment, a script or a style)
+_RAW_START_RE = re.compile(r"<!--|<(script|style)(?=[\s/>])", re.IGNORECASE)
+
+
+def _raw_region_end(html: str, position: int) -> Optional[int]:
+    """End of the comment, script or style region ``position`` falls in, or None.
+
+    Regions are walked from the start of the page, so a ``<!--`` inside a
+    script (or a ``<script`` inside a comment) is not taken for one.
+    """
+    search_from = 0
+    while True:
+        start = _RAW_START_RE.search(html, search_from, position)
+        if start is None:
+            return None
+        if start.group(1):
+            end_tag = re.compile(rf"</{start.group(1)}(?=[\s/>])[^>]*>?", re.IGNORECASE).search(html, start.end())
+            end = end_tag.end() if end_tag else len(html)
+        else:
+            end = html.find("-->", start.end())
+            end = end + 3 if end >= 0 else len(html)
+        if end > position:
+            return end
+        search_from = end
+
+
+def _element_text(html: str, element_id: str) -> Optional[str]:
+    """Return the stripped text of the element, or None if it wasn't found."""
+    match = _START_TAGS[element_id].search(html)
+    while match is not None:
+        # A start tag inside a comment, script or style is only text
+        region_end = _raw_region_end(html, match.start())
+        if region_end is None:
+            break
+        match = _START_TAGS[element_id].search(html, region_end)
+    if match is None:
+        return None
+    parser = _ElementText()
+    # Element text is short; feed growing windows until its end tag shows up
+    start, size = match.start(), 4096
+    while not parser.done and start < len(html):
+        parser.feed(html[start:start + size])
+        start += size
+        size *= 4
+    parser.closing = True
+    parser.close()
+    if parser.unsure or not parser.done:
+        # Stray end tag or element never closed: leave it to BeautifulSoup
+        return None
+    return "".join(parser.parts).strip()
+
+
+def parse_molde_page_soup(html: str) -> Tuple[str, str]:
+    """Reference extraction over a full BeautifulSoup tree (the original path)."""
+    soup = BeautifulSoup(html, "html.parser")
+    title_tag = soup.find("h1", {"id": NAME_ID})
+    weight_tag = soup.find("span", {"id": WEIGHT_ID})
+    return (title_tag.text.strip() if title_tag else "N/A",
+            weight_tag.text.strip() if weight_tag else "N/A")
+
+
+def parse_molde_page_strainer(html: str) -> Tuple[str, str]:
+    """Extraction that only builds tree nodes for the two target elements."""
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer(id=[NAME_ID, WEIGHT_ID]))
+    title_tag = soup.find("h1", {"id": NAME_ID})
+    weight_tag = soup.find("span", {"id": WEIGHT_ID})
+    return (title_tag.text.strip() if title_tag else "N/A",
+            weight_tag.text.strip() if weight_tag else "N/A")
+
+
+def parse_molde_page(html: str) -> Tuple[str, str]:
+    """Return (name, weight) from a catalog page, "N/A" for a missing element."""
+    # An id that appears nowhere in the page can't be on any element
+    name = _element_text(html, NAME_ID) if NAME_ID in html else "N/A"
+    weight = _element_text(html, WEIGHT_ID) if WEIGHT_ID in html else "N/A"
+    if name is None or weight is None:
+        # Unusual markup (or the element is really absent): let the full parse
+        # decide; the strainer drops the element's ancestors, so misnested end
+        # tags can give it different text
+        return parse_molde_page_soup(html)
+    return name, weight
+
+
+PARSERS: Dict[str, Callable[[str], Tuple[str, str]]] = {
+    "fast": parse_molde_page,
+    "strainer": parse_molde_page_strainer,
+    "soup": parse_molde_page_soup,
+}
+
+
+def iter_fixtures(directory: str) -> Iterator[Tuple[str, str]]:
+    """Yield (id_molde, html) for every ``<id_molde>.html`` file in ``directory``."""
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".html"):
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                yield filename[:-len(".html")], f.read()
+
+
+def replay_fixtures(directory: str, parser: str = "fast",
+                    workers: int = 0) -> Tuple[Dict[str, Tuple[str, str]], Dict[str, float]]:
+    """Run a parser over saved pages and measure throughput.
+
+    Args:
+        directory: Folder of ``<id_molde>.html`` pages (see ``SCRAPE_SAVE_HTML``).
+        parser: One of ``PARSERS``.
+        workers: Parse in a process pool of this size (0 parses inline).
+
+    Returns:
+        id_molde -> (name, weight), and stats with pages, MB, seconds and pages/sec.
+    """
+    fixtures = list(iter_fixtures(directory))
+    parse = PARSERS[parser]
+    start = time.perf_counter()
+    if workers > 0:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(parse, [html for _, html in fixtures], chunksize=8))
+    else:
+        parsed = [parse(html) for _, html in fixtures]
+    seconds = time.perf_counter() - start
+
+    results = {id_molde: result for (id_molde, _), result in zip(fixtures, parsed)}
+    stats = {
+        "pages": len(fixtures),
+        "mb": sum(len(html) for _, html in fixtures) / 1024 / 1024,
+        "seconds": seconds,
+        "pages_per_sec": len(fixtures) / seconds if seconds else 0.0,
+    }
+    return results, stats
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Replay saved catalog pages through the parser.")
+    arg_parser.add_argument("directory")
+    arg_parser.add_argument("--parser", choices=sorted(PARSERS), default="fast")
+    arg_parser.add_argument("--workers", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    results, stats = replay_fixtures(args.directory, args.parser, args.workers)
+    missing = sum(1 for name, _ in results.values() if name == "N/A")
+    print(f"📄 {stats['pages']} páginas ({stats['mb']:.1f} MB) en {stats['seconds']:.2f}s: "
+          f"{stats['pages_per_sec']:.0f} páginas/s ({args.parser}, workers={args.workers}), "
+          f"{missing} sin nombre")
@@ -1,7 +1,14 @@
 """Extract and match categories from piece names using known categories."""
 from typing import Dict
+import re
+import numpy as np
+import pandas as pd
 from categories import categories
 
+DEFAULT_CATEGORY = "MISCELLANEOUS"
+# Matched as name prefixes before any single-word rule, in this order
+MULTI_WORD_CATEGORIES = ("CURVED SLOPE", "MINIFIGURE", "BASEPLATE")
+
 
 def extract_category_from_name(piece_name: str) -> str:
     """
@@ -27,13 +34,7 @@ def extract_category_from_name(piece_name: str) -> str:
     
     # Special handling for multi-word categories
     # Check these first before single-word matching
-    multi_word_categories = [
-        "CURVED SLOPE",
-        "MINIFIGURE",
-        "BASEPLATE"
-    ]
-    
-    for category in multi_word_categories:
+    for category in MULTI_WORD_CATEGORIES:
         if name_upper.startswith(category):
             return category
     
@@ -53,6 +54,66 @@ def extract_category_from_name(piece_name: str) -> str:
     return "MISCELLANEOUS"
 
 
+def _compile_prefix_matcher() -> "re.Pattern[str]":
+    """Rules 1-2 as one anchored regex: a multi-word prefix, else a category first word."""
+    single_word = [category for category in categories if " " not in category]
+    return re.compile("(" + "|".join(map(re.escape, MULTI_WORD_CATEGORIES)) + ")|("
+                      + "|".join(map(re.escape, single_word)) + r")(?!\S)")
+
+
+_PREFIX_MATCHER = _compile_prefix_matcher()
+
+
+def categorize_series(names: pd.Series) -> pd.Series:
+    """
+    Classify a whole Series of piece names at once.
+    
+    Same labels as ``extract_category_from_name`` applied to each name.
+    Repeated names are classified once. The multi-word prefix and first
+    word rules are one compiled regex match per name; for the remaining
+    names, each category is searched once across all of them joined
+    together and hits are mapped back to rows, keeping the first category
+    in list order.
+    
+    Args:
+        names (pd.Series): Piece names (missing values count as "N/A")
+    
+    Returns:
+        pd.Series: Category per name, aligned with ``names``
+    """
+    codes, uniques = pd.factorize(names)
+    labels = np.full(len(uniques) + 1, DEFAULT_CATEGORY, dtype=object)  # last slot: missing names
+    
+    # Empty and "N/A" names match no rule, so they fall through to the default
+    uppers = [str(name).upper().strip() for name in uniques.tolist()]
+    matches = list(map(_PREFIX_MATCHER.match, uppers))
+    undecided_rows = [row for row, match in enumerate(matches) if match is None]
+    undecided_text = [uppers[row] for row in undecided_rows]
+    for row, match in enumerate(matches):
+        if match is not None:
+            labels[row] = match[match.lastindex]
+    
+    if undecided_text:
+        # Categories never contain "\n", so a hit can't span two names
+        text = "\n".join(undecided_text)
+        lengths = np.fromiter(map(len, undecided_text), dtype=np.int64, count=len(undecided_text)) + 1
+        starts = np.cumsum(lengths) - lengths
+        best = np.full(len(undecided_text), len(categories), dtype=np.int64)
+        for priority, category in enumerate(categories):
+            # Splitting finds every occurrence in C; piece lengths give the positions
+            parts = text.split(category)
+            if len(parts) == 1:
+                continue
+            part_lengths = np.fromiter(map(len, parts[:-1]), dtype=np.int64, count=len(parts) - 1)
+            positions = np.cumsum(part_lengths + len(category)) - len(category)
+            np.minimum.at(best, np.searchsorted(starts, positions, side="right") - 1, priority)
+        found = best < len(categories)
+        labels[np.asarray(undecided_rows, dtype=np.int64)[found]] = np.asarray(categories, dtype=object)[best[found]]
+    
+    # Missing names have code -1, which picks the trailing default
+    return pd.Series(labels[codes], index=names.index, dtype=object)
+
+
 def batch_categorize(molde_data: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
     """
     Add category field to molde data dictionary.
@@ -65,8 +126,8 @@ def batch_categorize(molde_data: Dict[str, Dict[str, str]]) -> Dict[str, Dict[st
     """
     print("\n📂 Categorizando piezas...")
     
-    for id_molde, data in molde_data.items():
-        category = extract_category_from_name(data["name"])
+    names = pd.Series([data["name"] for data in molde_data.values()], dtype=object)
+    for data, category in zip(molde_data.values(), categorize_series(names)):
         data["category"] = category
     
     # Print category distribution
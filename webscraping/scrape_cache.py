@@ -0,0 +1,109 @@
+"""Persistent SQLite cache of scraped ID_MOLDE data.
+
+Every scrape result is written as soon as it arrives, so the cache doubles
+as the pipeline checkpoint: an interrupted run resumes by skipping every
+mold that already has a fresh result. Failures are kept too (with the
+error and attempt count) and are always retried on the next run.
+"""
+from typing import Dict, Iterable, List, Optional
+import os
+import re
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "scrape_cache.sqlite")
+# Successful entries older than this are re-fetched
+DEFAULT_TTL_SECONDS = float(os.environ.get("SCRAPE_CACHE_TTL_DAYS", "30")) * 86400
+
+_DURATION_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*$")
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800, "": 86400}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS moldes (
+    id_molde   TEXT PRIMARY KEY,
+    name       TEXT,
+    weight     TEXT,
+    status     TEXT NOT NULL,   -- 'ok' or 'failed'
+    error      TEXT,
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    fetched_at REAL NOT NULL
+)
+"""
+
+
+def parse_duration(text: str) -> float:
+    """Parse "30d", "12h", "45m", "90s", "2w" (bare numbers are days) into seconds."""
+    match = _DURATION_RE.match(str(text))
+    if not match:
+        raise ValueError(f"invalid duration {text!r} (expected e.g. 7d, 12h, 30m)")
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+class ScrapeCache:
+    """id_molde -> {name, weight} with fetch timestamps and failure records."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def fresh(self, id_moldes: Iterable[str],
+              max_age: Optional[float] = DEFAULT_TTL_SECONDS) -> Dict[str, Dict[str, str]]:
+        """Return cached results fetched successfully within ``max_age`` seconds.
+
+        ``max_age=None`` returns every successful result regardless of age.
+        """
+        cutoff = time.time() - max_age if max_age is not None else 0.0
+        wanted = set(id_moldes)
+        rows = self._conn.execute(
+            "SELECT id_molde, name, weight FROM moldes WHERE status = 'ok' AND fetched_at >= ?",
+            (cutoff,))
+        return {id_molde: {"name": name, "weight": weight}
+                for id_molde, name, weight in rows if id_molde in wanted}
+
+    def record_success(self, id_molde: str, name: str, weight: str) -> None:
+        self._conn.execute(
+            "INSERT INTO moldes (id_molde, name, weight, status, error, attempts, fetched_at) "
+            "VALUES (?, ?, ?, 'ok', NULL, 1, ?) "
+            "ON CONFLICT(id_molde) DO UPDATE SET name = excluded.name, weight = excluded.weight, "
+            "status = 'ok', error = NULL, attempts = moldes.attempts + 1, fetched_at = excluded.fetched_at",
+            (id_molde, name, weight, time.time()))
+        self._conn.commit()
+
+    def record_failure(self, id_molde: str, error: str) -> None:
+        """Record a failed fetch; an earlier good result for the mold is kept."""
+        self._conn.execute(
+            "INSERT INTO moldes (id_molde, status, error, attempts, fetched_at) "
+            "VALUES (?, 'failed', ?, 1, ?) "
+            "ON CONFLICT(id_molde) DO UPDATE SET error = excluded.error, attempts = moldes.attempts + 1, "
+            "status = CASE WHEN moldes.name IS NULL THEN 'failed' ELSE moldes.status END, "
+            "fetched_at = CASE WHEN moldes.name IS NULL THEN excluded.fetched_at ELSE moldes.fetched_at END",
+            (id_molde, error, time.time()))
+        self._conn.commit()
+
+    def failures(self) -> List[Dict[str, object]]:
+        """Return molds whose last fetch failed, most attempts first."""
+        rows = self._conn.execute(
+            "SELECT id_molde, error, attempts, fetched_at FROM moldes "
+            "WHERE status = 'failed' ORDER BY attempts DESC, id_molde")
+        return [{"id_molde": id_molde, "error": error, "attempts": attempts, "fetched_at": fetched_at}
+                for id_molde, error, attempts, fetched_at in rows]
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM moldes GROUP BY status")
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "ScrapeCache":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
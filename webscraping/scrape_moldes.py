@@ -1,99 +1,237 @@
 """Scrape unique ID_MOLDE data from Bricklink (name and weight)."""
-from typing import Optional, Dict, List, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Optional, Dict, List, Tuple
+import contextlib
+import os
 import requests
-from bs4 import BeautifulSoup
 import time
 import random
+from fetch_engine import FetchEngine, timed_session
+from parse_molde import parse_molde_page
+from scrape_cache import DEFAULT_TTL_SECONDS, ScrapeCache
+from scrape_telemetry import ScrapeTelemetry, request_error_class
 
+# Overridable so the scraper can be pointed at a local stub server
+BRICKLINK_BASE_URL = os.environ.get("BRICKLINK_BASE_URL", "https://www.bricklink.com")
+# Requests in flight at once; 1 keeps the original one-at-a-time loop
+SCRAPE_CONCURRENCY = int(os.environ.get("SCRAPE_CONCURRENCY", "4"))
+# Processes that parse pages off the fetch threads; 0 parses inline
+SCRAPE_PARSE_WORKERS = int(os.environ.get("SCRAPE_PARSE_WORKERS", "0"))
+# When set, every fetched page is saved there as <id_molde>.html (parser fixtures)
+SCRAPE_SAVE_HTML = os.environ.get("SCRAPE_SAVE_HTML")
 
-def scrape_molde_data(id_molde: str, headers: Optional[Dict[str, str]] = None) -> Optional[Dict[str, str]]:
+
+def molde_url(id_molde: str, base_url: Optional[str] = None) -> str:
+    """Return the Bricklink catalog page URL for an ID_MOLDE."""
+    return f"{base_url or BRICKLINK_BASE_URL}/v2/catalog/catalogitem.page?P={id_molde}"
+
+
+def fetch_molde_data(id_molde: str, headers: Optional[Dict[str, str]] = None,
+                     session: Any = None, base_url: Optional[str] = None,
+                     parse_pool: Optional[Executor] = None,
+                     telemetry: Optional[ScrapeTelemetry] = None
+                     ) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
     """
-    Scrape data for a single ID_MOLDE from Bricklink.
+    Scrape data for a single ID_MOLDE from Bricklink, keeping the failure reason.
     
     Args:
         id_molde (str): The piece ID to scrape
         headers (dict): Optional HTTP headers for the request
+        session: Object with a ``requests.get``-style ``get`` (a Session or
+            a FetchEngine); defaults to a one-off session, like ``requests.get``
+        base_url (str): Optional Bricklink base URL override
+        parse_pool: Optional executor that runs the page parse
+        telemetry: Optional run telemetry that gets this fetch's ``FetchRecord``
     
     Returns:
-    dict | None: {"id_molde", "name", "weight"} or None if failed
+    tuple: ({"id_molde", "name", "weight"}, None) on success, or
+        (None, error description) if failed
     """
     if headers is None:
         headers = {"User-Agent": "Mozilla/5.0"}
     
-    url = f"https://www.bricklink.com/v2/catalog/catalogitem.page?P={id_molde}"
+    url = molde_url(id_molde, base_url)
     
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code != 200:
-            print(f"⚠️  Error {response.status_code} al acceder ID_MOLDE: {id_molde}")
-            return None
-        
-        soup = BeautifulSoup(response.text, "html.parser")
+    with (telemetry or ScrapeTelemetry()).fetch(id_molde, url) as record, contextlib.ExitStack() as stack:
+        if session is None:
+            session = stack.enter_context(timed_session(headers))
+        start = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers, timeout=10)
+            record.total = time.perf_counter() - start
+            record.ttfb = response.elapsed.total_seconds()
+            record.status = response.status_code
+            record.bytes = len(response.content)
+            
+            if response.status_code != 200:
+                print(f"⚠️  Error {response.status_code} al acceder ID_MOLDE: {id_molde}")
+                record.fail("http", f"HTTP {response.status_code}")
+                return None, f"HTTP {response.status_code}"
+            
+            html = response.text
+            if SCRAPE_SAVE_HTML:
+                os.makedirs(SCRAPE_SAVE_HTML, exist_ok=True)
+                with open(os.path.join(SCRAPE_SAVE_HTML, f"{id_molde}.html"), "w", encoding="utf-8") as f:
+                    f.write(html)
+            
+            # Extract piece name and weight (h1#item-name-title, span#item-weight-info)
+            parse_start = time.perf_counter()
+            if parse_pool is not None:
+                piece_name, weight = parse_pool.submit(parse_molde_page, html).result()
+            else:
+                piece_name, weight = parse_molde_page(html)
+            record.parse = time.perf_counter() - parse_start
+            if piece_name == "N/A":
+                record.fail("parse_miss", "item name not found in page")
+            elif weight == "N/A":
+                record.fail("na_fields", "item weight not found in page")
+            
+            return {
+                "id_molde": id_molde,
+                "name": piece_name,
+                "weight": weight
+            }, None
         
-        # Extract piece name
-        title_tag = soup.find("h1", {"id": "item-name-title"})
-        piece_name = title_tag.text.strip() if title_tag else "N/A"
-        
-        # Extract weight
-        weight_tag = soup.find("span", {"id": "item-weight-info"})
-        weight = weight_tag.text.strip() if weight_tag else "N/A"
-        
-        return {
-            "id_molde": id_molde,
-            "name": piece_name,
-            "weight": weight
+        except requests.RequestException as e:
+            if record.total is None:
+                record.total = time.perf_counter() - start
+            record.fail(request_error_class(e), f"{type(e).__name__}: {e}")
+            print(f"⚠️  Request error para ID_MOLDE {id_molde}: {e}")
+            return None, f"{type(e).__name__}: {e}"
+        except Exception as e:
+            record.fail("other", f"{type(e).__name__}: {e}")
+            print(f"⚠️  Error inesperado para ID_MOLDE {id_molde}: {e}")
+            return None, f"{type(e).__name__}: {e}"
+
+
+def scrape_molde_data(id_molde: str, headers: Optional[Dict[str, str]] = None,
+                      session: Any = None, base_url: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """
+    Scrape data for a single ID_MOLDE from Bricklink.
+    
+    Same arguments as ``fetch_molde_data``.
+    
+    Returns:
+    dict | None: {"id_molde", "name", "weight"} or None if failed
+    """
+    return fetch_molde_data(id_molde, headers, session, base_url)[0]
+
+
+def _record_result(molde_data: Dict[str, Dict[str, str]], id_molde: str,
+                   result: Tuple[Optional[Dict[str, str]], Optional[str]], idx: int, total: int,
+                   cache: Optional[ScrapeCache] = None,
+                   stale: Optional[Dict[str, Dict[str, str]]] = None) -> None:
+    """Store one scrape result (N/A on failure), checkpoint it and print progress."""
+    data, error = result
+    if data and data["name"] == "N/A":
+        data, error = None, "item name not found in page"
+    if data:
+        molde_data[id_molde] = {
+            "name": data["name"],
+            "weight": data["weight"]
         }
+        if cache is not None:
+            cache.record_success(id_molde, data["name"], data["weight"])
+        print(f"✓ [{idx}/{total}] {id_molde}: {data['name'][:50]}...")
+        return
     
-    except requests.RequestException as e:
-        print(f"⚠️  Request error para ID_MOLDE {id_molde}: {e}")
-        return None
-    except Exception as e:
-        print(f"⚠️  Error inesperado para ID_MOLDE {id_molde}: {e}")
-        return None
+    if cache is not None:
+        cache.record_failure(id_molde, error or "unknown error")
+    if stale and id_molde in stale:
+        # Keep the last good result rather than losing the mold
+        molde_data[id_molde] = dict(stale[id_molde])
+        print(f"✗ [{idx}/{total}] {id_molde}: FAILED (se conserva el dato en caché)")
+        return
+    # Store N/A for failed scrapes
+    molde_data[id_molde] = {
+        "name": "N/A",
+        "weight": "N/A"
+    }
+    print(f"✗ [{idx}/{total}] {id_molde}: FAILED")
 
 
-def scrape_multiple_moldes(id_moldes: List[str], delay_range: Tuple[float, float] = (1.5, 2.5)) -> Dict[str, Dict[str, str]]:
+def scrape_multiple_moldes(id_moldes: List[str], delay_range: Tuple[float, float] = (1.5, 2.5),
+                           concurrency: Optional[int] = None,
+                           base_url: Optional[str] = None,
+                           cache: Optional[ScrapeCache] = None,
+                           max_age: float = DEFAULT_TTL_SECONDS,
+                           telemetry: Optional[ScrapeTelemetry] = None) -> Dict[str, Dict[str, str]]:
     """
     Scrape data for multiple unique ID_MOLDEs with rate limiting.
     
+    With ``concurrency`` > 1 requests go through a ``FetchEngine``: pooled
+    keep-alive connections, that many requests in flight, and a global
+    limit of one request per average delay (the same requests per second
+    as the sequential loop, without waiting on each response first).
+    
+    With a ``cache``, molds fetched successfully within ``max_age`` seconds
+    are reused without a request, and every new result is written to the
+    cache as it arrives, so an interrupted run resumes where it stopped.
+    
+    Every request is recorded in ``telemetry`` (timings, status, error
+    class); a one-line latency / error digest is printed at the end.
+    
     Args:
         id_moldes (list): List of unique ID_MOLDE strings
         delay_range (tuple): Min and max delay in seconds between requests
+        concurrency (int): Requests in flight (default ``SCRAPE_CONCURRENCY``)
+        base_url (str): Optional Bricklink base URL override
+        cache (ScrapeCache): Optional persistent cache / checkpoint
+        max_age (float): Seconds a cached result stays fresh
+        telemetry (ScrapeTelemetry): Optional collector for the run report
     
     Returns:
-        dict: Mapping id_molde -> {name, weight}
+        dict: Mapping id_molde -> {name, weight}, in input order
     """
     headers = {"User-Agent": "Mozilla/5.0"}
     molde_data = {}
-    total = len(id_moldes)
+    stale: Dict[str, Dict[str, str]] = {}
+    if concurrency is None:
+        concurrency = SCRAPE_CONCURRENCY
+    if telemetry is None:
+        telemetry = ScrapeTelemetry()
+    
+    pending = list(id_moldes)
+    if cache is not None:
+        molde_data = cache.fresh(id_moldes, max_age)
+        stale = cache.fresh(id_moldes, None)
+        pending = [id_molde for id_molde in id_moldes if id_molde not in molde_data]
+        print(f"♻️  {len(molde_data)} ID_MOLDEs recientes en caché ({cache.path})")
+    total = len(pending)
+    telemetry.cached = len(id_moldes) - total
+    rate = 2.0 / (delay_range[0] + delay_range[1])
+    telemetry.begin(moldes=len(id_moldes), pending=total, concurrency=concurrency,
+                    rate=round(rate, 4), parse_workers=SCRAPE_PARSE_WORKERS)
     
     print(f"\n🔍 Iniciando scraping de {total} ID_MOLDEs únicos...")
     print("=" * 60)
     
-    for idx, id_molde in enumerate(id_moldes, 1):
-        data = scrape_molde_data(id_molde, headers)
-        
-        if data:
-            molde_data[id_molde] = {
-                "name": data["name"],
-                "weight": data["weight"]
-            }
-            print(f"✓ [{idx}/{total}] {id_molde}: {data['name'][:50]}...")
-        else:
-            # Store N/A for failed scrapes
-            molde_data[id_molde] = {
-                "name": "N/A",
-                "weight": "N/A"
-            }
-            print(f"✗ [{idx}/{total}] {id_molde}: FAILED")
-        
-        # Rate limiting - skip delay on last item
-        if idx < total:
-            delay = delay_range[0] + random.random() * (delay_range[1] - delay_range[0])
-            time.sleep(delay)
+    if concurrency > 1:
+        print(f"⚡ {concurrency} conexiones en paralelo, máximo {rate:.2f} solicitudes/s")
+        with contextlib.ExitStack() as stack:
+            engine = stack.enter_context(FetchEngine(concurrency=concurrency, rate=rate, headers=headers))
+            parse_pool = (stack.enter_context(ProcessPoolExecutor(max_workers=SCRAPE_PARSE_WORKERS))
+                          if SCRAPE_PARSE_WORKERS > 0 else None)
+            fetch = lambda id_molde: fetch_molde_data(id_molde, headers, session=engine,
+                                                      base_url=base_url, parse_pool=parse_pool,
+                                                      telemetry=telemetry)
+            for idx, (id_molde, result) in enumerate(engine.map(fetch, pending), 1):
+                _record_result(molde_data, id_molde, result, idx, total, cache, stale)
+    else:
+        for idx, id_molde in enumerate(pending, 1):
+            result = fetch_molde_data(id_molde, headers, base_url=base_url, telemetry=telemetry)
+            _record_result(molde_data, id_molde, result, idx, total, cache, stale)
+            
+            # Rate limiting - skip delay on last item
+            if idx < total:
+                delay = delay_range[0] + random.random() * (delay_range[1] - delay_range[0])
+                time.sleep(delay)
+    telemetry.end()
+    molde_data = {id_molde: molde_data[id_molde] for id_molde in id_moldes}
     
     print("=" * 60)
-    print(f"✓ Scraping completado: {len([d for d in molde_data.values() if d['name'] != 'N/A'])}/{total} exitosos\n")
+    if total:
+        print(telemetry.summary_line())
+    print(f"✓ Scraping completado: {len([d for d in molde_data.values() if d['name'] != 'N/A'])}/{len(molde_data)} exitosos\n")
     
     return molde_data
@@ -0,0 +1,214 @@
+"""Per-request telemetry for scraper runs.
+
+Every page fetch produces one ``FetchRecord``: phase timings (rate-limit
+wait, DNS, connect, TLS, time to first byte, total, parse), status code,
+body size and an error class. A ``ScrapeTelemetry`` collects the records
+of a run and reduces them to a summary (latency percentiles, requests per
+second, status and error histograms) written as JSON, one file per run,
+so slow runs can be told apart (Bricklink latency, 429s, timeouts, markup
+changes) and compared over time.
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+import contextlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import requests
+
+from fetch_engine import timed_phases
+
+DEFAULT_TELEMETRY_DIR = os.environ.get("SCRAPE_TELEMETRY_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "scrape_telemetry")
+
+# Error classes, in the order they are reported
+ERROR_CLASSES = (
+    "http",        # response other than 200 (see status_codes for 429s, 404s, ...)
+    "timeout",     # connect or read timeout
+    "connection",  # DNS failure, refused or reset connection
+    "parse_miss",  # 200 page without the item name
+    "na_fields",   # item name found, other fields N/A (not a failure)
+    "other",       # anything else raised while fetching or parsing
+)
+# Errors that leave the mold without data
+FAILURE_CLASSES = frozenset({"http", "timeout", "connection", "parse_miss", "other"})
+
+TIMING_FIELDS = ("queued", "dns", "connect", "tls", "ttfb", "total", "parse")
+PERCENTILES = (50, 95, 99)
+
+
+class FetchRecord:
+    """Measurements of one page fetch.
+
+    Timings are in seconds; ``dns``/``connect``/``tls`` are None when a
+    kept-alive connection was reused and ``ttfb`` is None when no response
+    arrived. ``total`` (until the body is read, or the request failed)
+    excludes the rate-limit wait, ``queued``.
+    """
+
+    __slots__ = ("id_molde", "url", "started_at", "status", "bytes", "error_class", "error") + TIMING_FIELDS
+
+    def __init__(self, id_molde: str, url: str):
+        self.id_molde = id_molde
+        self.url = url
+        self.started_at = time.time()
+        self.status: Optional[int] = None
+        self.bytes = 0
+        self.error_class: Optional[str] = None
+        self.error: Optional[str] = None
+        for field in TIMING_FIELDS:
+            setattr(self, field, None)
+
+    def fail(self, error_class: str, error: str) -> None:
+        self.error_class = error_class
+        self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+def request_error_class(error: requests.RequestException) -> str:
+    """Error class of an exception raised by ``requests``."""
+    # ConnectTimeout is both a Timeout and a ConnectionError
+    if isinstance(error, requests.Timeout):
+        return "timeout"
+    if isinstance(error, (requests.ConnectionError, requests.exceptions.ChunkedEncodingError)):
+        return "connection"
+    return "other"
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 6)
+
+
+def latency_stats(values: List[float]) -> Dict[str, Any]:
+    """Count, mean, max and p50/p95/p99 of a list of seconds (in ms)."""
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values, dtype=float) * 1000
+    stats: Dict[str, Any] = {"count": len(values), "mean_ms": round(float(ms.mean()), 3),
+                             "max_ms": round(float(ms.max()), 3)}
+    for percentile, value in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+        stats[f"p{percentile}_ms"] = round(float(value), 3)
+    return stats
+
+
+class ScrapeTelemetry:
+    """Collects the ``FetchRecord``s of one scraper run (thread-safe).
+
+    Attributes:
+        records: Records in completion order.
+        cached: Molds served from the scrape cache without a request.
+        settings: Run parameters copied into the report (concurrency, rate, ...).
+    """
+
+    def __init__(self):
+        self.records: List[FetchRecord] = []
+        self.cached = 0
+        self.settings: Dict[str, Any] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def begin(self, **settings: Any) -> None:
+        """Mark the start of the fetch phase (the requests/sec window)."""
+        self.settings.update(settings)
+        self.started_at = time.time()
+
+    def end(self) -> None:
+        self.finished_at = time.time()
+
+    @contextlib.contextmanager
+    def fetch(self, id_molde: str, url: str) -> Iterator[FetchRecord]:
+        """Record one fetch; phase timings of requests made inside are collected.
+
+        The caller stores the wall time of the GET in ``total`` and the
+        response's ``elapsed`` (request sent -> headers parsed) in ``ttfb``;
+        the rate-limit wait and the connection setup are taken out of them
+        here.
+        """
+        record = FetchRecord(id_molde, url)
+        phases: Dict[str, float] = {}
+        try:
+            with timed_phases() as phases:
+                yield record
+        finally:
+            for field in ("queued", "dns", "connect", "tls"):
+                setattr(record, field, phases.get(field))
+            if record.total is not None:
+                record.total = max(0.0, record.total - phases.get("queued", 0.0))
+            if record.ttfb is not None:
+                setup = sum(phases.get(field, 0.0) for field in ("dns", "connect", "tls"))
+                record.ttfb = max(0.0, record.ttfb - setup)
+            with self._lock:
+                self.records.append(record)
+
+    def summary(self) -> Dict[str, Any]:
+        """Reduce the records to the run report (see module docstring)."""
+        records = list(self.records)
+        started = self.started_at or (min((r.started_at for r in records), default=time.time()))
+        finished = self.finished_at or time.time()
+        wall = max(finished - started, 1e-9)
+
+        errors = {error_class: 0 for error_class in ERROR_CLASSES}
+        status_codes: Dict[str, int] = {}
+        for record in records:
+            if record.error_class:
+                errors[record.error_class] += 1
+            if record.status is not None:
+                status_codes[str(record.status)] = status_codes.get(str(record.status), 0) + 1
+        latency = {field: latency_stats([getattr(r, field) for r in records if getattr(r, field) is not None])
+                   for field in TIMING_FIELDS}
+        failed = sum(1 for r in records if r.error_class in FAILURE_CLASSES)
+
+        return {
+            "started_at": datetime.fromtimestamp(started).isoformat(timespec="seconds"),
+            "finished_at": datetime.fromtimestamp(finished).isoformat(timespec="seconds"),
+            "wall_seconds": round(wall, 3),
+            "settings": self.settings,
+            "requests": len(records),
+            "requests_per_sec": round(len(records) / wall, 3),
+            "succeeded": len(records) - failed,
+            "failed": failed,
+            "cached": self.cached,
+            "bytes": sum(r.bytes for r in records),
+            "new_connections": sum(1 for r in records if r.connect is not None),
+            "latency": latency,
+            "status_codes": dict(sorted(status_codes.items())),
+            "errors": errors,
+            "slowest": [{"id_molde": r.id_molde, "total_ms": round(r.total * 1000, 3), "status": r.status}
+                        for r in sorted((r for r in records if r.total is not None),
+                                        key=lambda r: r.total, reverse=True)[:10]],
+        }
+
+    def summary_line(self) -> str:
+        """One-line digest of the run for the console."""
+        summary = self.summary()
+        total = summary["latency"]["total"]
+        errors = ", ".join(f"{name} {count}" for name, count in summary["errors"].items() if count) or "ninguno"
+        if not total["count"]:
+            return f"📈 {summary['requests']} solicitudes, errores: {errors}"
+        return (f"📈 Latencia p50 {total['p50_ms']:.0f} ms, p95 {total['p95_ms']:.0f} ms, "
+                f"p99 {total['p99_ms']:.0f} ms | {summary['requests_per_sec']:.2f} solicitudes/s | "
+                f"errores: {errors}")
+
+    def write(self, directory: str = DEFAULT_TELEMETRY_DIR) -> str:
+        """Write the summary and every record as ``scrape-<start time>.json``.
+
+        Returns:
+            Path of the report.
+        """
+        report = self.summary()
+        report["records"] = [{key: _rounded(value) if key in TIMING_FIELDS else value
+                              for key, value in record.to_dict().items()} for record in self.records]
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.fromtimestamp(self.started_at or time.time()).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(directory, f"scrape-{stamp}.json")
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+        return path
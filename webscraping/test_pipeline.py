@@ -0,0 +1,129 @@
+"""
+Offline checks of the pipeline's fast paths against the code they replaced.
+Run with pytest from the project root (no network needed):
+    python -m pytest webscraping/test_pipeline.py
+"""
+
+import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from parse_molde import parse_molde_page, parse_molde_page_soup
+from webscraping import merge_chunks, merge_molde_data_with_inventory, merge_molde_frame
+from xlsx_reader import read_workbook_columns
+
+
+def _page(name_html: str, weight_html: str) -> str:
+    return ("<html><head><script>var id = 'item-name-title';</script></head><body>"
+            f"<div class='header'>{name_html}</div><table><tr><td>{weight_html}</td></tr></table>"
+            "</body></html>")
+
+
+PAGES = [
+    _page('<h1 id="item-name-title">Plate 2 x 4</h1>', '<span id="item-weight-info">1.5g</span>'),
+    _page("<h1 class='x' id='item-name-title'>  Brick &amp; Tile\n</h1>",
+          '<span id=item-weight-info>0.43g</span>'),
+    _page('<H1 ID="item-name-title">Slope <b>45</b> 2 x 1<br></H1>',
+          '<span id="item-weight-info"><span>2</span>.1g</span>'),
+    _page('<h1 id="item-name-title">Tile<script>ignored()</script> 1 x 1</h1>', ""),
+    _page('<h1 data-id="item-name-title">Not the title</h1>', '<span id="item-weight-info">?</span>'),
+    _page("", ""),
+    # A commented-out copy of the element comes first
+    _page('<!-- <h1 id="item-name-title">Old</h1> --><h1 id="item-name-title">New</h1>',
+          '<span id="item-weight-info">1g</span>'),
+    # Misnested: </h1> closes the <p>, so "C" is outside the title
+    _page('<h1 id="item-name-title">A<p>B</h1>C</p>', '<span id="item-weight-info">1g</span>'),
+    # Unterminated comment inside the element
+    _page('<h1 id="item-name-title">A<!--&amp;<p></h1>', ""),
+]
+
+
+@pytest.mark.parametrize("html", PAGES)
+def test_parse_molde_page_matches_beautifulsoup(html):
+    """The regex/tokenizer fast path gives the full BeautifulSoup parse's text."""
+    assert parse_molde_page(html) == parse_molde_page_soup(html)
+
+
+MOLDE_DATA = {
+    "3001": {"name": "Brick 2 x 4", "weight": "2.32g", "category": "BRICK"},
+    "3020": {"name": "Plate 2 x 4", "category": "PLATE"},  # no weight scraped
+    "3023": {"name": "Plate 1 x 2", "weight": "0.45g", "category": "PLATE"},
+}
+
+
+def _inventory(id_moldes, id_colors=None, colors=None):
+    """Inventory chunk shaped like ``read_inventory_columns()`` output."""
+    rows = len(id_moldes)
+    return pd.DataFrame({
+        "ID_COLOR": id_colors or [""] * rows,
+        "ID_MOLDE": id_moldes,
+        "COLOR": colors or ["RED"] * rows,
+    })
+
+
+def test_merge_molde_frame_matches_list_merge():
+    """The factorized merge gives the same rows as the per-piece loop."""
+    inventory = _inventory(
+        ["3001", "3020", "9999", "", " 3023 ", "3001", "9999"],
+        ["", "300121", "", "12.0", "", " 4211 ", ""],
+        ["RED", "dark bluish gray", "", "BLUE", " white ", "TRANS YELLOW", "RED"])
+    expected = merge_molde_data_with_inventory(MOLDE_DATA, inventory.to_dict(orient="records"))
+    assert merge_molde_frame(MOLDE_DATA, inventory).to_dict(orient="records") == expected
+
+
+def test_merge_chunks_matches_whole_merge():
+    """Merging chunk by chunk gives the rows of one merge over the whole inventory."""
+    inventory = _inventory(["3001", "3020", "9999", "", "3023", "3001"])
+    chunks = [inventory.iloc[:2], inventory.iloc[2:5], inventory.iloc[5:]]
+    merged = pd.concat(list(merge_chunks(MOLDE_DATA, chunks)), ignore_index=True)
+    assert merged.to_dict(orient="records") == merge_molde_frame(MOLDE_DATA, inventory).to_dict(orient="records")
+
+
+def test_merge_chunks_reports_no_missing_molds_when_all_known(capsys):
+    """Regression: the NaN placeholder of each chunk was counted as a missing mold."""
+    chunks = [_inventory(["3001", "3020"]), _inventory(["3023", "3001"])]
+    list(merge_chunks(MOLDE_DATA, chunks))
+    assert "no encontrados" not in capsys.readouterr().out
+
+
+def test_merge_chunks_counts_each_missing_mold_once(capsys):
+    """Unknown molds are counted once across chunks; an empty ID_MOLDE counts as one."""
+    chunks = [_inventory(["3001", "9999"]), _inventory(["9999", "8888", ""])]
+    list(merge_chunks(MOLDE_DATA, chunks))
+    assert "3 ID_MOLDEs no encontrados" in capsys.readouterr().out
+
+
+def _write_workbook(path, header, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+INVENTORY_ROWS = [
+    [12, 3001, "RED", 0.5],
+    [None, "3001b", "dark bluish gray", 1],
+    [7, 3023, None, None],
+    [None, 3020, "Trans-Clear & <Glitter>", 2.25],
+    [13, "98138", "  white  ", 0],
+]
+
+
+@pytest.mark.parametrize("rows", [
+    INVENTORY_ROWS,
+    # A date-formatted cell takes the openpyxl path
+    INVENTORY_ROWS + [[14, 3040, "BLUE", datetime.datetime(2024, 5, 1)]],
+])
+def test_read_workbook_columns_matches_read_excel(tmp_path, rows):
+    """The streaming reader (and its cache) gives the frame ``pd.read_excel`` gives."""
+    path = str(tmp_path / "datos_inventario.xlsx")
+    _write_workbook(path, ["ID", "ID MOLDE", "COLOR", "PRECIO"], rows)
+    expected = pd.read_excel(path)
+    cache_dir = str(tmp_path / "cache")
+    pd.testing.assert_frame_equal(read_workbook_columns(path, cache_dir).frame(), expected)
+    pd.testing.assert_frame_equal(read_workbook_columns(path, cache_dir).frame(), expected)
+    pd.testing.assert_frame_equal(read_workbook_columns(path, None).frame(), expected)
@@ -5,7 +5,8 @@ Run this before the full scraper to verify everything works.
 
 import sys
 from scrape_moldes import scrape_molde_data, scrape_multiple_moldes
-from process_categories import extract_category_from_name, batch_categorize
+import pandas as pd
+from process_categories import extract_category_from_name, batch_categorize, categorize_series
 from generate_images import generate_image_url
 
 
@@ -47,6 +48,14 @@ def test_category_extraction():
         if result != expected:
             all_passed = False
     
+    names = pd.Series([name for name, _ in test_cases] + ["N/A", ""])
+    expected = [category for _, category in test_cases] + ["MISCELLANEOUS", "MISCELLANEOUS"]
+    vectorized = categorize_series(names).tolist()
+    status = "✓" if vectorized == expected else "✗"
+    print(f"{status} categorize_series on {len(names)} names → {vectorized}")
+    if vectorized != expected:
+        all_passed = False
+    
     return all_passed
 
 
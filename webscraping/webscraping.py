@@ -22,15 +22,31 @@ Inputs
 Output
 ------
 - data/bricklink_pieces.xlsx: Dataset compatible with the Flask app
+- data/bricklink_pieces.pkl: Cleaned snapshot the Flask app loads at boot
+- data/bricklink_pieces.sqlite: With --export sqlite, the indexed database
+  the app serves from with CATALOG_BACKEND=sqlite
+- data/scrape_cache.sqlite: Per-mold scrape cache; lets an interrupted run
+  resume and skips molds fetched within the TTL (--refresh-older-than)
+- data/scrape_telemetry/scrape-<start>.json: Per-request timings, status
+  codes and error classes of each scraping run, with p50/p95/p99 latency
 """
 
+import argparse
+import numpy as np
 import pandas as pd
 import os
-from typing import Dict, List, Any
-from import_excel import import_excel, import_unique_moldes
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from import_excel import (DEFAULT_CHUNK_ROWS, import_excel, import_published_catalog, import_unique_moldes,
+                          iter_inventory_chunks)
 from scrape_moldes import scrape_multiple_moldes
+from scrape_cache import DEFAULT_CACHE_PATH, DEFAULT_TTL_SECONDS, ScrapeCache, parse_duration
+from scrape_telemetry import DEFAULT_TELEMETRY_DIR, ScrapeTelemetry
 from process_categories import batch_categorize
-from generate_images import batch_generate_image_urls
+from generate_images import batch_generate_image_urls, image_url_chunks
+from catalog_writer import (DEFAULT_EXPORT_FORMATS, CatalogFormat, build_exporters, parse_export_formats,
+                            write_catalog)
 
 
 def merge_molde_data_with_inventory(molde_data: Dict[str, Dict[str, Any]],
@@ -90,46 +106,282 @@ def merge_molde_data_with_inventory(molde_data: Dict[str, Dict[str, Any]],
     return results
 
 
-def save_to_excel(pieces_data: List[Dict[str, Any]], output_filename: str = "bricklink_pieces.xlsx") -> str:
-    """Save processed data to an Excel file.
+def _merge_frame(molde_data: Dict[str, Dict[str, Any]],
+                 inventory_df: pd.DataFrame) -> Tuple[pd.DataFrame, Set[str]]:
+    """Merge without progress output; also returns the ID_MOLDEs not in ``molde_data``."""
+    def distinct(column: str) -> Tuple[np.ndarray, List[Any]]:
+        if column not in inventory_df.columns:
+            return np.zeros(len(inventory_df), dtype=np.intp), [""]
+        codes, uniques = pd.factorize(inventory_df[column])
+        # Missing values get code -1; point them at a trailing NaN
+        codes[codes < 0] = len(uniques)
+        return codes, list(uniques) + [np.nan]
+    
+    def gather(values: List[Any], codes: np.ndarray) -> np.ndarray:
+        return np.array(values + [None], dtype=object)[:-1][codes]
+    
+    molde_codes, moldes = distinct("ID_MOLDE")
+    moldes = [str(id_molde).strip() for id_molde in moldes]
+    infos = [molde_data.get(id_molde) if id_molde else None for id_molde in moldes]
+    id_color_codes, id_colors = distinct("ID_COLOR")
+    id_colors = [str(id_color).strip() for id_color in id_colors]
+    color_codes, colors = distinct("COLOR")
+    
+    id_molde = gather(moldes, molde_codes)
+    id_color = gather(id_colors, id_color_codes)
+    # Use ID_COLOR if exists, otherwise use ID_MOLDE
+    has_id_color = np.array([id_color != "" for id_color in id_colors] + [False], dtype=bool)[id_color_codes]
+    
+    merged = pd.DataFrame({
+        "Piece_ID": np.where(has_id_color, id_color, id_molde),
+        "ID_COLOR": id_color,
+        "ID_MOLDE": id_molde,
+        "Piece_Name": gather([info.get("name", "N/A") if info is not None else "N/A" for info in infos],
+                             molde_codes),
+        "Color": gather([str(color).title() if color else "" for color in colors], color_codes),
+        "Weight": gather([info.get("weight", "N/A") if info is not None else "N/A" for info in infos],
+                         molde_codes),
+        "Category": gather([info.get("category", "MISCELLANEOUS") if info is not None else "MISCELLANEOUS"
+                            for info in infos], molde_codes),
+        "Price": "",
+    })
+    
+    # The trailing NaN entry only counts when some row has no ID_MOLDE
+    used = np.bincount(molde_codes, minlength=len(moldes)) > 0
+    return merged, {id_molde for id_molde, info, seen in zip(moldes, infos, used) if info is None and seen}
+
+
+def merge_molde_frame(molde_data: Dict[str, Dict[str, Any]], inventory_df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame counterpart of ``merge_molde_data_with_inventory``.
+
+    Gives the same rows and column order. Each inventory column is
+    factorized, so the scraped data is looked up once per distinct
+    ID_MOLDE (and colors are title-cased once per distinct color) and
+    then gathered into rows by code.
 
     Args:
-        pieces_data: List of piece dictionaries.
-        output_filename: Output filename (without path).
+        molde_data: Scraped data keyed by id_molde with fields {name, weight, category}.
+        inventory_df: Full inventory (``import_inventory_frame()``).
 
     Returns:
-        Full path to the saved file.
+        One row per inventory piece, ready for ``add_image_urls``.
     """
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(current_dir)
-    output_path = os.path.join(project_root, "data", output_filename)
+    print("\n🔄 Fusionando datos de moldes con inventario completo...")
     
-    df = pd.DataFrame(pieces_data)
+    merged, missing_moldes = _merge_frame(molde_data, inventory_df)
+    if missing_moldes:
+        print(f"⚠️  {len(missing_moldes)} ID_MOLDEs no encontrados en datos scrapeados")
+    
+    print(f"✓ Fusión completada: {len(merged)} piezas generadas\n")
+    
+    return merged
+
+
+def merge_chunks(molde_data: Dict[str, Dict[str, Any]],
+                 inventory_chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Streaming stage: ``merge_molde_frame`` per inventory chunk.
+
+    Yields:
+        Merged chunks, in inventory order. Totals are printed once the
+        input is exhausted.
+    """
+    rows, missing_moldes = 0, set()
+    for chunk in inventory_chunks:
+        merged, chunk_missing = _merge_frame(molde_data, chunk)
+        rows += len(merged)
+        missing_moldes |= chunk_missing
+        yield merged
     
-    # Ensure column order matches expected format
-    column_order = [
-        "Piece_ID",
-        "ID_COLOR", 
-        "ID_MOLDE",
-        "Piece_Name",
-        "Color",
-        "Image_URL",
-        "Weight",
-        "Category",
-        "Price"
-    ]
+    if missing_moldes:
+        print(f"⚠️  {len(missing_moldes)} ID_MOLDEs no encontrados en datos scrapeados")
+    print(f"✓ Fusión completada: {rows} piezas generadas")
+
+
+def _piece_key(id_molde: Any, id_color: Any, color: Any) -> Tuple[str, str, str]:
+    """Identify one inventory color variant (Color as written to the catalog)."""
+    return str(id_molde).strip(), str(id_color).strip(), str(color).strip().title()
+
+
+def seed_molde_data(published_pieces: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Recover id_molde -> {name, weight, category} from a published catalog.
+
+    Molds whose name is missing or "N/A" are left out so they get scraped.
+    """
+    molde_data = {}
+    for piece in published_pieces:
+        id_molde = str(piece.get("ID_MOLDE", "")).strip()
+        name = str(piece.get("Piece_Name", "")).strip()
+        if not id_molde or not name or name == "N/A" or id_molde in molde_data:
+            continue
+        molde_data[id_molde] = {
+            "name": name,
+            "weight": piece.get("Weight", "N/A") or "N/A",
+            "category": piece.get("Category", "MISCELLANEOUS") or "MISCELLANEOUS",
+        }
+    return molde_data
+
+
+def merge_incremental(molde_data: Dict[str, Dict[str, Any]], changed_moldes: Set[str],
+                      inventory_pieces: List[Dict[str, Any]],
+                      published_pieces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rebuild the catalog rows, recomputing only the ones that changed.
+
+    A published row is reused as-is when its color variant is still in the
+    inventory and its mold was not re-scraped; every other inventory row is
+    merged and gets its image URL as in a full run. Prices already set in
+    the published catalog are carried over either way.
+
+    Returns:
+        Complete piece records in inventory order.
+    """
+    published = {_piece_key(p.get("ID_MOLDE", ""), p.get("ID_COLOR", ""), p.get("Color", "")): p
+                 for p in published_pieces}
     
-    # Reorder columns if present
-    existing_cols = [col for col in column_order if col in df.columns]
-    df = df[existing_cols]
+    keys = [_piece_key(p.get("ID_MOLDE", ""), p.get("ID_COLOR", ""), p.get("COLOR", ""))
+            for p in inventory_pieces]
+    affected = [i for i, key in enumerate(keys) if key not in published or key[0] in changed_moldes]
+    print(f"🔁 Filas recalculadas: {len(affected)} de {len(inventory_pieces)}")
     
-    df.to_excel(output_path, index=False)
+    rebuilt = batch_generate_image_urls(
+        merge_molde_data_with_inventory(molde_data, [inventory_pieces[i] for i in affected]))
+    rebuilt_by_index = dict(zip(affected, rebuilt))
     
+    results = []
+    for i, key in enumerate(keys):
+        previous = published.get(key)
+        piece = rebuilt_by_index.get(i)
+        if piece is None:
+            piece = dict(previous)
+        elif previous is not None:
+            piece["Price"] = previous.get("Price", "")
+        results.append(piece)
+    return results
+
+
+def run_incremental(unique_moldes: List[str],
+                    scrape: Callable[[List[str]], Dict[str, Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Update the published catalog, scraping only new or N/A molds.
+
+    Args:
+        unique_moldes: Current ID_MOLDEs (``import_unique_moldes()``).
+        scrape: Scrapes a list of molds (e.g. ``scrape_multiple_moldes``).
+
+    Returns:
+        The complete piece records and the number of molds scraped.
+    """
+    published_pieces = import_published_catalog()
+    inventory_pieces = import_excel()
+    
+    seed = seed_molde_data(published_pieces)
+    to_scrape = [id_molde for id_molde in unique_moldes if id_molde not in seed]
+    print(f"📋 {len(unique_moldes) - len(to_scrape)} ID_MOLDEs sin cambios, {len(to_scrape)} por scrapear")
+    
+    scraped = batch_categorize(scrape(to_scrape)) if to_scrape else {}
+    molde_data = {id_molde: scraped.get(id_molde) or seed[id_molde] for id_molde in unique_moldes}
+    
+    return merge_incremental(molde_data, set(scraped), inventory_pieces, published_pieces), len(scraped)
+
+
+def app_catalog_format() -> CatalogFormat:
+    """The app's cleaning, snapshot and SQLite helpers (``catalog.py``, ``catalog_sqlite.py``).
+
+    They live in the project root, which is not on the path when this
+    script runs from ``webscraping/``; it is appended (after the scraper's
+    own modules) the first time the helpers are needed.
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+    from catalog import clean_pieces_frame, file_digest, snapshot_path_for, write_column_snapshot
+    from catalog_sqlite import fts5_available, sqlite_path_for, write_sqlite
+    return CatalogFormat(clean_pieces_frame, file_digest, snapshot_path_for, write_column_snapshot,
+                         sqlite_path_for, write_sqlite, fts5_available)
+
+
+def save_to_excel(pieces_data: Union[List[Dict[str, Any]], pd.DataFrame],
+                  output_filename: str = "bricklink_pieces.xlsx",
+                  export_formats: Sequence[str] = (),
+                  catalog_format: Optional[CatalogFormat] = None) -> str:
+    """Save processed data to an Excel file plus the app's catalog snapshot.
+
+    Args:
+        pieces_data: List of piece dictionaries, or a DataFrame of them.
+        output_filename: Output filename (without path).
+        export_formats: Extra exports to publish with it (see ``build_exporters``).
+        catalog_format: The app's snapshot helpers (default: ``app_catalog_format()``).
+
+    Returns:
+        Full path to the saved file.
+    """
+    catalog_format = catalog_format or app_catalog_format()
+    output_path = output_path_for(output_filename)
+    output_path, snapshot_path, _ = write_catalog([pd.DataFrame(pieces_data)], catalog_format, output_path,
+                                                  build_exporters(export_formats, catalog_format, output_path))
+    print(f"✓ Snapshot del catálogo guardado: {snapshot_path}")
     return output_path
 
 
-def main() -> None:
+def output_path_for(output_filename: str) -> str:
+    """Path of a pipeline output file in the project's data folder."""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(current_dir)
+    return os.path.join(project_root, "data", output_filename)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the scraper's command-line options."""
+    parser = argparse.ArgumentParser(description="Scrape Bricklink and rebuild the RekuBricks catalog.")
+    parser.add_argument("--refresh-older-than", metavar="DURATION", type=parse_duration,
+                        default=DEFAULT_TTL_SECONDS,
+                        help="re-fetch cached molds older than this (e.g. 7d, 12h; default: "
+                             "SCRAPE_CACHE_TTL_DAYS or 30d)")
+    parser.add_argument("--cache", metavar="PATH", default=DEFAULT_CACHE_PATH,
+                        help="scrape cache / checkpoint database (default: data/scrape_cache.sqlite)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="update the published catalog, scraping only new molds or molds without a name")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="fetch every mold and do not read or write the cache")
+    parser.add_argument("--chunk-rows", metavar="N", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="inventory rows per streaming chunk (default: PIPELINE_CHUNK_ROWS or 5000)")
+    parser.add_argument("--telemetry-dir", metavar="DIR", default=DEFAULT_TELEMETRY_DIR,
+                        help="where the per-run scrape telemetry JSON is written; empty disables "
+                             "(default: SCRAPE_TELEMETRY_DIR or data/scrape_telemetry)")
+    parser.add_argument("--export", metavar="FORMATS", type=parse_export_formats,
+                        default=parse_export_formats(DEFAULT_EXPORT_FORMATS),
+                        help="extra catalog exports published with the workbook: parquet, feather, "
+                             "json, csv, sqlite (comma-separated; default: PIPELINE_EXPORTS or none)")
+    return parser.parse_args(argv)
+
+
+def scrape_moldes_cached(id_moldes: List[str], args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """Scrape molds through the persistent cache unless ``--no-cache`` was given.
+
+    The run's telemetry report is written to ``--telemetry-dir`` (if set).
+    """
+    telemetry = ScrapeTelemetry()
+    try:
+        if args.no_cache:
+            return scrape_multiple_moldes(id_moldes, telemetry=telemetry)
+        
+        # Results are checkpointed as they arrive; rerun to resume after a crash
+        with ScrapeCache(args.cache) as cache:
+            molde_data = scrape_multiple_moldes(id_moldes, cache=cache, max_age=args.refresh_older_than,
+                                                telemetry=telemetry)
+            failures = [f for f in cache.failures() if f["id_molde"] in molde_data]
+        if failures:
+            print(f"⚠️  {len(failures)} ID_MOLDEs fallidos (se reintentan en la próxima ejecución):")
+            for failure in failures[:10]:
+                print(f"   {failure['id_molde']}: {failure['error']} ({failure['attempts']} intentos)")
+        return molde_data
+    finally:
+        # Also written for interrupted runs, with the requests made so far
+        if args.telemetry_dir and telemetry.records:
+            print(f"📈 Telemetría del scraping guardada: {telemetry.write(args.telemetry_dir)}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """Main execution pipeline for the optimized webscraper."""
+    args = parse_args(argv)
     print("\n" + "=" * 70)
     print("  REKUBRICKS WEBSCRAPER V2 - Optimized")
     print("=" * 70)
@@ -143,42 +395,48 @@ def main() -> None:
         print("❌ No se pudieron cargar ID_MOLDEs. Abortando.")
         return
     
-    # Step 2: Scrape data for unique moldes only
-    print("\n🌐 PASO 2: Scraping de ID_MOLDEs únicos")
-    print("-" * 70)
-    molde_data = scrape_multiple_moldes(unique_moldes)
-    
-    # Step 3: Extract and assign categories
-    print("\n📂 PASO 3: Extraer categorías")
-    print("-" * 70)
-    molde_data = batch_categorize(molde_data)
-    
-    # Step 4: Load full inventory with color variants
-    print("\n📥 PASO 4: Cargar inventario completo")
-    print("-" * 70)
-    inventory_pieces = import_excel()
-    
-    # Step 5: Merge molde data with inventory
-    print("\n🔀 PASO 5: Fusionar datos")
-    print("-" * 70)
-    complete_pieces = merge_molde_data_with_inventory(molde_data, inventory_pieces)
-    
-    # Step 6: Generate image URLs (no HTTP requests)
-    print("\n🖼️  PASO 6: Generar URLs de imágenes")
-    print("-" * 70)
-    complete_pieces = batch_generate_image_urls(complete_pieces)
-    
-    # Step 7: Save to Excel
-    print("\n💾 PASO 7: Guardar resultados")
-    print("-" * 70)
-    output_path = save_to_excel(complete_pieces)
+    if args.incremental:
+        # Steps 2-6 against the published catalog: scrape only new or N/A molds
+        print("\n🔁 PASO 2: Actualización incremental")
+        print("-" * 70)
+        complete_pieces, scraped_count = run_incremental(
+            unique_moldes, lambda id_moldes: scrape_moldes_cached(id_moldes, args))
+        
+        # Step 7: Save to Excel
+        print("\n💾 PASO 7: Guardar resultados")
+        print("-" * 70)
+        output_path = save_to_excel(complete_pieces, export_formats=args.export)
+        total_pieces = len(complete_pieces)
+    else:
+        # Step 2: Scrape data for unique moldes only
+        print("\n🌐 PASO 2: Scraping de ID_MOLDEs únicos")
+        print("-" * 70)
+        molde_data = scrape_moldes_cached(unique_moldes, args)
+        scraped_count = len(molde_data)
+        
+        # Step 3: Extract and assign categories
+        print("\n📂 PASO 3: Extraer categorías")
+        print("-" * 70)
+        molde_data = batch_categorize(molde_data)
+        
+        # Steps 4-7 stream the inventory chunk by chunk: load, merge with the
+        # molde data, generate image URLs (no HTTP requests) and append to the
+        # Excel file, so only one chunk is in flight at a time
+        print(f"\n🔀 PASOS 4-7: Inventario → fusión → URLs → Excel (bloques de {args.chunk_rows} filas)")
+        print("-" * 70)
+        chunks = image_url_chunks(merge_chunks(molde_data, iter_inventory_chunks(args.chunk_rows)))
+        output_path = output_path_for("bricklink_pieces.xlsx")
+        catalog_format = app_catalog_format()
+        output_path, snapshot_path, total_pieces = write_catalog(
+            chunks, catalog_format, output_path, build_exporters(args.export, catalog_format, output_path))
+        print(f"✓ Snapshot del catálogo guardado: {snapshot_path}")
     
     # Summary
     print("\n" + "=" * 70)
     print("  ✅ SCRAPING COMPLETADO")
     print("=" * 70)
-    print(f"📊 Total de piezas procesadas: {len(complete_pieces)}")
-    print(f"📊 ID_MOLDEs únicos scrapeados: {len(molde_data)}")
+    print(f"📊 Total de piezas procesadas: {total_pieces}")
+    print(f"📊 ID_MOLDEs únicos scrapeados: {scraped_count}")
     print(f"📄 Archivo guardado: {output_path}")
     print("=" * 70 + "\n")
 
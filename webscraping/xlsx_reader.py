@@ -0,0 +1,478 @@
+"""Streaming, column-wise reader for the first sheet of an xlsx workbook.
+
+``pd.read_excel`` walks every cell through openpyxl and keeps the whole
+sheet as lists of Python objects before building the frame. This reader
+makes one pass over the sheet XML instead, dictionary-encoding each
+column as it goes (one small code per cell plus the distinct values), so
+memory stays bounded and unique values fall out of the same pass.
+
+The result is the frame ``pd.read_excel(path)`` would give: cells are
+converted the way pandas' openpyxl reader converts them, and each
+column's distinct values go through pandas' own ``TextParser`` for type
+inference (which only depends on the set of values in the column). A
+regex scan of the sheet XML is the fast path; workbooks it doesn't
+handle (date-formatted cells, namespace-prefixed XML, ...) are read
+through openpyxl's read-only mode with the same encoding.
+
+Encoded workbooks are cached by content hash, so reading an unchanged
+workbook again only loads the columns.
+"""
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import glob
+import hashlib
+import io
+import os
+import pickle
+import re
+import zipfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from pandas.io.parsers import TextParser
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ingest_cache")
+# Bump whenever the encoding or the payload layout change
+CACHE_VERSION = 1
+
+# Error cells (#N/A, #DIV/0!, ...) read as NaN; one shared object so it encodes once
+_ERROR = float("nan")
+
+_CELL_RE = re.compile(r'<c r="([A-Z]+)(\d+)"([^>]*?)(?:/>|>(.*?)</c>)', re.DOTALL)
+_ATTR_RE = re.compile(r'\b([rts])="([^"]*)"')
+_VALUE_RE = re.compile(r"<v>(.*?)</v>", re.DOTALL)
+_TEXT_RE = re.compile(r"<t\b[^>]*?(?:/>|>(.*?)</t>)", re.DOTALL)
+_PHONETIC_RE = re.compile(r"<rPh\b.*?</rPh>", re.DOTALL)
+_ENTITY_RE = re.compile(r"&(#x[0-9a-fA-F]+|#[0-9]+|amp|lt|gt|quot|apos);")
+_ENTITIES = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'"}
+_BLOCK_SIZE = 4 << 20
+
+
+def _file_digest(path: str) -> str:
+    """SHA-256 hex digest of a workbook's contents (the cache key)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _Unsupported(Exception):
+    """The fast path can't read this workbook exactly; use openpyxl."""
+
+
+class WorkbookColumns:
+    """A sheet stored column-wise: per column, distinct values plus a code per row.
+
+    Attributes:
+        names: Column names, as ``pd.read_excel`` names them.
+        rows: Number of data rows.
+    """
+
+    def __init__(self, names: List[Any], values: Dict[Any, pd.Series],
+                 codes: Dict[Any, np.ndarray], rows: int):
+        self.names = names
+        self.rows = rows
+        self._values = values
+        self._codes = codes
+
+    def values(self, name: Any) -> pd.Series:
+        """Distinct values of a column, in order of first appearance (index = code)."""
+        return self._values[name]
+
+    def codes(self, name: Any) -> np.ndarray:
+        return self._codes[name]
+
+    def column(self, name: Any, start: int = 0, stop: Optional[int] = None) -> pd.Series:
+        """Decode rows ``start:stop`` of a column."""
+        return self._values[name].take(self._codes[name][start:stop]).reset_index(drop=True)
+
+    def frame(self, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        """Decode rows ``start:stop`` as a DataFrame (all rows by default)."""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        frame = pd.DataFrame({name: self.column(name, start, stop) for name in self.names},
+                             columns=self.names)
+        frame.index = pd.RangeIndex(start, max(start, stop))
+        return frame
+
+    def iter_frames(self, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        """Yield the rows as DataFrames of at most ``chunk_rows`` rows."""
+        for start in range(0, self.rows, chunk_rows):
+            yield self.frame(start, start + chunk_rows)
+
+    def map_columns(self, names: Sequence[Any], transforms: Dict[Any, Any]) -> "WorkbookColumns":
+        """Rename columns and transform their distinct values, keeping the codes.
+
+        Args:
+            names: New name for each column, in order.
+            transforms: New name -> function from a values Series to a
+                Series of the same length (e.g. ``lambda s: s.fillna("")``).
+        """
+        values, codes = {}, {}
+        for old, new in zip(self.names, names):
+            transform = transforms.get(new)
+            values[new] = transform(self._values[old]) if transform else self._values[old]
+            codes[new] = self._codes[old]
+        return WorkbookColumns(list(names), values, codes, self.rows)
+
+
+def _unescape(text: str) -> str:
+    """Decode XML text the way an XML parser would (line ends, entities)."""
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if "&" not in text:
+        return text
+
+    def entity(match: "re.Match[str]") -> str:
+        name = match.group(1)
+        if name[:2] == "#x":
+            return chr(int(name[2:], 16))
+        if name[0] == "#":
+            return chr(int(name[1:]))
+        return _ENTITIES[name]
+
+    return _ENTITY_RE.sub(entity, text)
+
+
+def _column_index(reference: str) -> int:
+    """1-based column of a cell reference like "AB12"."""
+    index = 0
+    for char in reference:
+        if char.isdigit():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index
+
+
+def _attributes(text: str) -> Dict[str, str]:
+    return {key: value for key, value in _ATTR_RE.findall(text)}
+
+
+def _read_text(archive: zipfile.ZipFile, name: str) -> Optional[str]:
+    try:
+        return archive.read(name).decode("utf-8")
+    except KeyError:
+        return None
+
+
+def _resolve_part(target: str) -> str:
+    """Zip member name for a relationship target of xl/workbook.xml."""
+    return target.lstrip("/") if target.startswith("/") else os.path.normpath(f"xl/{target}").replace(os.sep, "/")
+
+
+def _workbook_parts(archive: zipfile.ZipFile) -> Tuple[str, Optional[str]]:
+    """Return the first worksheet's part and the shared strings part."""
+    workbook = _read_text(archive, "xl/workbook.xml")
+    rels = _read_text(archive, "xl/_rels/workbook.xml.rels")
+    if workbook is None or rels is None or "<sheet " not in workbook:
+        raise _Unsupported("no plain workbook.xml")
+    relationships = {}
+    for attributes in re.findall(r"<Relationship\b([^>]*)>", rels):
+        rel_id = re.search(r'\bId="([^"]*)"', attributes)
+        target = re.search(r'\bTarget="([^"]*)"', attributes)
+        rel_type = re.search(r'\bType="([^"]*)"', attributes)
+        if rel_id and target and rel_type:
+            relationships[rel_id.group(1)] = (rel_type.group(1).rsplit("/", 1)[-1], _unescape(target.group(1)))
+
+    sheet_part = None
+    for attributes in re.findall(r"<sheet\b([^>]*)>", workbook):
+        rel_id = re.search(r'\s(?:\w+:)?id="([^"]*)"', attributes)
+        kind, target = relationships.get(rel_id.group(1) if rel_id else "", ("", ""))
+        if kind == "worksheet":
+            sheet_part = _resolve_part(target)
+            break
+    if sheet_part is None:
+        raise _Unsupported("no worksheet")
+    strings_part = next((_resolve_part(target) for kind, target in relationships.values()
+                         if kind == "sharedStrings"), None)
+    return sheet_part, strings_part
+
+
+def _date_styles(archive: zipfile.ZipFile) -> set:
+    """Style indexes whose number format shows a date or time."""
+    styles = _read_text(archive, "xl/styles.xml")
+    if styles is None:
+        return set()
+    formats = dict(BUILTIN_FORMATS)
+    for attributes in re.findall(r"<numFmt\b([^>]*)>", styles):
+        fmt_id = re.search(r'\bnumFmtId="(\d+)"', attributes)
+        code = re.search(r'\bformatCode="([^"]*)"', attributes)
+        if fmt_id and code:
+            formats[int(fmt_id.group(1))] = _unescape(code.group(1))
+    cell_xfs = re.search(r"<cellXfs\b[^>]*>(.*?)</cellXfs>", styles, re.DOTALL)
+    if cell_xfs is None:
+        return set()
+    dates = set()
+    for index, attributes in enumerate(re.findall(r"<xf\b([^>]*)>", cell_xfs.group(1))):
+        fmt_id = re.search(r'\bnumFmtId="(\d+)"', attributes)
+        if fmt_id and is_date_format(formats.get(int(fmt_id.group(1)), "General")):
+            dates.add(str(index))
+    return dates
+
+
+def _cell_value(attributes: Dict[str, str], content: Optional[str], shared: List[str],
+                date_styles: set) -> Any:
+    """Convert one ``<c>`` element like openpyxl (data_only) + pandas would."""
+    data_type = attributes.get("t", "n")
+    if data_type == "inlineStr":
+        if not content or "<is" not in content:
+            return ""
+        content = _PHONETIC_RE.sub("", content)
+        return "".join(_unescape(text or "") for text in _TEXT_RE.findall(content))
+
+    match = _VALUE_RE.search(content) if content else None
+    value = match.group(1) if match else None
+    if not value:
+        return ""
+    if data_type == "n":
+        if attributes.get("s", "0") in date_styles:
+            raise _Unsupported("date cell")
+        if "." in value or "E" in value or "e" in value:
+            number = float(value)
+            integer = int(number)
+            return integer if integer == number else number
+        return int(value)
+    if data_type == "s":
+        return shared[int(value)]
+    if data_type == "str":
+        return _unescape(value)
+    if data_type == "b":
+        return bool(int(value))
+    if data_type == "e":
+        return _ERROR
+    raise _Unsupported(f"cell type {data_type}")
+
+
+def _fast_rows(path: str) -> Iterator[List[Any]]:
+    """Yield converted rows of the first sheet by scanning its XML.
+
+    Cells are matched across whole blocks of complete rows; each cell's
+    reference gives its row and column, and rows missing in between come
+    out empty, as openpyxl yields them.
+    """
+    with zipfile.ZipFile(path) as archive:
+        sheet_part, strings_part = _workbook_parts(archive)
+        shared = []
+        if strings_part is not None and strings_part in archive.namelist():
+            with archive.open(strings_part) as source:
+                shared = read_string_table(source)
+        date_styles = _date_styles(archive)
+
+        with archive.open(sheet_part) as raw:
+            source = io.TextIOWrapper(raw, encoding="utf-8")
+            columns: Dict[str, int] = {}
+            kinds: Dict[str, Tuple[str, str, Dict[str, str]]] = {}
+            row: Optional[List[Any]] = None
+            row_key = ""
+            row_number = 0
+            buffer = ""
+            checked = False
+            while True:
+                block = source.read(_BLOCK_SIZE)
+                buffer += block
+                if not checked:
+                    if "<worksheet" not in buffer:
+                        raise _Unsupported("namespace-prefixed sheet")
+                    checked = True
+                # Scan up to the last complete row; the rest waits for the next block
+                cut = buffer.rfind("</row>") + len("</row>") if block else len(buffer)
+                if block and cut < len("</row>"):
+                    continue
+                region, buffer = buffer[:cut], buffer[cut:]
+
+                cells = _CELL_RE.findall(region)
+                if len(cells) != region.count("<c ") + region.count("<c>"):
+                    raise _Unsupported("cell without a reference")
+                for letters, number, extra, content in cells:
+                    if number != row_key:
+                        index = int(number)
+                        if index <= row_number:
+                            raise _Unsupported("rows out of order")
+                        if row is not None:
+                            yield row
+                        # Rows missing from the XML are empty rows
+                        while row_number + 1 < index:
+                            row_number += 1
+                            yield []
+                        row, row_key, row_number = [], number, index
+
+                    column = columns.get(letters)
+                    if column is None:
+                        column = columns[letters] = _column_index(letters)
+                    kind = kinds.get(extra)
+                    if kind is None:
+                        attributes = _attributes(extra)
+                        kind = kinds[extra] = (attributes.get("t", "n"), attributes.get("s", "0"), attributes)
+                    data_type, style, attributes = kind
+
+                    if not content:
+                        value: Any = ""
+                    elif content[:3] == "<v>" and content[-4:] == "</v>" and "<" not in content[3:-4]:
+                        # Plain value: the common case, without another regex
+                        text = content[3:-4]
+                        if data_type == "s" and text:
+                            value = shared[int(text)]
+                        elif data_type == "n" and text and style not in date_styles:
+                            if "." in text or "E" in text or "e" in text:
+                                number_value = float(text)
+                                value = int(number_value) if int(number_value) == number_value else number_value
+                            else:
+                                value = int(text)
+                        else:
+                            value = _cell_value(attributes, content, shared, date_styles)
+                    elif (data_type == "inlineStr" and content[:7] == "<is><t>" and content[-9:] == "</t></is>"
+                          and "<" not in content[7:-9]):
+                        value = _unescape(content[7:-9])
+                    else:
+                        value = _cell_value(attributes, content, shared, date_styles)
+
+                    if column > len(row):
+                        row.extend([""] * (column - len(row)))
+                    row[column - 1] = value
+                if not block:
+                    break
+            if row is not None:
+                yield row
+
+
+def _convert_openpyxl_cell(cell: Any) -> Any:
+    """pandas' conversion of an openpyxl cell (see ``OpenpyxlReader._convert_cell``)."""
+    if cell.value is None:
+        return ""
+    if cell.data_type == "e":
+        return _ERROR
+    if cell.data_type == "n":
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def _openpyxl_rows(path: str) -> Iterator[List[Any]]:
+    """Yield converted rows of the first sheet through openpyxl's read-only mode."""
+    workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()
+        for row in sheet.rows:
+            yield [_convert_openpyxl_cell(cell) for cell in row]
+    finally:
+        workbook.close()
+
+
+def _infer(values: List[Any]) -> pd.Series:
+    """Run a column's distinct values through pandas' Excel type inference."""
+    rows = [["key", "value"]] + [[index, value] for index, value in enumerate(values)]
+    return TextParser(rows, header=0, skip_blank_lines=False).read()["value"]
+
+
+def _encode(rows: Iterator[List[Any]]) -> WorkbookColumns:
+    """Dictionary-encode rows (the first is the header) into columns."""
+    header: Optional[List[Any]] = None
+    lookups: List[Dict[Any, int]] = []
+    distinct: List[List[Any]] = []
+    codes: List[array] = []
+    data_rows = 0
+    last_data_row = -1
+
+    for row in rows:
+        # Trailing empty cells don't count (pandas trims them before padding)
+        width = len(row)
+        while width and row[width - 1] == "":
+            width -= 1
+        if header is None:
+            header = row[:width]
+            continue
+        if width:
+            last_data_row = data_rows
+        while len(codes) < width:
+            # A column first seen here is empty in every earlier row
+            lookups.append({"": 0} if data_rows else {})
+            distinct.append([""] if data_rows else [])
+            codes.append(array("I", bytes(4 * data_rows)))
+        if len(row) < len(codes):
+            row = row + [""] * (len(codes) - len(row))
+        for value, lookup, column_distinct, column_codes in zip(row, lookups, distinct, codes):
+            # True == 1 as dict keys; keep bools apart from ints
+            key = (bool, value) if value is True or value is False else value
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(column_distinct)
+                column_distinct.append(value)
+            column_codes.append(code)
+        data_rows += 1
+
+    if header is None or (not header and last_data_row < 0):
+        return WorkbookColumns([], {}, {}, 0)
+    # Trailing empty rows are dropped, as pd.read_excel does
+    rows_kept = last_data_row + 1
+    width = max(len(header), len(codes))
+    while len(codes) < width:
+        distinct.append([""] if data_rows else [])
+        codes.append(array("I", bytes(4 * data_rows)))
+    header = header + [""] * (width - len(header))
+    names = list(TextParser([header], header=0, skip_blank_lines=False).read().columns)
+
+    values, column_codes = {}, {}
+    for name, column_distinct, column_codes_array in zip(names, distinct, codes):
+        kept = np.frombuffer(column_codes_array, dtype=np.uint32)[:rows_kept]
+        # Type inference must only see values of the rows that are kept
+        used = np.bincount(kept, minlength=len(column_distinct)) > 0
+        if not used.all():
+            remap = np.cumsum(used, dtype=np.uint32) - 1
+            kept = remap[kept]
+            column_distinct = [value for value, keep in zip(column_distinct, used) if keep]
+        values[name] = _infer(column_distinct)
+        column_codes[name] = kept.astype(np.uint32)
+    return WorkbookColumns(names, values, column_codes, rows_kept)
+
+
+def scan_workbook(path: str) -> WorkbookColumns:
+    """Read the first sheet of ``path`` into columns in one streaming pass."""
+    try:
+        return _encode(_fast_rows(path))
+    except (_Unsupported, UnicodeDecodeError, KeyError, ValueError, IndexError):
+        return _encode(_openpyxl_rows(path))
+
+
+def _cache_path(path: str, digest: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.{digest[:16]}.pkl")
+
+
+def read_workbook_columns(path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> WorkbookColumns:
+    """``scan_workbook`` with a columnar cache keyed by the workbook's SHA-256.
+
+    Args:
+        path: Workbook to read.
+        cache_dir: Cache folder; ``None`` disables the cache.
+    """
+    if cache_dir is None:
+        return scan_workbook(path)
+
+    digest = _file_digest(path)
+    cache_path = _cache_path(path, digest, cache_dir)
+    try:
+        with open(cache_path, "rb") as f:
+            payload = pickle.load(f)
+        if payload.get("version") == CACHE_VERSION and payload.get("digest") == digest:
+            return WorkbookColumns(payload["names"], payload["values"], payload["codes"], payload["rows"])
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+        pass
+
+    columns = scan_workbook(path)
+    payload = {"version": CACHE_VERSION, "digest": digest, "names": columns.names,
+               "values": {name: columns.values(name) for name in columns.names},
+               "codes": {name: columns.codes(name) for name in columns.names}, "rows": columns.rows}
+    os.makedirs(cache_dir, exist_ok=True)
+    # Drop the cached copies of older versions of this workbook
+    for stale in glob.glob(os.path.join(glob.escape(cache_dir), f"{glob.escape(os.path.basename(path))}.*.pkl")):
+        if stale != cache_path:
+            os.remove(stale)
+    tmp_path = f"{cache_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    return columns
@@ -0,0 +1,165 @@
+"""Streaming, column-wise writer for a one-sheet xlsx workbook.
+
+openpyxl's write-only mode still builds a cell object and an XML element
+per value, which makes the catalog workbook the slowest file the pipeline
+writes. This writer emits the same sheet XML (inline strings, ``t="n"``
+numbers formatted like openpyxl, ``t="b"`` booleans) straight into the
+zip stream: each chunk is dictionary-encoded per column, a cell's XML is
+built once per distinct value, and rows are joined from those pieces.
+Only the compressed sheet is kept; memory does not grow with the rows.
+
+Strings are always written as text (openpyxl would turn ``"=..."`` into a
+formula and ``"#N/A"`` into an error cell), characters XML can't carry are
+dropped, and missing values, empty strings, NaN and infinities are left
+as empty cells.
+"""
+from numbers import Number
+from typing import Any, List, Optional, Sequence
+import re
+import zipfile
+
+import pandas as pd
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<Relationships xmlns="{_PACKAGE_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+    '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<Relationships xmlns="{_PACKAGE_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{_REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+    f'<Relationship Id="rId2" Type="{_REL_NS}/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<styleSheet xmlns="{_MAIN_NS}">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<worksheet xmlns="{_MAIN_NS}"><sheetData>'
+)
+_SHEET_END = "</sheetData></worksheet>"
+# Rows of XML joined per write to the zip stream
+_FLUSH_ROWS = 1000
+
+_ESCAPE_RE = re.compile(r"[&<>]")
+_ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;"}
+
+
+def _escape(text: str) -> str:
+    return _ESCAPE_RE.sub(lambda match: _ESCAPES[match.group()], text)
+
+
+def _cell_xml(value: Any) -> Optional[str]:
+    """Everything after ``<c r="A1"`` for one value, or None for an empty cell."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        text = ILLEGAL_CHARACTERS_RE.sub("", value)[:32767]
+        if not text:
+            return None
+        space = ' xml:space="preserve"' if text.strip() and text != text.strip() else ""
+        return f' t="inlineStr"><is><t{space}>{_escape(text)}</t></is></c>'
+    if isinstance(value, bool):
+        return f' t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, Number):
+        if value != value or value in (float("inf"), float("-inf")):
+            return None
+        return f' t="n"><v>{"%.16g" % value}</v></c>'
+    return _cell_xml(str(value))
+
+
+class XlsxStreamWriter:
+    """Write rows to a new one-sheet workbook as they arrive.
+
+    Attributes:
+        path: Workbook being written.
+        rows: Rows written so far (including the header).
+    """
+
+    def __init__(self, path: str, sheet_name: str = "Sheet"):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.rows = 0
+        self._archive = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        self._sheet = self._archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        self._sheet.write(_SHEET_START.encode("utf-8"))
+
+    def _write_cells(self, cells: Sequence[Sequence[Optional[str]]]) -> None:
+        """Write rows given as per-column lists of cell XML (see ``_cell_xml``)."""
+        letters = [get_column_letter(index + 1) for index in range(len(cells))]
+        parts: List[str] = []
+        for row in zip(*cells):
+            self.rows += 1
+            number = self.rows
+            parts.append(f'<row r="{number}">')
+            parts.extend(f'<c r="{letter}{number}"{cell}' for letter, cell in zip(letters, row)
+                         if cell is not None)
+            parts.append("</row>")
+            if number % _FLUSH_ROWS == 0:
+                self._sheet.write("".join(parts).encode("utf-8"))
+                parts.clear()
+        self._sheet.write("".join(parts).encode("utf-8"))
+
+    def append(self, row: Sequence[Any]) -> None:
+        """Write one row of values."""
+        self._write_cells([[_cell_xml(value)] for value in row])
+
+    def write_frame(self, frame: pd.DataFrame) -> None:
+        """Write the rows of a frame (not its header)."""
+        cells = []
+        for col in frame.columns:
+            codes, uniques = pd.factorize(frame[col])
+            # Missing values get code -1, which picks the trailing None
+            xml = [_cell_xml(value) for value in uniques.tolist()] + [None]
+            cells.append([xml[code] for code in codes.tolist()])
+        self._write_cells(cells)
+
+    def close(self) -> None:
+        """Finish the sheet and write the rest of the package."""
+        if self._archive.fp is None:
+            return
+        self._sheet.write(_SHEET_END.encode("utf-8"))
+        self._sheet.close()
+        self._archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        self._archive.writestr("_rels/.rels", _ROOT_RELS)
+        self._archive.writestr("xl/workbook.xml", _WORKBOOK.replace("{sheet_name}", _escape(self.sheet_name)))
+        self._archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        self._archive.writestr("xl/styles.xml", _STYLES)
+        self._archive.close()